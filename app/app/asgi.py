@@ -0,0 +1,23 @@
+"""
+ASGI config for app project.
+
+It exposes the ASGI callable as a module-level variable named
+``application``. Django runs in a bounded thread pool while the request
+and response bodies are transferred asynchronously (see core/asgi.py).
+
+Run it with an ASGI server, for example:
+
+    uvicorn app.asgi:application
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+
+wsgi_application = get_wsgi_application()
+
+from core.asgi import ThreadPoolASGIHandler  # noqa: E402
+
+application = ThreadPoolASGIHandler(wsgi_application)
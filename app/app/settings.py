@@ -45,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.timing.ServerTimingMiddleware',
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -74,6 +76,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'app.wsgi.application'
 
+# Con app/asgi.py Django corre en un pool de ASGI_THREADS threads por
+# proceso (ver core/asgi.py), que acota tambien las conexiones a la base.
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 8))
+
 
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
@@ -85,9 +91,16 @@ DATABASES = {
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        # Conexiones persistentes por worker, en segundos (0 = una por
+        # pedido, None = sin limite).
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
     }
 }
 
+# Cada cuantos segundos se verifica que una conexion persistente siga
+# viva antes de usarla en un pedido (ver core/db.py).
+DB_HEALTH_CHECK_INTERVAL = int(os.environ.get('DB_HEALTH_CHECK_INTERVAL', 30))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -132,4 +145,112 @@ MEDIA_ROOT = '/vol/web/media'
 
 STATIC_ROOT = '/vol/web/static'
 
+# Imagenes de recetas: limites de subida (recipe/uploads.py) y versiones
+# redimensionadas (recipe/images.py)
+
+RECIPE_IMAGE_MAX_BYTES = int(
+    os.environ.get('RECIPE_IMAGE_MAX_BYTES', 10 * 1024 * 1024)
+)
+RECIPE_IMAGE_MAX_DIMENSION = int(
+    os.environ.get('RECIPE_IMAGE_MAX_DIMENSION', 8000)
+)
+RECIPE_IMAGE_WORKERS = int(os.environ.get('RECIPE_IMAGE_WORKERS', 2))
+RECIPE_IMAGE_QUALITY = 85
+RECIPE_IMAGE_SIZES = {
+    'thumbnail': (150, 150),
+    'medium': (600, 600),
+}
+
 AUTH_USER_MODEL = 'core.User'
+
+
+# Paginacion
+# Las vistas de listado se paginan por cursor (ver recipe/pagination.py).
+
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 50))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 500))
+
+# Renderer y parser JSON de la API (ver core/renderers.py). Con
+# API_FAST_JSON=0 se usan los de DRF.
+
+API_FAST_JSON = os.environ.get('API_FAST_JSON', '1') == '1'
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer' if API_FAST_JSON
+        else 'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.renderers.FastJSONParser' if API_FAST_JSON
+        else 'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+}
+
+# Maximo de objetos por POST de creacion masiva.
+BULK_CREATE_MAX_ITEMS = int(os.environ.get('BULK_CREATE_MAX_ITEMS', 10000))
+
+# Recetas por consulta al exportar (ver recipe/export.py).
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 1000))
+
+
+# Busqueda de recetas (ver recipe/search.py)
+
+RECIPE_SEARCH_CONFIG = os.environ.get('RECIPE_SEARCH_CONFIG', 'spanish')
+
+
+# Cache de autenticacion por token (ver core/authentication.py).
+# TOKEN_CACHE_ALIAS permite compartir el cache entre procesos usando un
+# alias de CACHES; por defecto solo se usa el LRU de cada proceso.
+
+TOKEN_CACHE_MAX_SIZE = int(os.environ.get('TOKEN_CACHE_MAX_SIZE', 10000))
+TOKEN_CACHE_TTL = int(os.environ.get('TOKEN_CACHE_TTL', 300))
+TOKEN_CACHE_ALIAS = os.environ.get('TOKEN_CACHE_ALIAS') or None
+
+# Tokens de acceso firmados (ver core/tokens.py): duracion en segundos
+# del token de acceso y del de refresco, y cada cuantos segundos cada
+# proceso relee las revocaciones.
+
+ACCESS_TOKEN_TTL = int(os.environ.get('ACCESS_TOKEN_TTL', 300))
+REFRESH_TOKEN_TTL = int(os.environ.get('REFRESH_TOKEN_TTL', 30 * 24 * 3600))
+TOKEN_REVOCATION_REFRESH = int(os.environ.get('TOKEN_REVOCATION_REFRESH', 5))
+
+
+# Cache de los listados de tags e ingredientes (ver recipe/cache.py).
+# Con LIST_CACHE_ALIAS se usa un alias de CACHES compartido entre
+# procesos; por defecto, un LRU en memoria de cada proceso.
+
+LIST_CACHE_MAX_SIZE = int(os.environ.get('LIST_CACHE_MAX_SIZE', 10000))
+LIST_CACHE_TTL = int(os.environ.get('LIST_CACHE_TTL', 300))
+LIST_CACHE_ALIAS = os.environ.get('LIST_CACHE_ALIAS') or None
+
+
+# Tiempos por pedido (ver core/timing.py): cabecera Server-Timing y log
+# de los pedidos que tardan mas de SLOW_REQUEST_MS, con sus
+# SLOW_REQUEST_QUERIES consultas mas lentas.
+
+SERVER_TIMING_HEADER = os.environ.get('SERVER_TIMING_HEADER', '1') == '1'
+SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 500))
+SLOW_REQUEST_QUERIES = int(os.environ.get('SLOW_REQUEST_QUERIES', 5))
+
+
+# Perfilado por muestreo (ver core/profiling.py): 1 de cada
+# PROFILE_SAMPLE_RATE pedidos a recetas y al usuario (0 = solo los de
+# staff con la cabecera X-Profile: 1). Se conservan los ultimos
+# PROFILE_MAX_FILES perfiles en PROFILE_DIR.
+
+PROFILE_SAMPLE_RATE = int(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', '/vol/web/profiles')
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 50))
+
+
+# Estadisticas del recetario (ver recipe/stats.py): limites de los
+# rangos de los histogramas de precio y de duracion en minutos (si se
+# cambian hay que correr rebuild_recipe_stats) y cuantas tags e
+# ingredientes mas usados se muestran.
+
+RECIPE_STATS_PRICE_BUCKETS = (100, 250, 500, 1000, 2500, 5000)
+RECIPE_STATS_TIME_BUCKETS = (15, 30, 60, 120, 240)
+RECIPE_STATS_TOP = int(os.environ.get('RECIPE_STATS_TOP', 10))
@@ -18,9 +18,24 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from core import views as core_views
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('health/live/', core_views.live, name='health-live'),
+    path('health/ready/', core_views.ready, name='health-ready'),
+    path('metrics', core_views.metrics_view, name='metrics'),
+    path(
+        'api/profiles/',
+        core_views.ProfileListView.as_view(),
+        name='profile-list'
+    ),
+    path(
+        'api/profiles/<str:name>/',
+        core_views.ProfileDetailView.as_view(),
+        name='profile-detail'
+    ),
     path('api/user/', include('user.urls')),
     path('api/recipe/',include('recipe.urls')),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
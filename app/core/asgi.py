@@ -0,0 +1,209 @@
+"""Adaptador ASGI para la aplicacion WSGI de Django.
+
+Django 2.1 no tiene vistas asincronicas, pero lo que mas ocupa a un
+worker sincronico con clientes lentos no es la vista sino la red:
+recibir el cuerpo (una imagen subida por un celular) y enviar la
+respuesta. ThreadPoolASGIHandler hace esa parte en el event loop y solo
+usa un thread del pool para correr Django una vez que el cuerpo llego
+completo. Un worker atiende asi muchas conexiones lentas a la vez con
+ASGI_THREADS threads, que tambien acotan las conexiones a la base.
+
+Las respuestas en streaming (la exportacion) generan cada bloque en el
+pool y lo envian desde el loop, asi un cliente que lee despacio no
+retiene un thread entre bloque y bloque.
+
+A diferencia de asgiref.wsgi.WsgiToAsgi, que corre todos los pedidos
+en un unico thread, los pedidos se atienden en paralelo en el pool.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+THREADS = getattr(settings, 'ASGI_THREADS', 8)
+MAX_BODY_BYTES = getattr(
+    settings,
+    'ASGI_MAX_BODY_BYTES',
+    getattr(settings, 'RECIPE_IMAGE_MAX_BYTES', 10 * 1024 * 1024) +
+    1024 * 1024
+)
+
+# Cuerpos mas grandes que esto se guardan en disco mientras llegan.
+SPOOL_BYTES = 1024 * 1024
+
+_finished = object()
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+def build_environ(scope, body):
+    """Arma el environ de WSGI para un scope HTTP de ASGI."""
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin1'),
+        'PATH_INFO': scope['path'].encode().decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_PROTOCOL': f'HTTP/{scope["http_version"]}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    server = scope.get('server') or ('localhost', 80)
+    environ['SERVER_NAME'] = server[0]
+    environ['SERVER_PORT'] = str(server[1])
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+        environ['REMOTE_PORT'] = str(scope['client'][1])
+
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1')
+        value = value.decode('latin1')
+        if name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        elif name == 'content-type':
+            key = 'CONTENT_TYPE'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        if key in environ:
+            value = environ[key] + ',' + value
+        environ[key] = value
+    return environ
+
+
+class ThreadPoolASGIHandler:
+    """Aplicacion ASGI que corre `wsgi_application` en un pool de
+    `threads` threads."""
+
+    def __init__(self, wsgi_application, threads=None,
+                 max_body_bytes=None):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads or THREADS,
+            thread_name_prefix='asgi'
+        )
+        self.max_body_bytes = max_body_bytes or MAX_BODY_BYTES
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def http(self, scope, receive, send):
+        body = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+        try:
+            try:
+                if not await self.read_body(scope, receive, body):
+                    # El cliente se desconecto antes de terminar.
+                    return
+            except BodyTooLarge:
+                await self.send_simple(send, 413, b'Request Entity Too Large')
+                return
+            body.seek(0)
+            environ = build_environ(scope, body)
+            status, headers, response = await self.run(
+                self.get_response, environ
+            )
+        finally:
+            body.close()
+
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': headers,
+        })
+        if not getattr(response, 'streaming', False):
+            await send({'type': 'http.response.body', 'body': response})
+            return
+        try:
+            iterator = iter(response)
+            while True:
+                chunk = await self.run(next, iterator, _finished)
+                if chunk is _finished:
+                    break
+                if chunk:
+                    await send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+            await send({'type': 'http.response.body'})
+        finally:
+            if hasattr(response, 'close'):
+                await self.run(response.close)
+
+    async def read_body(self, scope, receive, body):
+        """Copia el cuerpo a `body` a medida que llega. Retorna False si
+        el cliente se desconecto."""
+        for name, value in scope.get('headers', []):
+            if name == b'content-length' and value.isdigit() and \
+                    int(value) > self.max_body_bytes:
+                raise BodyTooLarge()
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return False
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body_bytes:
+                raise BodyTooLarge()
+            body.write(chunk)
+            if not message.get('more_body', False):
+                return True
+
+    async def run(self, func, *args):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    def get_response(self, environ):
+        """Corre en el pool. Las respuestas comunes se leen y cierran en
+        el mismo thread que las genero; las de streaming se retornan
+        sin consumir."""
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [
+                (name.lower().encode('latin1'), value.encode('latin1'))
+                for name, value in headers
+            ]
+
+        response = self.wsgi_application(environ, start_response)
+        if getattr(response, 'streaming', False):
+            return started['status'], started['headers'], response
+        try:
+            content = b''.join(response)
+        finally:
+            # En Django dispara request_finished, que libera la conexion
+            # a la base.
+            if hasattr(response, 'close'):
+                response.close()
+        return started['status'], started['headers'], content
+
+    async def send_simple(self, send, status, content):
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'text/plain')],
+        })
+        await send({'type': 'http.response.body', 'body': content})
@@ -0,0 +1,115 @@
+import pickle
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import BaseAuthentication, \
+    TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from core import metrics, tokens
+from core.cache import LRUCache
+
+
+token_cache = LRUCache(
+    max_size=getattr(settings, 'TOKEN_CACHE_MAX_SIZE', 10000),
+    ttl=getattr(settings, 'TOKEN_CACHE_TTL', 300),
+)
+
+
+def shared_token_cache():
+    """Retorna el cache compartido entre procesos, si esta configurado."""
+    alias = getattr(settings, 'TOKEN_CACHE_ALIAS', None)
+    return caches[alias] if alias else None
+
+
+def token_cache_key(key):
+    # El 2 es la version del formato de la entrada, (token, cacheado en).
+    return f'auth-token:2:{key}'
+
+
+def invalidate_token(key):
+    """Elimina un token de los caches local y compartido."""
+    token_cache.delete(key)
+    shared = shared_token_cache()
+    if shared is not None:
+        shared.delete(token_cache_key(key))
+
+
+def invalidate_user_tokens(user):
+    """Elimina de los caches los tokens de un usuario."""
+    keys = Token.objects.filter(user=user).values_list('key', flat=True)
+    for key in keys:
+        invalidate_token(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Autenticacion por token que evita consultar Token + User en cada
+    pedido. Los tokens validados se guardan en un LRU del proceso y,
+    opcionalmente, en el cache compartido TOKEN_CACHE_ALIAS."""
+
+    def authenticate_credentials(self, key):
+        data = token_cache.get(key)
+        result = 'hit'
+        shared = shared_token_cache()
+        if data is None and shared is not None:
+            data = shared.get(token_cache_key(key))
+            result = 'shared_hit'
+            if data is not None:
+                token_cache.set(key, data)
+        if data is None:
+            result = 'miss'
+        metrics.CACHE.labels('token', result).inc()
+
+        if data is not None:
+            # Cada pedido recibe su propia copia del usuario, para que
+            # modificarlo no altere la entrada compartida del cache.
+            token, cached_at = pickle.loads(data)
+            # Las senales solo limpian el cache de este proceso; un
+            # borrado o una desactivacion en otro llegan por la lista de
+            # revocaciones.
+            if token.user.is_active and \
+                    not tokens.revocations.is_key_revoked(key) and \
+                    not tokens.revocations.user_revoked_since(
+                        token.user_id, cached_at
+                    ):
+                return (token.user, token)
+            invalidate_token(key)
+
+        # Antes de leer el usuario, para no perder una revocacion hecha
+        # mientras tanto.
+        cached_at = time.time()
+        user, token = super().authenticate_credentials(key)
+        # Este pedido ya consulta la base: si hace falta releer las
+        # revocaciones, que sea ahora y no en un acierto.
+        tokens.revocations.refresh()
+        data = pickle.dumps((token, cached_at))
+        token_cache.set(key, data)
+        if shared is not None:
+            shared.set(token_cache_key(key), data, token_cache.ttl)
+        return (user, token)
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """Autenticacion con los tokens de acceso firmados de core/tokens.py
+    (cabecera "Authorization: Bearer <token>"). No consulta la base:
+    request.user se arma con los datos del token y request.auth son
+    esos datos."""
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise AuthenticationFailed(_('Cabecera Bearer invalida.'))
+        try:
+            claims = tokens.verify_access(auth[1].decode())
+        except (tokens.InvalidToken, UnicodeError):
+            raise AuthenticationFailed(_('Token invalido o vencido.'))
+        return tokens.user_from_claims(claims), claims
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -0,0 +1,171 @@
+"""Utilidades compartidas por los comandos benchmark_*: una base de datos
+temporal para no tocar la real, datos sinteticos y estadisticas."""
+import contextlib
+import math
+import random
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test.utils import CaptureQueriesContext
+
+from core.models import Tag, Ingredient, Recipe
+
+
+WORDS = (
+    'pollo carne cerdo pescado arroz fideos papa batata zapallo tomate '
+    'cebolla ajo morron zanahoria lentejas garbanzos queso huevo leche '
+    'harina azucar chocolate limon naranja manzana banana frutilla palta '
+    'espinaca acelga brocoli hongos albahaca oregano comino curry '
+    'guiso tarta sopa ensalada milanesa empanada pizza flan torta budin '
+    'horno parrilla frito salteado casero rapido vegano picante dulce'
+).split()
+
+
+@contextlib.contextmanager
+def benchmark_database(keepdb=False, verbosity=0):
+    """Crea la base de test (test_<NAME>) y la elimina al terminar.
+    Con keepdb se conserva para reutilizar los datos sembrados."""
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(
+        verbosity=verbosity,
+        autoclobber=True,
+        keepdb=keepdb
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity, keepdb)
+
+
+def benchmark_user(email='benchmark@francorueta.com'):
+    """Retorna el usuario de benchmark, creandolo si no existe."""
+    user = get_user_model().objects.filter(email=email).first()
+    return user or get_user_model().objects.create_user(email, 'bench1234')
+
+
+def random_title(rng):
+    return ' '.join(rng.sample(WORDS, 3)).capitalize()
+
+
+def next_id(model):
+    return (model.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+
+
+def seed(user, recipes, tags=100, ingredients=300, attrs_per_recipe=3,
+         batch_size=5000, rng=None):
+    """Siembra recetas sinteticas con tags e ingredientes para el
+    usuario. Asigna los ids explicitamente para poder insertar las
+    filas intermedias con bulk_create en cualquier motor."""
+    from recipe import search, stats
+    from recipe.cache import list_cache
+
+    rng = rng or random.Random(0)
+    with transaction.atomic():
+        tag_ids = seed_attrs(Tag, user, tags, rng)
+        ingredient_ids = seed_attrs(Ingredient, user, ingredients, rng)
+
+    recipe_ids = []
+    start = next_id(Recipe)
+    for offset in range(0, recipes, batch_size):
+        ids = range(start + offset, start + min(offset + batch_size, recipes))
+        with transaction.atomic():
+            Recipe.objects.bulk_create(
+                Recipe(
+                    id=recipe_id,
+                    user=user,
+                    title=random_title(rng),
+                    time_minutes=rng.randint(5, 240),
+                    price=round(rng.uniform(50, 5000), 2)
+                )
+                for recipe_id in ids
+            )
+            Recipe.tags.through.objects.bulk_create(
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                for recipe_id in ids
+                for tag_id in rng.sample(tag_ids, attrs_per_recipe)
+            )
+            Recipe.ingredients.through.objects.bulk_create(
+                Recipe.ingredients.through(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id
+                )
+                for recipe_id in ids
+                for ingredient_id in rng.sample(
+                    ingredient_ids,
+                    attrs_per_recipe
+                )
+            )
+            search.index_recipes(ids)
+        recipe_ids.extend(ids)
+
+    reset_sequences()
+    # bulk_create no dispara las señales que invalidan estos datos.
+    stats.invalidate([user.id])
+    for model in (Tag, Ingredient, Recipe):
+        list_cache.invalidate(model, user.id)
+    return recipe_ids
+
+
+def seed_attrs(model, user, amount, rng):
+    """Siembra tags o ingredientes con nombres unicos."""
+    start = next_id(model)
+    ids = list(range(start, start + amount))
+    model.objects.bulk_create(
+        model(id=obj_id, user=user, name=f'{rng.choice(WORDS)} {obj_id}')
+        for obj_id in ids
+    )
+    return ids
+
+
+def reset_sequences():
+    """Reinicia las secuencias de id despues de insertar ids explicitos."""
+    statements = connection.ops.sequence_reset_sql(
+        no_style(),
+        [Tag, Ingredient, Recipe]
+    )
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def percentile(samples, fraction):
+    """Percentil por rango mas cercano de una lista de muestras."""
+    ordered = sorted(samples)
+    index = max(0, math.ceil(fraction * len(ordered)) - 1)
+    return ordered[index]
+
+
+def summarize(samples):
+    """Resume tiempos en segundos como milisegundos."""
+    return {
+        'p50': percentile(samples, 0.50) * 1000,
+        'p95': percentile(samples, 0.95) * 1000,
+        'max': max(samples) * 1000,
+    }
+
+
+def measure(call, repeat):
+    """Ejecuta call() `repeat` veces y retorna sus latencias en ms
+    (p50/p95/max). Una llamada extra, fuera de la medicion de tiempos
+    porque tracemalloc la hace mas lenta, cuenta las consultas y el
+    pico de memoria asignada en KB."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - start)
+    stats = summarize(samples)
+
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as context:
+            call()
+        stats['peak_kb'] = tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+    stats['queries'] = len(context.captured_queries)
+    return stats
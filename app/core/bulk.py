@@ -0,0 +1,122 @@
+"""Escrituras masivas que funcionan igual en todos los motores."""
+from django.db import IntegrityError, connection, transaction
+from django.db.models.functions import Lower
+
+
+def capped_batch_size(model, objs, batch_size):
+    """Django 2.1 no limita un batch_size explicito al maximo del motor
+    (SQLite acepta 999 parametros por consulta)."""
+    fields = model._meta.concrete_fields
+    limit = connection.ops.bulk_batch_size(fields, objs)
+    return min(batch_size, max(limit, 1))
+
+
+def bulk_create(model, objs, batch_size=1000):
+    """Inserta los objetos con bulk_create y retorna la lista con sus ids.
+    Los motores que no devuelven ids en un INSERT masivo (SQLite en
+    Django 2.1) guardan fila por fila, ya que los ids hacen falta para
+    las tablas intermedias."""
+    objs = list(objs)
+    if connection.features.can_return_ids_from_bulk_insert:
+        return model.objects.bulk_create(
+            objs,
+            batch_size=capped_batch_size(model, objs, batch_size)
+        )
+    for obj in objs:
+        obj.save(force_insert=True)
+    return objs
+
+
+def bulk_add_m2m(field, pairs, batch_size=1000):
+    """Inserta filas (origen, destino) en la tabla intermedia de un
+    ManyToManyField, por ejemplo Recipe.tags, en un solo INSERT por lote.
+    No verifica duplicados: se usa con objetos recien creados.
+    Arma el INSERT directamente: con millones de filas, instanciar un
+    modelo por fila era la mayor parte del tiempo."""
+    through = field.through
+    quote = connection.ops.quote_name
+    columns = [
+        through._meta.get_field(name).column for name in (
+            field.field.m2m_field_name(),
+            field.field.m2m_reverse_field_name(),
+        )
+    ]
+    pairs = list(pairs)
+    limit = connection.ops.bulk_batch_size(columns, pairs)
+    batch_size = min(batch_size, max(limit, 1))
+    with connection.cursor() as cursor:
+        for start in range(0, len(pairs), batch_size):
+            batch = pairs[start:start + batch_size]
+            cursor.execute(
+                'INSERT INTO {table} ({columns}) VALUES {values}'.format(
+                    table=quote(through._meta.db_table),
+                    columns=', '.join(quote(column) for column in columns),
+                    values=', '.join(['(%s, %s)'] * len(batch))
+                ),
+                [value for pair in batch for value in pair]
+            )
+
+
+def lower_names(names, batch_size=500):
+    """Retorna {nombre: LOWER(nombre)} calculado por la base, con la
+    misma funcion que el indice unico sobre (user_id, lower(name)).
+    str.lower() no sirve como clave: LOWER de SQLite (y de Postgres con
+    collation C) solo cambia letras ASCII, asi 'Ñoqui' no encontraria
+    su fila. Hace una consulta por lote de batch_size nombres."""
+    names = list(dict.fromkeys(names))
+    keys = {}
+    with connection.cursor() as cursor:
+        for start in range(0, len(names), batch_size):
+            batch = names[start:start + batch_size]
+            cursor.execute(
+                'SELECT ' + ', '.join(['LOWER(%s)'] * len(batch)),
+                batch
+            )
+            keys.update(zip(batch, cursor.fetchone()))
+    return keys
+
+
+def ids_by_name(model, user, keys, batch_size=500):
+    """Retorna {LOWER(nombre): id} de los objetos del usuario cuyo
+    nombre, sin distinguir mayusculas, esta en `keys` (ya pasados por
+    lower_names). Hace una consulta por lote de batch_size nombres."""
+    queryset = model.objects.filter(user=user).annotate(
+        lower_name=Lower('name')
+    )
+    ids = {}
+    for start in range(0, len(keys), batch_size):
+        ids.update(queryset.filter(
+            lower_name__in=keys[start:start + batch_size]
+        ).values_list('lower_name', 'id'))
+    return ids
+
+
+def get_or_create_by_name(model, user, names):
+    """Retorna {nombre: id} y crea en bloque los nombres que faltan. El
+    indice unico sobre (user_id, lower(name)) evita duplicados si otro
+    pedido crea el mismo nombre a la vez: en ese caso se vuelve a buscar
+    una vez. Los nombres que aun asi no se resuelven no aparecen en el
+    resultado. Debe correr dentro de una transaccion."""
+    keys = lower_names(names)
+    wanted = {}
+    for name, key in keys.items():
+        wanted.setdefault(key, name)
+    ids = {}
+    for attempt in range(2):
+        ids.update(ids_by_name(
+            model, user, [key for key in wanted if key not in ids]
+        ))
+        missing = [
+            model(user=user, name=name)
+            for key, name in wanted.items() if key not in ids
+        ]
+        if not missing:
+            break
+        try:
+            with transaction.atomic():
+                created = bulk_create(model, missing)
+        except IntegrityError:
+            continue
+        ids.update((keys[obj.name], obj.id) for obj in created)
+        break
+    return {name: ids[key] for name, key in keys.items() if key in ids}
@@ -0,0 +1,102 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, \
+    patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+
+class ConditionalGetMixin:
+    """Agrega ETag a list y retrieve, calculado con una sola consulta
+    (maximo modified_at + cantidad de filas), y responde 304 Not
+    Modified sin serializar nada cuando el cliente ya tiene la ultima
+    version. El modelo debe tener un campo `modified_at`.
+
+    Solo retrieve agrega Last-Modified: en un listado el maximo
+    modified_at no cambia al borrar filas, y la precision de un segundo
+    de If-Modified-Since no distingue dos cambios seguidos; el ETag si,
+    porque incluye la cantidad de filas."""
+
+    def get_conditional_queryset(self):
+        """Filas que determinan la respuesta. Las vistas pueden
+        sobreescribirlo para quitar anotaciones que no afectan el
+        resultado y complican el agregado."""
+        return self.filter_queryset(
+            self.get_queryset()
+        ).prefetch_related(None)
+
+    def get_list_state(self):
+        """Retorna (ultima modificacion, version) del listado. La
+        version distingue, por ejemplo, un borrado que no cambia el
+        maximo modified_at."""
+        state = self.get_conditional_queryset().order_by().aggregate(
+            last_modified=Max('modified_at'),
+            count=Count('id')
+        )
+        return state['last_modified'], str(state['count'])
+
+    def list_state(self):
+        """get_list_state() calculado una sola vez por pedido."""
+        if not hasattr(self, '_list_state'):
+            self._list_state = self.get_list_state()
+        return self._list_state
+
+    def list(self, request, *args, **kwargs):
+        last_modified, version = self.list_state()
+        return self.conditional_response(
+            request,
+            self.get_etag(request, last_modified, version),
+            None,
+            lambda: super(ConditionalGetMixin, self).list(
+                request, *args, **kwargs
+            )
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        try:
+            last_modified = self.get_conditional_queryset().filter(**{
+                self.lookup_field: kwargs[lookup]
+            }).values_list('modified_at', flat=True).first()
+        except (TypeError, ValueError):
+            last_modified = None
+        return self.conditional_response(
+            request,
+            self.get_etag(request, last_modified, '1'),
+            self.get_timestamp(last_modified),
+            lambda: super(ConditionalGetMixin, self).retrieve(
+                request, *args, **kwargs
+            )
+        )
+
+    def get_etag(self, request, last_modified, version):
+        """ETag fuerte: depende del usuario, de la URL completa (filtros,
+        cursor) y del estado de las filas."""
+        key = '|'.join((
+            str(request.user.pk),
+            request.get_full_path(),
+            last_modified.isoformat() if last_modified else '',
+            version,
+        ))
+        return '"{}"'.format(hashlib.sha1(key.encode()).hexdigest())
+
+    def get_timestamp(self, last_modified):
+        return last_modified.timestamp() if last_modified else None
+
+    def conditional_response(self, request, etag, timestamp, render):
+        """Retorna un 304 si corresponde; si no, la respuesta de render()
+        con los encabezados de validacion."""
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=timestamp
+        )
+        if response is None:
+            response = render()
+            if response.status_code == 200:
+                response['ETag'] = etag
+                if timestamp is not None:
+                    response['Last-Modified'] = http_date(timestamp)
+        patch_vary_headers(response, ('Authorization',))
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
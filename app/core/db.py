@@ -0,0 +1,46 @@
+"""Ciclo de vida de las conexiones a la base de datos.
+
+Con CONN_MAX_AGE cada worker conserva su conexion entre pedidos, en
+lugar de abrir una nueva en cada uno. check_connections revisa cada
+DB_HEALTH_CHECK_INTERVAL segundos que la conexion guardada siga viva
+(por ejemplo despues de reiniciar Postgres) y la descarta si no, para
+que el pedido abra una nueva en vez de fallar en su primera consulta.
+"""
+import time
+
+from django.conf import settings
+from django.db import connections
+
+
+HEALTH_CHECK_INTERVAL = getattr(settings, 'DB_HEALTH_CHECK_INTERVAL', 30)
+
+
+def ping(alias='default'):
+    """Hace una consulta real a la base. Lanza OperationalError si no
+    se puede conectar."""
+    with connections[alias].cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+def backoff_delays(initial=0.1, maximum=5.0, factor=2):
+    """Genera esperas crecientes exponencialmente hasta `maximum`."""
+    delay = initial
+    while True:
+        yield delay
+        delay = min(delay * factor, maximum)
+
+
+def check_connections(**kwargs):
+    """Receptor de request_started: cierra las conexiones persistentes
+    que dejaron de responder."""
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+        checked = getattr(connection, 'health_checked_at', None)
+        if checked is not None and now - checked < HEALTH_CHECK_INTERVAL:
+            continue
+        connection.health_checked_at = now
+        if not connection.is_usable():
+            connection.close()
@@ -0,0 +1,83 @@
+"""Fusion de tags e ingredientes repetidos ("Tomate" y "tomate") de un
+mismo usuario. Lo usan la migracion 0007, antes de crear el indice
+unico, y el comando dedup_recipe_attrs.
+
+Recibe las clases de modelo por parametro para funcionar tambien con
+los modelos historicos de una migracion.
+"""
+from django.db import transaction
+from django.db.models import Count, Min
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+
+def recipe_field(model, recipe_model):
+    """Retorna el ManyToManyField de Recipe que apunta al modelo."""
+    label = model._meta.label_lower
+    for field in recipe_model._meta.many_to_many:
+        if field.related_model._meta.label_lower == label:
+            return field
+    raise LookupError(f'Recipe no tiene relacion con {label}')
+
+
+def duplicate_groups(model, using='default'):
+    """Grupos (usuario, nombre en minusculas) con mas de un objeto, con
+    el id mas chico como sobreviviente."""
+    return model.objects.using(using).annotate(
+        lower_name=Lower('name')
+    ).values('user_id', 'lower_name').annotate(
+        keep=Min('id'),
+        total=Count('id')
+    ).filter(total__gt=1).order_by()
+
+
+def merge_group(model, field, group, using='default'):
+    """Pasa las recetas de los repetidos al sobreviviente y borra los
+    repetidos. Retorna los ids de las recetas afectadas."""
+    through = field.remote_field.through.objects.using(using)
+    source = field.m2m_field_name() + '_id'
+    target = field.m2m_reverse_field_name() + '_id'
+    keep = group['keep']
+
+    losers = list(model.objects.using(using).annotate(
+        lower_name=Lower('name')
+    ).filter(
+        user_id=group['user_id'],
+        lower_name=group['lower_name']
+    ).exclude(id=keep).values_list('id', flat=True))
+    rows = through.filter(**{f'{target}__in': losers})
+    recipe_ids = set(rows.values_list(source, flat=True))
+    linked = set(through.filter(**{target: keep}).values_list(
+        source,
+        flat=True
+    ))
+
+    rows.delete()
+    through.bulk_create(
+        through.model(**{source: recipe_id, target: keep})
+        for recipe_id in recipe_ids - linked
+    )
+    model.objects.using(using).filter(id__in=losers).delete()
+    return recipe_ids
+
+
+def merge_duplicates(model, recipe_model, batch_size=500, using='default'):
+    """Fusiona los repetidos de a `batch_size` grupos por transaccion,
+    para no bloquear las tablas durante toda la operacion. Marca como
+    modificadas las recetas afectadas y retorna (grupos, recetas)."""
+    field = recipe_field(model, recipe_model)
+    merged = 0
+    recipe_ids = set()
+    while True:
+        groups = list(duplicate_groups(model, using)[:batch_size])
+        if not groups:
+            return merged, recipe_ids
+        with transaction.atomic(using=using):
+            changed = set()
+            for group in groups:
+                changed |= merge_group(model, field, group, using)
+            recipe_model.objects.using(using).filter(
+                id__in=changed
+            ).update(modified_at=timezone.now())
+        merged += len(groups)
+        recipe_ids |= changed
@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Exists, IntegerField, OuterRef, \
+    Subquery
+from django.db.models.functions import Coalesce
+
+from core.benchmark import benchmark_database, benchmark_user, seed, \
+    summarize
+from core.models import Tag, Recipe
+
+
+class Command(BaseCommand):
+    """Compara ?assigned_only=1 y ?with_counts=1 (EXISTS y subconsulta
+    correlacionada) contra un JOIN con DISTINCT / GROUP BY, para un
+    usuario con un catalogo grande de tags."""
+    help = 'Mide el listado de tags asignadas con N recetas y M tags.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--tags', type=int, default=20000)
+        parser.add_argument('--queries', type=int, default=20)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--keepdb', action='store_true')
+        parser.add_argument('--explain', action='store_true')
+
+    def handle(self, *args, **options):
+        with benchmark_database(keepdb=options['keepdb']):
+            user = benchmark_user()
+            missing = options['recipes'] - Recipe.objects.filter(
+                user=user
+            ).count()
+            if missing > 0:
+                self.stdout.write(f'Sembrando {missing} recetas...')
+                seed(user, missing, tags=options['tags'])
+            self.run(user, options)
+
+    def run(self, user, options):
+        tags = Tag.objects.filter(user=user)
+        rows = Recipe.tags.through.objects.filter(tag=OuterRef('pk'))
+        counts = rows.order_by().values('tag').annotate(
+            total=Count('*')
+        ).values('total')
+        size = options['page_size']
+        variants = (
+            ('exists', tags.annotate(
+                assigned=Exists(rows)
+            ).filter(assigned=True)),
+            ('distinct', tags.filter(recipe__isnull=False).distinct()),
+            ('subquery', tags.annotate(recipe_count=Coalesce(
+                Subquery(counts, output_field=IntegerField()),
+                0
+            ))),
+            ('group_by', tags.annotate(recipe_count=Count('recipe'))),
+        )
+
+        for name, queryset in variants:
+            queryset = queryset.order_by('-name', 'id')[:size]
+            if options['explain']:
+                self.stdout.write(f'{name}:\n{queryset.explain()}')
+            samples = []
+            for _ in range(options['queries']):
+                start = time.perf_counter()
+                list(queryset.all())
+                samples.append(time.perf_counter() - start)
+            stats = summarize(samples)
+            self.stdout.write(
+                f'{name:<10} p50={stats["p50"]:.1f}ms '
+                f'p95={stats["p95"]:.1f}ms max={stats["max"]:.1f}ms'
+            )
@@ -0,0 +1,262 @@
+import asyncio
+import contextlib
+import io
+import socket
+import tempfile
+import threading
+import time
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, \
+    make_server
+
+import uvicorn
+from PIL import Image
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings, \
+    setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.asgi import ThreadPoolASGIHandler
+from core.benchmark import benchmark_database, benchmark_user, seed, \
+    summarize
+from core.models import Recipe
+
+
+BOUNDARY = 'benchmark-boundary'
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+
+class BacklogWSGIServer(WSGIServer):
+    # Con la cola por defecto (5) el kernel descarta conexiones y el
+    # cliente reintenta despues de un segundo, lo que mide otra cosa.
+    request_queue_size = 128
+
+
+def image_body():
+    """Cuerpo multipart con una imagen JPEG chica."""
+    content = io.BytesIO()
+    Image.new('RGB', (64, 64)).save(content, format='JPEG')
+    return (
+        f'--{BOUNDARY}\r\n'
+        'Content-Disposition: form-data; name="image"; '
+        'filename="imagen.jpg"\r\n'
+        'Content-Type: image/jpeg\r\n\r\n'
+    ).encode() + content.getvalue() + f'\r\n--{BOUNDARY}--\r\n'.encode()
+
+
+class Command(BaseCommand):
+    """Compara un worker WSGI sincronico (wsgiref, un pedido a la vez)
+    con un worker ASGI (uvicorn + core/asgi.py) mientras clientes lentos
+    suben imagenes: mide la latencia de los listados que llegan al
+    mismo tiempo."""
+    help = 'Compara WSGI y ASGI con clientes lentos concurrentes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument(
+            '--slow-clients',
+            type=int,
+            default=20,
+            help='Subidas de imagen concurrentes que envian el cuerpo '
+                 'despacio.'
+        )
+        parser.add_argument(
+            '--trickle',
+            type=float,
+            default=2.0,
+            help='Segundos que tarda cada cliente lento en enviar el '
+                 'cuerpo.'
+        )
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--concurrency', type=int, default=5)
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help='Threads del pool ASGI. Con SQLite usar 1: no admite '
+                 'escrituras concurrentes.'
+        )
+        parser.add_argument('--keepdb', action='store_true')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        try:
+            with tempfile.TemporaryDirectory() as media_root, \
+                    override_settings(MEDIA_ROOT=media_root,
+                                      RECIPE_IMAGE_WORKERS=0), \
+                    benchmark_database(keepdb=options['keepdb']):
+                self.run(options)
+        finally:
+            teardown_test_environment()
+
+    def run(self, options):
+        user = benchmark_user()
+        missing = options['recipes'] - Recipe.objects.filter(
+            user=user
+        ).count()
+        if missing > 0:
+            self.stdout.write(f'Sembrando {missing} recetas...')
+            seed(user, missing)
+        token, _ = Token.objects.get_or_create(user=user)
+        recipe_ids = list(
+            Recipe.objects.filter(user=user).order_by('id').values_list(
+                'id', flat=True
+            )[:options['slow_clients']]
+        )
+
+        servers = (
+            ('wsgi', self.serve_wsgi()),
+            ('asgi', self.serve_asgi(options['threads'])),
+        )
+        for name, server in servers:
+            with server as port:
+                client = Client(port, token.key)
+                results = asyncio.run(
+                    self.load(client, recipe_ids, options)
+                )
+            self.report(name, *results)
+
+    @contextlib.contextmanager
+    def serve_wsgi(self):
+        server = make_server(
+            '127.0.0.1', 0, get_wsgi_application(),
+            server_class=BacklogWSGIServer,
+            handler_class=QuietHandler
+        )
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            yield server.server_port
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+    @contextlib.contextmanager
+    def serve_asgi(self, threads):
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        config = uvicorn.Config(
+            ThreadPoolASGIHandler(get_wsgi_application(), threads=threads),
+            lifespan='on',
+            log_level='warning',
+            access_log=False
+        )
+        server = uvicorn.Server(config)
+        thread = threading.Thread(
+            target=server.run,
+            kwargs={'sockets': [sock]}
+        )
+        thread.start()
+        while not server.started and thread.is_alive():
+            time.sleep(0.01)
+        try:
+            yield sock.getsockname()[1]
+        finally:
+            server.should_exit = True
+            thread.join()
+            sock.close()
+
+    async def load(self, client, recipe_ids, options):
+        """Mantiene las subidas lentas en curso (cada cliente lento
+        vuelve a subir apenas termina) mientras se hacen los listados.
+        Retorna (latencias de los listados, segundos totales, subidas
+        completadas, errores)."""
+        body = image_body()
+        content_type = f'multipart/form-data; boundary={BOUNDARY}'
+        done = asyncio.Event()
+
+        async def uploader(recipe_id):
+            url = reverse('recipe:recipe-upload-image', args=[recipe_id])
+            statuses = []
+            while not done.is_set():
+                statuses.append(await client.request(
+                    'POST', url, body, content_type,
+                    trickle=options['trickle']
+                ))
+            return statuses
+
+        async def lister():
+            url = reverse('recipe:recipe-list')
+            results = []
+            for _ in range(per_worker):
+                start = time.perf_counter()
+                status = await client.request('GET', url)
+                results.append((time.perf_counter() - start, status))
+            return results
+
+        uploaders = [
+            asyncio.ensure_future(uploader(recipe_id))
+            for recipe_id in recipe_ids
+        ]
+        # Las subidas ya ocupan el servidor cuando llegan los listados.
+        await asyncio.sleep(options['trickle'] / 2)
+        per_worker = max(options['requests'] // options['concurrency'], 1)
+        start = time.perf_counter()
+        listed = await asyncio.gather(
+            *(lister() for _ in range(options['concurrency']))
+        )
+        elapsed = time.perf_counter() - start
+        done.set()
+        uploaded = await asyncio.gather(*uploaders)
+
+        listed = [result for results in listed for result in results]
+        uploaded = [status for statuses in uploaded for status in statuses]
+        errors = sum(status != 200 for _, status in listed) + \
+            sum(status != 200 for status in uploaded)
+        return (
+            [latency for latency, _ in listed],
+            elapsed,
+            len(uploaded),
+            errors
+        )
+
+    def report(self, name, samples, elapsed, uploads, errors):
+        stats = summarize(samples)
+        self.stdout.write(
+            f'{name}: listados p50={stats["p50"]:.1f}ms '
+            f'p95={stats["p95"]:.1f}ms max={stats["max"]:.1f}ms '
+            f'({len(samples) / elapsed:.1f} pedidos/s), '
+            f'subidas={uploads}, errores={errors}'
+        )
+
+
+class Client:
+    """Cliente HTTP/1.1 minimo sobre asyncio, que puede enviar el cuerpo
+    en partes espaciadas para simular una conexion lenta."""
+
+    def __init__(self, port, token):
+        self.port = port
+        self.token = token
+
+    async def request(self, method, path, body=b'', content_type=None,
+                      trickle=0, parts=10):
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+        headers = [
+            f'{method} {path} HTTP/1.1',
+            'Host: testserver',
+            'Connection: close',
+            f'Authorization: Token {self.token}',
+            f'Content-Length: {len(body)}',
+        ]
+        if content_type:
+            headers.append(f'Content-Type: {content_type}')
+        writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode())
+        if trickle and body:
+            size = len(body) // parts + 1
+            for offset in range(0, len(body), size):
+                writer.write(body[offset:offset + size])
+                await writer.drain()
+                await asyncio.sleep(trickle / parts)
+        else:
+            writer.write(body)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        return int(response.split(b' ', 2)[1])
@@ -0,0 +1,281 @@
+import io
+import itertools
+import json
+import os
+import tempfile
+
+from PIL import Image
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings, \
+    setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import tokens
+from core.benchmark import benchmark_database, benchmark_user, measure, seed
+from core.models import Tag, Ingredient, Recipe
+from recipe.cache import list_cache
+
+
+BUDGETS_PATH = os.path.join(settings.BASE_DIR, 'benchmark_budgets.json')
+
+PASSWORD = 'bench1234'
+
+
+def sample_image():
+    content = io.BytesIO()
+    Image.new('RGB', (64, 64)).save(content, format='JPEG')
+    content.seek(0)
+    content.name = 'imagen.jpg'
+    return content
+
+
+class Command(BaseCommand):
+    """Recorre las rutas de recipe/urls.py y user/urls.py con el cliente
+    de test, sobre una base de test sembrada a varias escalas, y compara
+    latencia, consultas y memoria contra benchmark_budgets.json.
+    Termina con error si alguna ruta se pasa de su presupuesto."""
+    help = 'Mide cada endpoint de la API y verifica los presupuestos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales',
+            default='100,1000,10000',
+            help='Cantidades de recetas, separadas por coma.'
+        )
+        parser.add_argument('--requests', type=int, default=20)
+        parser.add_argument('--budgets', default=BUDGETS_PATH)
+        parser.add_argument(
+            '--write-budgets',
+            action='store_true',
+            help='Guarda los resultados (con margen) como presupuestos.'
+        )
+        parser.add_argument('--margin', type=float, default=2.0)
+        parser.add_argument('--keepdb', action='store_true')
+
+    def handle(self, *args, **options):
+        scales = sorted(int(scale) for scale in options['scales'].split(','))
+        setup_test_environment()
+        try:
+            # Las versiones de las imagenes se generan dentro del pedido
+            # de subida, para no medir con un thread escribiendo en
+            # paralelo.
+            with tempfile.TemporaryDirectory() as media_root, \
+                    override_settings(MEDIA_ROOT=media_root,
+                                      RECIPE_IMAGE_WORKERS=0), \
+                    benchmark_database(keepdb=options['keepdb']):
+                results = self.run(scales, options)
+        finally:
+            teardown_test_environment()
+
+        if options['write_budgets']:
+            self.write_budgets(results, options)
+            return
+        self.check_budgets(results, options['budgets'])
+
+    def run(self, scales, options):
+        user = benchmark_user()
+        client = APIClient()
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        # La lista de revocaciones se relee cada TOKEN_REVOCATION_REFRESH
+        # segundos, en el pedido que toque. Se lee una vez al empezar
+        # para que esa consulta no caiga en el conteo de una ruta al azar.
+        tokens.revocations.reload()
+        interval = tokens.revocations.interval
+        tokens.revocations.interval = float('inf')
+        try:
+            return self.measure_scales(client, user, scales, options)
+        finally:
+            tokens.revocations.interval = interval
+
+    def measure_scales(self, client, user, scales, options):
+        self.counter = itertools.count()
+        results = {}
+        for scale in scales:
+            missing = scale - Recipe.objects.filter(user=user).count()
+            if missing > 0:
+                self.stdout.write(f'Sembrando {missing} recetas...')
+                seed(user, missing)
+            self.stdout.write(f'\n{scale} recetas')
+            for name, call in self.scenarios(client, user):
+                stats = measure(call, options['requests'])
+                results.setdefault(name, {})[scale] = stats
+                self.stdout.write(
+                    f'  {name:<26} p50={stats["p50"]:7.1f}ms '
+                    f'p95={stats["p95"]:7.1f}ms '
+                    f'queries={stats["queries"]:3d} '
+                    f'peak={stats["peak_kb"]:8.0f}KB'
+                )
+        return results
+
+    def scenarios(self, client, user):
+        """Retorna (nombre, funcion) por ruta. Cada funcion hace un
+        pedido y verifica el codigo de respuesta."""
+        recipe = Recipe.objects.filter(user=user).order_by('-id').first()
+        tag = Tag.objects.filter(user=user).first()
+        ingredient = Ingredient.objects.filter(user=user).first()
+        # Nombres unicos entre escalas para los pedidos de creacion.
+        counter = self.counter
+
+        def request(method, url, expected, **kwargs):
+            def call():
+                data = kwargs.get('data')
+                res = getattr(client, method)(
+                    url,
+                    data() if callable(data) else data,
+                    format=kwargs.get('format', 'json')
+                )
+                if res.status_code != expected:
+                    raise CommandError(
+                        f'{method.upper()} {url}: {res.status_code}'
+                    )
+                if getattr(res, 'streaming', False):
+                    for _ in res.streaming_content:
+                        pass
+            return call
+
+        def cold(model, call):
+            """Mide `call` sin list_cache, es decir el camino que
+            consulta la base."""
+            def cold_call():
+                list_cache.invalidate(model, user.pk)
+                call()
+            return cold_call
+
+        tags_list = request('get', reverse('recipe:tag-list'), 200)
+        ingredients_list = request(
+            'get', reverse('recipe:ingredient-list'), 200
+        )
+        ingredients_assigned = request(
+            'get', reverse('recipe:ingredient-list'), 200,
+            data={'assigned_only': 1, 'with_counts': 1}
+        )
+        recipes_url = reverse('recipe:recipe-list')
+        detail_url = reverse('recipe:recipe-detail', args=[recipe.id])
+        return [
+            ('tags-list', tags_list),
+            ('tags-list-cold', cold(Tag, tags_list)),
+            ('tags-create', request(
+                'post', reverse('recipe:tag-list'), 201,
+                data=lambda: {'name': f'bench tag {next(counter)}'}
+            )),
+            ('ingredients-list', ingredients_list),
+            ('ingredients-list-cold', cold(Ingredient, ingredients_list)),
+            ('ingredients-assigned', ingredients_assigned),
+            ('ingredients-assigned-cold', cold(
+                Ingredient, ingredients_assigned
+            )),
+            ('recipes-list', request('get', recipes_url, 200)),
+            ('recipes-list-fields', request(
+                'get', recipes_url, 200, data={'fields': 'id,title'}
+            )),
+            ('recipes-filter', request(
+                'get', recipes_url, 200,
+                data={'tags': tag.id, 'ingredients': ingredient.id}
+            )),
+            ('recipes-search', request(
+                'get', recipes_url, 200, data={'search': 'pollo'}
+            )),
+            ('recipes-create', request(
+                'post', recipes_url, 201,
+                data={
+                    'title': 'Receta de benchmark',
+                    'time_minutes': 10,
+                    'price': '100.00',
+                    'tags': [tag.id],
+                    'ingredients': [ingredient.id],
+                }
+            )),
+            ('recipes-create-names', request(
+                'post', recipes_url, 201,
+                data=lambda: {
+                    'title': 'Receta de benchmark',
+                    'time_minutes': 10,
+                    'price': '100.00',
+                    'tag_names': [tag.name, f'bench tag {next(counter)}'],
+                    'ingredient_names': [ingredient.name],
+                }
+            )),
+            ('recipes-detail', request('get', detail_url, 200)),
+            ('recipes-stats', request(
+                'get', reverse('recipe:stats'), 200
+            )),
+            ('recipes-update', request(
+                'patch', detail_url, 200, data={'title': 'Editada'}
+            )),
+            ('recipes-upload-image', request(
+                'post',
+                reverse('recipe:recipe-upload-image', args=[recipe.id]),
+                200,
+                data=lambda: {'image': sample_image()},
+                format='multipart'
+            )),
+            ('recipes-export', request(
+                'get', reverse('recipe:recipe-export'), 200
+            )),
+            ('user-create', request(
+                'post', reverse('user:create'), 201,
+                data=lambda: {
+                    'email': f'bench{next(counter)}@francorueta.com',
+                    'password': PASSWORD,
+                    'name': 'Benchmark',
+                }
+            )),
+            ('user-token', request(
+                'post', reverse('user:token'), 200,
+                data={'email': user.email, 'password': PASSWORD}
+            )),
+            ('user-me', request('get', reverse('user:me'), 200)),
+        ]
+
+    def check_budgets(self, results, path):
+        """Compara el peor valor de cada ruta, entre todas las escalas,
+        con su presupuesto."""
+        try:
+            with open(path) as file:
+                budgets = json.load(file)
+        except FileNotFoundError:
+            raise CommandError(f'No existe {path}; usar --write-budgets.')
+
+        failures = []
+        for name, by_scale in sorted(results.items()):
+            budget = budgets.get(name)
+            if budget is None:
+                failures.append(f'{name}: sin presupuesto')
+                continue
+            for scale, stats in sorted(by_scale.items()):
+                for metric in ('p95', 'queries', 'peak_kb'):
+                    limit = budget.get(metric)
+                    if limit is not None and stats[metric] > limit:
+                        failures.append(
+                            f'{name} ({scale} recetas): {metric}='
+                            f'{stats[metric]:.1f} > {limit}'
+                        )
+        if failures:
+            raise CommandError(
+                'Presupuestos excedidos:\n  ' + '\n  '.join(failures)
+            )
+        self.stdout.write(self.style.SUCCESS('\nPresupuestos cumplidos.'))
+
+    def write_budgets(self, results, options):
+        """Guarda como presupuesto el peor valor de cada ruta por el
+        margen. Las consultas no llevan margen: deben ser exactas."""
+        budgets = {}
+        for name, by_scale in sorted(results.items()):
+            worst = {
+                metric: max(stats[metric] for stats in by_scale.values())
+                for metric in ('p95', 'queries', 'peak_kb')
+            }
+            budgets[name] = {
+                'p95': round(worst['p95'] * options['margin'], 1),
+                'queries': worst['queries'],
+                'peak_kb': round(worst['peak_kb'] * options['margin']),
+            }
+        with open(options['budgets'], 'w') as file:
+            json.dump(budgets, file, indent=4, sort_keys=True)
+            file.write('\n')
+        self.stdout.write(f'Presupuestos guardados en {options["budgets"]}.')
@@ -0,0 +1,101 @@
+import io
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from core import renderers
+from core.benchmark import benchmark_database, benchmark_user, seed, \
+    summarize
+from core.models import Ingredient, Recipe, Tag
+from recipe.serializers import RecipeDetailSerializer, RecipeSerializer
+
+
+class Command(BaseCommand):
+    """Compara JSONRenderer y JSONParser de DRF contra los de
+    core/renderers.py sobre listados de recetas ya serializados: solo
+    mide codificar y decodificar el cuerpo, no las consultas."""
+    help = 'Mide el renderer y el parser JSON con N recetas por pagina.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='50,500',
+            help='Recetas por pagina, separadas por coma.'
+        )
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--keepdb', action='store_true')
+
+    def handle(self, *args, **options):
+        if renderers.orjson is None:
+            self.stdout.write(
+                'orjson no esta instalado: se mide la alternativa sin el.'
+            )
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        with benchmark_database(keepdb=options['keepdb']):
+            user = benchmark_user()
+            missing = max(sizes) - Recipe.objects.filter(user=user).count()
+            if missing > 0:
+                self.stdout.write(f'Sembrando {missing} recetas...')
+                seed(user, missing)
+            for size in sizes:
+                self.run(user, size, options['repeat'])
+
+    def run(self, user, size, repeat):
+        recipes = list(
+            Recipe.objects.filter(user=user).order_by('-id').prefetch_related(
+                Prefetch('tags', queryset=Tag.objects.order_by('id')),
+                Prefetch(
+                    'ingredients',
+                    queryset=Ingredient.objects.order_by('id')
+                ),
+                'image_derivatives'
+            )[:size]
+        )
+        context = {'request': APIRequestFactory().get('/api/recipe/')}
+        payloads = (
+            ('list', RecipeSerializer(
+                recipes, many=True, context=context
+            ).data),
+            ('detail', RecipeDetailSerializer(
+                recipes, many=True, context=context
+            ).data),
+        )
+        for name, data in payloads:
+            content = JSONRenderer().render(data)
+            self.stdout.write(
+                f'{name} x{size} ({len(content) / 1024:.0f} KB):'
+            )
+            variants = (
+                ('render drf', lambda: JSONRenderer().render(data)),
+                ('render fast', lambda: renderers.FastJSONRenderer().render(
+                    data
+                )),
+                ('parse drf', lambda: JSONParser().parse(
+                    io.BytesIO(content), None, {}
+                )),
+                ('parse fast', lambda: renderers.FastJSONParser().parse(
+                    io.BytesIO(content), None, {}
+                )),
+            )
+            medians = {}
+            for variant, call in variants:
+                samples = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    call()
+                    samples.append(time.perf_counter() - start)
+                stats = summarize(samples)
+                medians[variant] = stats['p50']
+                self.stdout.write(
+                    f'  {variant:<12} p50={stats["p50"]:.2f}ms '
+                    f'p95={stats["p95"]:.2f}ms'
+                )
+            self.stdout.write(
+                f'  aceleracion: render '
+                f'{medians["render drf"] / medians["render fast"]:.1f}x, '
+                f'parse {medians["parse drf"] / medians["parse fast"]:.1f}x'
+            )
@@ -0,0 +1,82 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from core.benchmark import WORDS, benchmark_database, benchmark_user, seed, \
+    summarize
+from core.models import Recipe
+from recipe import search
+
+
+class Command(BaseCommand):
+    """Compara la busqueda de texto completo contra un icontains sobre
+    una base de test sembrada con recetas sinteticas."""
+    help = 'Mide el tiempo de ?search= con N recetas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000000)
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument(
+            '--keepdb',
+            action='store_true',
+            help='Conserva la base de test y sus datos entre corridas.'
+        )
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            help='Muestra el plan de la primera consulta.'
+        )
+
+    def handle(self, *args, **options):
+        with benchmark_database(keepdb=options['keepdb']):
+            user = benchmark_user()
+            missing = options['recipes'] - Recipe.objects.filter(
+                user=user
+            ).count()
+            if missing > 0:
+                self.stdout.write(f'Sembrando {missing} recetas...')
+                start = time.perf_counter()
+                seed(user, missing)
+                self.stdout.write(
+                    f'Sembrado en {time.perf_counter() - start:.1f}s'
+                )
+            self.run(user, options)
+
+    def run(self, user, options):
+        rng = random.Random(1)
+        terms = [
+            ' '.join(rng.sample(WORDS, rng.randint(1, 2)))
+            for _ in range(options['queries'])
+        ]
+        recipes = Recipe.objects.filter(user=user).defer('search_vector')
+        size = options['page_size']
+
+        def full_text(term):
+            queryset = search.search(recipes, term).order_by('-rank', '-id')
+            return queryset[:size]
+
+        def naive(term):
+            condition = Q()
+            for word in term.split():
+                condition &= Q(title__icontains=word) | \
+                    Q(tags__name__icontains=word) | \
+                    Q(ingredients__name__icontains=word)
+            return recipes.filter(condition).distinct().order_by('-id')[:size]
+
+        if options['explain']:
+            self.stdout.write(full_text(terms[0]).explain())
+
+        for name, build in (('search', full_text), ('icontains', naive)):
+            samples = []
+            for term in terms:
+                start = time.perf_counter()
+                list(build(term))
+                samples.append(time.perf_counter() - start)
+            stats = summarize(samples)
+            self.stdout.write(
+                f'{name:<10} p50={stats["p50"]:.1f}ms '
+                f'p95={stats["p95"]:.1f}ms max={stats["max"]:.1f}ms'
+            )
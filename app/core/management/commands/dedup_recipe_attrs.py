@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from core.dedup import duplicate_groups, merge_duplicates
+from core.models import Tag, Ingredient, Recipe
+from recipe import search, stats
+
+
+class Command(BaseCommand):
+    """Fusiona tags e ingredientes repetidos de cada usuario, sin
+    distinguir mayusculas, conservando el de menor id."""
+    help = 'Fusiona tags e ingredientes con el mismo nombre.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo informa cuantos grupos repetidos hay.'
+        )
+
+    def handle(self, *args, **options):
+        for model in (Tag, Ingredient):
+            name = model._meta.verbose_name_plural
+            if options['dry_run']:
+                total = duplicate_groups(model).count()
+                self.stdout.write(f'{name}: {total} grupos repetidos')
+                continue
+            merged, recipe_ids = merge_duplicates(
+                model,
+                Recipe,
+                batch_size=options['batch_size']
+            )
+            search.index_recipes(recipe_ids)
+            # Las filas intermedias se movieron sin m2m_changed.
+            stats.invalidate(self.users_of(recipe_ids))
+            self.stdout.write(
+                f'{name}: {merged} grupos fusionados, '
+                f'{len(recipe_ids)} recetas actualizadas'
+            )
+
+    def users_of(self, recipe_ids, batch_size=500):
+        recipe_ids = list(recipe_ids)
+        user_ids = set()
+        for start in range(0, len(recipe_ids), batch_size):
+            user_ids.update(Recipe.objects.filter(
+                id__in=recipe_ids[start:start + batch_size]
+            ).values_list('user_id', flat=True).distinct())
+        return user_ids
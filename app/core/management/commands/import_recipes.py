@@ -0,0 +1,89 @@
+import itertools
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.models import Tag, Ingredient
+from recipe.cache import list_cache
+from recipe.importer import InvalidRow, RecipeImporter, parse_row, \
+    read_rows
+
+
+class Command(BaseCommand):
+    """Importa recetas desde un archivo NDJSON o CSV (el formato de
+    /api/recipe/recipes/export/) para un usuario, en transacciones de
+    --chunk-size filas. Si una fila es invalida se detiene; los bloques
+    anteriores quedan importados."""
+    help = 'Importa recetas masivamente desde NDJSON o CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Archivo a importar, o - para stdin.')
+        parser.add_argument('--user', required=True, help='Email del dueño.')
+        parser.add_argument('--format', choices=('ndjson', 'csv'))
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='Usa COPY de Postgres en lugar de INSERT.'
+        )
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.filter(email=options['user']).first()
+        if user is None:
+            raise CommandError(f'No existe el usuario {options["user"]}.')
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('--copy solo esta disponible en Postgres.')
+
+        path = options['path']
+        output = options['format'] or (
+            'csv' if path.endswith('.csv') else 'ndjson'
+        )
+        if path == '-':
+            self.run(sys.stdin, output, user, options)
+        else:
+            with open(path, newline='', encoding='utf-8') as stream:
+                self.run(stream, output, user, options)
+
+    def run(self, stream, output, user, options):
+        importer = RecipeImporter(
+            user,
+            batch_size=options['batch_size'],
+            use_copy=options['copy']
+        )
+        rows = read_rows(stream, output)
+        total = 0
+        start = time.perf_counter()
+        try:
+            while True:
+                chunk = [
+                    parse_row(line_num, row) for line_num, row in
+                    itertools.islice(rows, options['chunk_size'])
+                ]
+                if not chunk:
+                    break
+                with transaction.atomic():
+                    importer.import_rows(chunk)
+                total += len(chunk)
+                self.report(total, start)
+        except InvalidRow as exc:
+            raise CommandError(f'{exc} Se importaron {total} recetas.')
+        finally:
+            list_cache.invalidate(Tag, user.pk)
+            list_cache.invalidate(Ingredient, user.pk)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Se importaron {total} recetas en {elapsed:.1f}s '
+            f'({total / elapsed if elapsed else 0:.0f} filas/s).'
+        ))
+
+    def report(self, total, start):
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'{total} recetas ({total / elapsed if elapsed else 0:.0f} '
+            'filas/s)'
+        )
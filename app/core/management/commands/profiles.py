@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import profiling
+
+
+class Command(BaseCommand):
+    """Lista los perfiles guardados por core/profiling.py o muestra el
+    resumen de uno."""
+    help = 'Lista los perfiles de pedidos o muestra uno.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', nargs='?')
+        parser.add_argument('--sort', default='cumulative')
+        parser.add_argument('--limit', type=int, default=40)
+
+    def handle(self, *args, **options):
+        name = options['name']
+        if name is None:
+            for profile in profiling.list_profiles():
+                self.stdout.write(
+                    f'{profile["name"]}  {profile["size"]} bytes'
+                )
+            return
+
+        path = profiling.profile_path(name)
+        if path is None:
+            raise CommandError(f'No existe el perfil {name}.')
+        try:
+            self.stdout.write(
+                profiling.summary(path, options['sort'], options['limit'])
+            )
+        except KeyError:
+            raise CommandError(f'Orden desconocido: {options["sort"]}')
@@ -0,0 +1,29 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe import stats
+
+
+class Command(BaseCommand):
+    """Recalcula desde las recetas el resumen de /api/recipe/stats/
+    (ver recipe/stats.py), por ejemplo despues de cambiar los rangos de
+    los histogramas o de modificar recetas con SQL."""
+    help = 'Recalcula las estadisticas de recetas de los usuarios.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Email del usuario; por defecto, todos.'
+        )
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.order_by('id')
+        if options['user']:
+            users = users.filter(email=options['user'])
+            if not users.exists():
+                raise CommandError(f'No existe el usuario {options["user"]}.')
+        total = 0
+        for user_id in users.values_list('id', flat=True).iterator():
+            stats.rebuild(user_id)
+            total += 1
+        self.stdout.write(f'{total} usuarios recalculados')
@@ -1,20 +1,34 @@
 import time
 
-from django.db import connections
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+
+from core.db import backoff_delays, ping
 
 
 class Command(BaseCommand):
     #Comando Django para pausar la ejecucion hasta que la DB este disponible.
-    
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=60,
+            help='Segundos maximos de espera.'
+        )
+        parser.add_argument('--database', default='default')
+
     def handle(self, *args, **options):
         self.stdout.write('\nEsperando a la base de datos, aguarde por favor.')
-        db_conn = None
-        while not db_conn:
+        deadline = time.monotonic() + options['timeout']
+        for delay in backoff_delays():
             try:
-                db_conn = connections['default']
+                ping(options['database'])
+                break
             except OperationalError:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError('La base de datos no respondio.')
                 self.stdout.write('Base de datos no disponible, reintentando...')
-                time.sleep(2)
+                time.sleep(min(delay, remaining))
         self.stdout.write(self.style.SUCCESS('¡La base de datos se ha iniciado!'))
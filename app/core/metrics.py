@@ -0,0 +1,95 @@
+"""Metricas de Prometheus.
+
+MetricsMiddleware cuenta los pedidos y su latencia por nombre de ruta
+(recipe:recipe-list, user:me, ...) en lugar de por URL, para que la
+cantidad de series no crezca con los ids. Las consultas por pedido
+salen del Timer de core/timing.py, asi que debe ir despues de
+ServerTimingMiddleware en MIDDLEWARE.
+
+Con varios procesos (gunicorn, uwsgi) hay que definir la variable de
+entorno PROMETHEUS_MULTIPROC_DIR con un directorio vacio antes de
+arrancar: cada proceso escribe sus valores en archivos mapeados en
+memoria y la vista /metrics los suma. Sin la variable, cada proceso
+expone solo los suyos.
+"""
+import os
+import time
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, \
+    REGISTRY, multiprocess
+
+from core import timing
+
+
+REQUESTS = Counter(
+    'http_requests_total',
+    'Pedidos HTTP por ruta, metodo y codigo de respuesta.',
+    ['route', 'method', 'status']
+)
+
+LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Duracion de los pedidos HTTP por ruta y metodo.',
+    ['route', 'method'],
+    buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+)
+
+QUERIES = Histogram(
+    'http_request_db_queries',
+    'Consultas SQL por pedido.',
+    ['route'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100)
+)
+
+CACHE = Counter(
+    'cache_requests_total',
+    'Lecturas de los caches de la aplicacion por resultado.',
+    ['cache', 'result']
+)
+
+IMAGE_UPLOAD_BYTES = Histogram(
+    'recipe_image_upload_bytes',
+    'Tamaño de las imagenes de recetas subidas.',
+    buckets=(
+        16 * 1024, 64 * 1024, 256 * 1024,
+        1024 ** 2, 2 * 1024 ** 2, 5 * 1024 ** 2, 10 * 1024 ** 2
+    )
+)
+
+
+def route_name(request):
+    """Nombre de la ruta resuelta; las URLs que no resuelven comparten
+    una sola serie."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.view_name:
+        return 'unmatched'
+    return match.view_name
+
+
+def registry():
+    """Registro a exponer: el agregado de todos los procesos en modo
+    multiproceso, o el del proceso actual."""
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    collector_registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(collector_registry)
+    return collector_registry
+
+
+class MetricsMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        route = route_name(request)
+        REQUESTS.labels(route, request.method, response.status_code).inc()
+        LATENCY.labels(route, request.method).observe(elapsed)
+        timer = timing.current()
+        if timer is not None:
+            QUERIES.labels(route).observe(timer.query_count)
+        return response
@@ -0,0 +1,69 @@
+# Generated by Django 2.1.15 on 2026-10-17 22:39
+
+from django.db import migrations, models
+
+
+# (tabla, indice, columnas). Las tablas intermedias solo tienen indice
+# unico (recipe_id, x_id); los filtros por tag/ingrediente necesitan el
+# orden inverso. Esos dos no estan en el estado de los modelos.
+INDEXES = (
+    ('core_recipe', 'core_recipe_user_id_idx', '(user_id, id DESC)'),
+    ('core_recipe_tags', 'core_recipe_tags_tag_recipe_idx',
+     '(tag_id, recipe_id)'),
+    ('core_recipe_ingredients', 'core_recipe_ingredients_ingr_recipe_idx',
+     '(ingredient_id, recipe_id)'),
+)
+
+
+def concurrently(schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        return 'CONCURRENTLY '
+    return ''
+
+
+def create_indexes(apps, schema_editor):
+    """En Postgres crea los indices con CONCURRENTLY, sin bloquear las
+    escrituras en las recetas. Un indice invalido de una corrida
+    anterior que fallo se borra y se vuelve a crear."""
+    for table, name, columns in INDEXES:
+        schema_editor.execute(
+            f'DROP INDEX {concurrently(schema_editor)}IF EXISTS {name}'
+        )
+        schema_editor.execute(
+            f'CREATE INDEX {concurrently(schema_editor)}{name} '
+            f'ON {table} {columns}'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    for table, name, columns in INDEXES:
+        schema_editor.execute(
+            f'DROP INDEX {concurrently(schema_editor)}IF EXISTS {name}'
+        )
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY no puede correr dentro de una
+    # transaccion.
+    atomic = False
+
+    dependencies = [
+        ('core', '0002_recipe_image'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_indexes, drop_indexes),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='recipe',
+                    index=models.Index(
+                        fields=['user', '-id'],
+                        name='core_recipe_user_id_idx'
+                    ),
+                ),
+            ],
+        ),
+    ]
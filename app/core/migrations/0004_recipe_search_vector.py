@@ -0,0 +1,70 @@
+# Generated by Django 2.1.15 on 2026-10-17 22:40
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+TERMS_SQL = """
+    COALESCE((SELECT {agg} FROM core_tag t
+              JOIN core_recipe_tags rt ON rt.tag_id = t.id
+              WHERE rt.recipe_id = r.id), '') || ' ' ||
+    COALESCE((SELECT {agg} FROM core_ingredient i
+              JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id
+              WHERE ri.recipe_id = r.id), '')
+"""
+
+
+def create_search_index(apps, schema_editor):
+    """Crea el indice de busqueda segun el motor y carga las recetas
+    existentes."""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        config = getattr(settings, 'RECIPE_SEARCH_CONFIG', 'spanish')
+        schema_editor.execute(
+            'CREATE INDEX core_recipe_search_vector_gin '
+            'ON core_recipe USING gin (search_vector)'
+        )
+        schema_editor.execute(
+            "UPDATE core_recipe r SET search_vector = "
+            "setweight(to_tsvector(%s::regconfig, r.title), 'A') || "
+            "setweight(to_tsvector(%s::regconfig, {terms}), 'B')".format(
+                terms=TERMS_SQL.format(agg="string_agg(name, ' ')")
+            ),
+            [config, config]
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE core_recipe_fts USING fts5('
+            "title, terms, tokenize='unicode61 remove_diacritics 1')"
+        )
+        schema_editor.execute(
+            'INSERT INTO core_recipe_fts (rowid, title, terms) '
+            'SELECT r.id, r.title, {terms} FROM core_recipe r'.format(
+                terms=TERMS_SQL.format(agg="group_concat(name, ' ')")
+            )
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX core_recipe_search_vector_gin')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE core_recipe_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_recipe_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
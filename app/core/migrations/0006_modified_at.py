@@ -0,0 +1,99 @@
+# Generated by Django 2.1.15 on 2026-10-17 23:05
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+# (tabla, indice, columnas)
+INDEXES = (
+    ('core_tag', 'core_tag_user_modified_idx', '(user_id, modified_at)'),
+    ('core_ingredient', 'core_ingr_user_modified_idx',
+     '(user_id, modified_at)'),
+    ('core_recipe', 'core_recipe_user_modified_idx',
+     '(user_id, modified_at)'),
+)
+
+
+def concurrently(schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        return 'CONCURRENTLY '
+    return ''
+
+
+def create_indexes(apps, schema_editor):
+    """Como en 0003: CONCURRENTLY en Postgres, borrando antes un indice
+    invalido de una corrida anterior."""
+    for table, name, columns in INDEXES:
+        schema_editor.execute(
+            f'DROP INDEX {concurrently(schema_editor)}IF EXISTS {name}'
+        )
+        schema_editor.execute(
+            f'CREATE INDEX {concurrently(schema_editor)}{name} '
+            f'ON {table} {columns}'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    for table, name, columns in INDEXES:
+        schema_editor.execute(
+            f'DROP INDEX {concurrently(schema_editor)}IF EXISTS {name}'
+        )
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY no puede correr dentro de una
+    # transaccion.
+    atomic = False
+
+    dependencies = [
+        ('core', '0005_recipe_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='modified_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='modified_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='modified_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_indexes, drop_indexes),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='tag',
+                    index=models.Index(
+                        fields=['user', 'modified_at'],
+                        name='core_tag_user_modified_idx'
+                    ),
+                ),
+                migrations.AddIndex(
+                    model_name='ingredient',
+                    index=models.Index(
+                        fields=['user', 'modified_at'],
+                        name='core_ingr_user_modified_idx'
+                    ),
+                ),
+                migrations.AddIndex(
+                    model_name='recipe',
+                    index=models.Index(
+                        fields=['user', 'modified_at'],
+                        name='core_recipe_user_modified_idx'
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,90 @@
+from django.db import migrations, models
+
+from core.dedup import merge_duplicates
+
+
+# (tabla, indice, columnas, unico). Los indices sobre lower(name) no se
+# pueden declarar en Meta.indexes en Django 2.1, por eso van solo en la
+# base y no en el estado de los modelos.
+INDEXES = (
+    ('core_tag', 'core_tag_user_name_idx', '(user_id, name)', False),
+    ('core_ingredient', 'core_ingr_user_name_idx', '(user_id, name)', False),
+    ('core_tag', 'core_tag_user_lower_name_uniq',
+     '(user_id, lower(name))', True),
+    ('core_ingredient', 'core_ingr_user_lower_name_uniq',
+     '(user_id, lower(name))', True),
+)
+
+
+def merge_attrs(apps, schema_editor):
+    """Fusiona los repetidos antes de crear el indice unico."""
+    Recipe = apps.get_model('core', 'Recipe')
+    for name in ('Tag', 'Ingredient'):
+        merge_duplicates(
+            apps.get_model('core', name),
+            Recipe,
+            using=schema_editor.connection.alias
+        )
+
+
+def create_indexes(apps, schema_editor):
+    """En Postgres crea los indices con CONCURRENTLY, sin bloquear las
+    escrituras. Si una corrida anterior fallo a mitad (por ejemplo por
+    un repetido insertado mientras tanto) el indice invalido se borra y
+    se vuelve a crear."""
+    concurrently = ''
+    if schema_editor.connection.vendor == 'postgresql':
+        concurrently = 'CONCURRENTLY '
+    for table, name, columns, unique in INDEXES:
+        schema_editor.execute(f'DROP INDEX {concurrently}IF EXISTS {name}')
+        schema_editor.execute('CREATE {unique}INDEX {concurrently}{name} '
+                              'ON {table} {columns}'.format(
+                                  unique='UNIQUE ' if unique else '',
+                                  concurrently=concurrently,
+                                  name=name,
+                                  table=table,
+                                  columns=columns
+                              ))
+
+
+def drop_indexes(apps, schema_editor):
+    concurrently = ''
+    if schema_editor.connection.vendor == 'postgresql':
+        concurrently = 'CONCURRENTLY '
+    for table, name, columns, unique in INDEXES:
+        schema_editor.execute(f'DROP INDEX {concurrently}IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY no puede correr dentro de una
+    # transaccion; la fusion usa sus propias transacciones por lote.
+    atomic = False
+
+    dependencies = [
+        ('core', '0006_modified_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_attrs, migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_indexes, drop_indexes),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='tag',
+                    index=models.Index(
+                        fields=['user', 'name'],
+                        name='core_tag_user_name_idx'
+                    ),
+                ),
+                migrations.AddIndex(
+                    model_name='ingredient',
+                    index=models.Index(
+                        fields=['user', 'name'],
+                        name='core_ingr_user_name_idx'
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 2.1.15 on 2026-10-17 23:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_signed_tokens'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recipe_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('recipe_count', models.IntegerField(default=0)),
+                ('price_sum', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('price_min', models.DecimalField(decimal_places=2, max_digits=6, null=True)),
+                ('price_max', models.DecimalField(decimal_places=2, max_digits=6, null=True)),
+                ('time_sum', models.BigIntegerField(default=0)),
+                ('time_min', models.IntegerField(null=True)),
+                ('time_max', models.IntegerField(null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecipeStatsCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=10)),
+                ('key', models.IntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='recipestatscount',
+            index=models.Index(fields=['user', 'kind', '-count'], name='core_stats_user_kind_count_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='recipestatscount',
+            unique_together={('user', 'kind', 'key')},
+        ),
+    ]
@@ -1,6 +1,7 @@
 import uuid
 import os
 from django.db import models
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
                                         PermissionsMixin
 from django.conf import settings
@@ -16,6 +17,13 @@ def recipe_image_file_path(instance, filename):
     return os.path.join('uploads/recipe/', filename)
 
 
+def recipe_derivative_file_path(instance, filename):
+    """Genera un directorio para las versiones redimensionadas"""
+    ext = filename.split('.')[-1]
+    filename = f'{uuid.uuid4()}.{ext}'
+
+    return os.path.join('uploads/recipe/derivatives/', filename)
+
 
 class UserManager(BaseUserManager):
 
@@ -52,24 +60,54 @@ class User(AbstractBaseUser,PermissionsMixin):
 
 
 class Tag(models.Model):
-    """Una etiqueta, diseñada para ser usada en una receta."""
+    """Una etiqueta, diseñada para ser usada en una receta.
+    El nombre es unico por usuario sin distinguir mayusculas, con un
+    indice sobre (user_id, lower(name)) creado en la migracion 0007."""
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    modified_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'modified_at'],
+                name='core_tag_user_modified_idx'
+            ),
+            models.Index(
+                fields=['user', 'name'],
+                name='core_tag_user_name_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
     
 
 class Ingredient(models.Model):
-    """Ingrediente para ser utilizado en una receta"""
+    """Ingrediente para ser utilizado en una receta.
+    Como en Tag, el nombre es unico por usuario sin distinguir
+    mayusculas."""
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    modified_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'modified_at'],
+                name='core_ingr_user_modified_idx'
+            ),
+            models.Index(
+                fields=['user', 'name'],
+                name='core_ingr_user_name_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -89,6 +127,122 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    # Mantenido por recipe.search; en SQLite se usa una tabla FTS5.
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Se actualiza tambien cuando cambian sus tags, ingredientes o
+    # imagenes (ver recipe.signals), para los ETag de la API.
+    modified_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-id'],
+                name='core_recipe_user_id_idx'
+            ),
+            models.Index(
+                fields=['user', 'modified_at'],
+                name='core_recipe_user_modified_idx'
+            ),
+        ]
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+
+class RecipeImageDerivative(models.Model):
+    """Version redimensionada de la imagen de una receta."""
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE,
+        related_name='image_derivatives'
+    )
+    size = models.CharField(max_length=20)
+    format = models.CharField(max_length=10)
+    image = models.ImageField(
+        upload_to=recipe_derivative_file_path,
+        width_field='width',
+        height_field='height'
+    )
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('recipe', 'size', 'format')
+
+    def __str__(self):
+        return f'{self.recipe_id} {self.size} {self.format}'
+
+
+class RecipeStats(models.Model):
+    """Resumen de las recetas de un usuario, mantenido por recipe.stats
+    a medida que cambian. Se crea la primera vez que se consulta."""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='recipe_stats'
+    )
+    recipe_count = models.IntegerField(default=0)
+    price_sum = models.DecimalField(max_digits=16, decimal_places=2,
+                                    default=0)
+    price_min = models.DecimalField(max_digits=6, decimal_places=2,
+                                    null=True)
+    price_max = models.DecimalField(max_digits=6, decimal_places=2,
+                                    null=True)
+    time_sum = models.BigIntegerField(default=0)
+    time_min = models.IntegerField(null=True)
+    time_max = models.IntegerField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class RecipeStatsCount(models.Model):
+    """Cantidad de recetas de un usuario por rango de precio o de
+    duracion (key es el indice del rango) y por tag o ingrediente (key
+    es su id)."""
+    PRICE = 'price'
+    TIME = 'time'
+    TAG = 'tag'
+    INGREDIENT = 'ingredient'
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    kind = models.CharField(max_length=10)
+    key = models.IntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'kind', 'key')
+        indexes = [
+            models.Index(
+                fields=['user', 'kind', '-count'],
+                name='core_stats_user_kind_count_idx'
+            ),
+        ]
+
+
+class RefreshToken(models.Model):
+    """Token de refresco de los tokens de acceso firmados (ver
+    core/tokens.py). Se guarda solo el hash de la clave; cada uno se
+    puede canjear una sola vez."""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='refresh_tokens'
+    )
+    key_hash = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+
+class TokenRevocation(models.Model):
+    """Revoca tokens de acceso firmados hasta que vencen. Con jti revoca
+    ese token; sin jti, todos los del usuario emitidos antes de
+    created_at. user_id no es una clave foranea para que la revocacion
+    sobreviva al borrado del usuario."""
+    user_id = models.IntegerField()
+    jti = models.CharField(max_length=32, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
@@ -0,0 +1,154 @@
+"""Perfilado por muestreo de pedidos reales.
+
+ProfiledViewMixin corre cProfile sobre 1 de cada PROFILE_SAMPLE_RATE
+pedidos (0 lo desactiva) y sobre los pedidos de staff que envian la
+cabecera X-Profile: 1. El perfil cubre la vista, la serializacion y el
+render; la autenticacion queda afuera porque la cabecera solo se acepta
+una vez que se sabe que el usuario es staff.
+
+Los perfiles se guardan en PROFILE_DIR como archivos de pstats, y solo
+se conservan los PROFILE_MAX_FILES mas recientes.
+"""
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import re
+import tempfile
+import time
+
+from django.conf import settings
+from django.utils.text import slugify
+
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = getattr(settings, 'PROFILE_SAMPLE_RATE', 0)
+PROFILE_DIR = getattr(
+    settings,
+    'PROFILE_DIR',
+    os.path.join(tempfile.gettempdir(), 'recipe-profiles')
+)
+MAX_FILES = getattr(settings, 'PROFILE_MAX_FILES', 50)
+HEADER = 'HTTP_X_PROFILE'
+
+NAME_RE = re.compile(r'^[\w-]+\.prof$')
+
+
+def sampled():
+    return SAMPLE_RATE > 0 and random.randrange(SAMPLE_RATE) == 0
+
+
+def requested(request):
+    """El usuario (ya autenticado) es staff y pidio el perfil."""
+    return request.META.get(HEADER) == '1' and \
+        getattr(request.user, 'is_staff', False)
+
+
+def profile_name(request, elapsed):
+    """Nombre del archivo: fecha, metodo, ruta y duracion. Empieza con
+    la fecha para que ordenar por nombre sea ordenar por antiguedad."""
+    stamp = time.strftime('%Y%m%d-%H%M%S', time.gmtime())
+    micros = int(time.time() * 1e6) % 1000000
+    path = slugify(request.path.strip('/').replace('/', '-'))[:60] or 'root'
+    return (
+        f'{stamp}-{micros:06d}-{request.method.lower()}-{path}-'
+        f'{elapsed * 1000:.0f}ms.prof'
+    )
+
+
+def save(profiler, name):
+    """Escribe el perfil (primero a un temporal, para no dejar archivos
+    a medias) y borra los mas viejos."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, name)
+    profiler.dump_stats(path + '.tmp')
+    os.replace(path + '.tmp', path)
+    for old in list_profiles()[MAX_FILES:]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, old['name']))
+        except FileNotFoundError:
+            # Otro proceso lo borro primero.
+            pass
+
+
+def list_profiles():
+    """Perfiles guardados, del mas nuevo al mas viejo."""
+    try:
+        names = os.listdir(PROFILE_DIR)
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for name in sorted(filter(NAME_RE.match, names), reverse=True):
+        try:
+            size = os.path.getsize(os.path.join(PROFILE_DIR, name))
+        except FileNotFoundError:
+            continue
+        profiles.append({'name': name, 'size': size})
+    return profiles
+
+
+def profile_path(name):
+    """Ruta de un perfil guardado, o None si el nombre no es valido o
+    no existe."""
+    if not NAME_RE.match(name):
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+def summary(path, sort='cumulative', limit=40):
+    """Resumen en texto de un perfil: las `limit` funciones con mayor
+    tiempo segun `sort`."""
+    output = io.StringIO()
+    stats = pstats.Stats(path, stream=output)
+    stats.sort_stats(sort).print_stats(limit)
+    return output.getvalue()
+
+
+class ProfiledViewMixin:
+    """Perfila pedidos de una vista de DRF segun SAMPLE_RATE o la
+    cabecera X-Profile de staff, y responde el nombre del perfil en la
+    cabecera X-Profile-Id."""
+
+    profiler = None
+
+    def dispatch(self, request, *args, **kwargs):
+        self.profiler = None
+        if sampled():
+            self.start_profiler()
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+            # Se renderiza aca para incluirlo en el perfil; Django no lo
+            # vuelve a hacer.
+            if self.profiler is not None and hasattr(response, 'render'):
+                response.render()
+        finally:
+            if self.profiler is not None:
+                self.profiler.disable()
+        if self.profiler is None:
+            return response
+
+        name = profile_name(
+            request,
+            time.perf_counter() - self.profile_started
+        )
+        try:
+            save(self.profiler, name)
+        except OSError:
+            logger.exception('No se pudo guardar el perfil %s', name)
+        else:
+            response['X-Profile-Id'] = name
+        return response
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.profiler is None and requested(request):
+            self.start_profiler()
+
+    def start_profiler(self):
+        self.profile_started = time.perf_counter()
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
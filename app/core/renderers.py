@@ -0,0 +1,85 @@
+"""Renderer y parser JSON de la API.
+
+JSONRenderer y JSONParser de DRF usan el modulo json de la libreria
+estandar, que en los listados grandes de recetas aparece entre lo mas
+caro del pedido. Si orjson (escrito en C) esta instalado, FastJSONRenderer
+y FastJSONParser lo usan; si no, se comportan igual que los de DRF.
+
+Los tipos que orjson no serializa por si mismo (Decimal, fechas, textos
+traducibles, QuerySets) se convierten con el encoder de DRF, asi la
+salida es la misma con cualquiera de los dos.
+"""
+import codecs
+import json
+
+from django.conf import settings
+from rest_framework import parsers, renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_encoder = encoders.JSONEncoder()
+
+if orjson is not None:
+    # Las fechas pasan por el encoder de DRF, que las recorta a
+    # milisegundos y usa Z para UTC.
+    OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def dumps(data):
+    """Codifica `data` como JSON compacto en UTF-8 (bytes)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=_encoder.default,
+                                option=OPTIONS)
+        except orjson.JSONEncodeError:
+            # Por ejemplo enteros de mas de 64 bits: el modulo json los
+            # codifica o da un error mas claro.
+            pass
+    return json.dumps(
+        data,
+        cls=encoders.JSONEncoder,
+        ensure_ascii=False,
+        separators=(',', ':')
+    ).encode()
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer que codifica con orjson. Si se pide indentacion (la
+    API navegable la pide) o salida ASCII se usa el de DRF."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or \
+                not self.compact or \
+                self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        content = dumps(data)
+        # Igual que DRF: U+2028 y U+2029 son validos en JSON pero no en
+        # JavaScript.
+        if b'\xe2\x80\xa8' in content or b'\xe2\x80\xa9' in content:
+            content = content.replace(b'\xe2\x80\xa8', b'\\u2028')
+            content = content.replace(b'\xe2\x80\xa9', b'\\u2029')
+        return content
+
+
+class FastJSONParser(parsers.JSONParser):
+    """JSONParser que decodifica con orjson los cuerpos en UTF-8."""
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get(
+            'encoding', settings.DEFAULT_CHARSET
+        )
+        if orjson is None or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % exc)
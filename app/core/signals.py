@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.core.signals import request_started
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from core import tokens
+from core.authentication import invalidate_token, invalidate_user_tokens
+from core.db import check_connections
+
+
+request_started.connect(check_connections)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Quita del cache un token eliminado y lo revoca, para que otros
+    procesos no lo sigan aceptando desde su cache local."""
+    invalidate_token(instance.key)
+    tokens.revocations.revoke_key(instance.user_id, instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def user_saved(sender, instance, created, **kwargs):
+    """Quita del cache los tokens de un usuario modificado o
+    desactivado, para no servir datos viejos."""
+    if not created:
+        invalidate_user_tokens(instance)
+    if not created and not instance.is_active:
+        tokens.revocations.revoke_user(instance.pk)
+        tokens.revoke_refresh(instance)
+
+
+@receiver(post_delete, sender=get_user_model())
+def user_deleted(sender, instance, **kwargs):
+    """Revoca los tokens firmados de un usuario eliminado, que siguen
+    siendo validos hasta vencer."""
+    tokens.revocations.revoke_user(instance.pk)
@@ -0,0 +1,166 @@
+import asyncio
+import json
+import threading
+
+from django.core.wsgi import get_wsgi_application
+from django.test import SimpleTestCase
+
+from core.asgi import ThreadPoolASGIHandler, build_environ
+
+
+def scope(method='GET', path='/', headers=(), query_string=b''):
+    return {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': method,
+        'path': path,
+        'query_string': query_string,
+        'headers': list(headers),
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 5000),
+    }
+
+
+def call(app, scope, chunks=(b'',)):
+    """Corre la aplicacion ASGI enviando el cuerpo en `chunks` y retorna
+    (status, headers, cuerpo, cantidad de mensajes de cuerpo)."""
+    messages = [
+        {
+            'type': 'http.request',
+            'body': chunk,
+            'more_body': index < len(chunks) - 1,
+        }
+        for index, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = sent[0]
+    bodies = [message.get('body', b'') for message in sent[1:]]
+    return start['status'], dict(start['headers']), b''.join(bodies), \
+        len(bodies)
+
+
+def echo(environ, start_response):
+    """Aplicacion WSGI que responde el cuerpo y el thread que la corrio."""
+    body = environ['wsgi.input'].read()
+    start_response('200 OK', [('Content-Type', 'application/json')])
+    return [json.dumps({
+        'body': body.decode(),
+        'thread': threading.current_thread().name,
+        'content_type': environ.get('CONTENT_TYPE'),
+        'accept': environ.get('HTTP_ACCEPT'),
+    }).encode()]
+
+
+class Streaming:
+    streaming = True
+    closed = False
+
+    def __iter__(self):
+        return iter([b'a', b'b', b'c'])
+
+    def close(self):
+        self.closed = True
+
+
+class ThreadPoolASGIHandlerTests(SimpleTestCase):
+    """Testea el adaptador ASGI de core/asgi.py."""
+
+    def test_django_request(self):
+        """Testea un pedido a Django a traves del adaptador."""
+        app = ThreadPoolASGIHandler(get_wsgi_application(), threads=2)
+        status, headers, body, _ = call(app, scope(path='/health/live/'))
+
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body), {'status': 'ok'})
+        self.assertIn(b'server-timing', headers)
+
+    def test_body_in_chunks(self):
+        """Testea que el cuerpo recibido en partes llegue completo y la
+        aplicacion corra en un thread del pool."""
+        app = ThreadPoolASGIHandler(echo, threads=1)
+        status, _, body, _ = call(
+            app,
+            scope('POST', headers=[
+                (b'content-type', b'text/plain'),
+                (b'accept', b'text/plain'),
+                (b'accept', b'application/json'),
+            ]),
+            [b'uno ', b'dos ', b'tres']
+        )
+        data = json.loads(body)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(data['body'], 'uno dos tres')
+        self.assertTrue(data['thread'].startswith('asgi'))
+        self.assertEqual(data['content_type'], 'text/plain')
+        self.assertEqual(data['accept'], 'text/plain,application/json')
+
+    def test_body_too_large(self):
+        """Testea que un cuerpo mayor al limite responda 413 sin correr
+        la aplicacion."""
+        app = ThreadPoolASGIHandler(echo, max_body_bytes=5)
+
+        status, _, _, _ = call(app, scope('POST'), [b'123', b'456'])
+        self.assertEqual(status, 413)
+
+        status, _, _, _ = call(
+            app,
+            scope('POST', headers=[(b'content-length', b'6')]),
+            [b'123456']
+        )
+        self.assertEqual(status, 413)
+
+    def test_streaming_response(self):
+        """Testea que una respuesta en streaming se envie por bloques y
+        se cierre al terminar."""
+        response = Streaming()
+
+        def application(environ, start_response):
+            start_response('200 OK', [])
+            return response
+
+        app = ThreadPoolASGIHandler(application)
+        status, _, body, messages = call(app, scope())
+
+        self.assertEqual(body, b'abc')
+        self.assertEqual(messages, 4)
+        self.assertTrue(response.closed)
+
+    def test_build_environ(self):
+        """Testea la traduccion del scope al environ de WSGI."""
+        environ = build_environ(
+            scope(path='/api/recipe/', query_string=b'tags=1,2', headers=[
+                (b'content-length', b'10'),
+                (b'authorization', b'Token abc'),
+            ]),
+            None
+        )
+
+        self.assertEqual(environ['PATH_INFO'], '/api/recipe/')
+        self.assertEqual(environ['QUERY_STRING'], 'tags=1,2')
+        self.assertEqual(environ['CONTENT_LENGTH'], '10')
+        self.assertEqual(environ['HTTP_AUTHORIZATION'], 'Token abc')
+        self.assertEqual(environ['SERVER_NAME'], 'testserver')
+        self.assertEqual(environ['REMOTE_ADDR'], '127.0.0.1')
+
+    def test_non_ascii_query_string(self):
+        """Testea que un byte no ASCII en la query string no falle: se
+        decodifica como latin1, igual que en WSGI."""
+        environ = build_environ(scope(query_string=b'search=\xf1oquis'), None)
+
+        self.assertEqual(environ['QUERY_STRING'], 'search=\xf1oquis')
+
+        app = ThreadPoolASGIHandler(get_wsgi_application(), threads=1)
+        status, _, _, _ = call(
+            app,
+            scope(path='/health/live/', query_string=b'x=\xf1')
+        )
+        self.assertEqual(status, 200)
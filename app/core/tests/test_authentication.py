@@ -0,0 +1,158 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import tokens
+from core.authentication import token_cache
+from core.cache import LRUCache
+from core.models import TokenRevocation
+
+
+ME_URL = reverse('user:me')
+
+
+class LRUCacheTests(TestCase):
+    """Testea el cache LRU con TTL."""
+
+    def test_evicts_least_recently_used(self):
+        """Testea que se descarte la entrada menos usada."""
+        cache = LRUCache(max_size=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    @patch('core.cache.time.monotonic')
+    def test_entries_expire(self, monotonic):
+        """Testea que las entradas expiren pasado el TTL."""
+        cache = LRUCache(max_size=2, ttl=10)
+        monotonic.return_value = 100
+        cache.set('a', 1)
+        monotonic.return_value = 111
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Testea la autenticacion por token con cache."""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@francorueta.com',
+            'pass1234',
+            name='Franco'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        tokens.revocations.clear()
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def test_token_cached_after_first_request(self):
+        """Testea que el segundo pedido no consulte el token."""
+        self.client.get(ME_URL)
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(context.captured_queries), 0)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_deleted_token_rejected(self):
+        """Testea que un token eliminado deje de ser valido."""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_in_other_process_rejected(self):
+        """Testea que un token borrado en otro proceso, que no limpia el
+        cache de este, llegue por la lista de revocaciones."""
+        self.client.get(ME_URL)
+        key = self.token.key
+        cached = token_cache.get(key)
+        self.token.delete()
+        token_cache.set(key, cached)
+        tokens.revocations.clear()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Testea que un usuario desactivado deje de autenticarse."""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_in_other_process_rejected(self):
+        """Testea que una desactivacion hecha en otro proceso, que no
+        limpia el cache de este, llegue por la lista de revocaciones."""
+        self.client.get(ME_URL)
+        # Lo que hace user_saved en el otro proceso, menos limpiar el
+        # cache local de este.
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_active=False
+        )
+        tokens.revocations.revoke_user(self.user.pk)
+        tokens.revocations.clear()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_update_invalidates_cache(self):
+        """Testea que actualizar el perfil no deje datos viejos."""
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'name': 'Nuevo'})
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'Nuevo')
+
+    def test_update_reloads_cached_user(self):
+        """Testea que una actualizacion no guarde el usuario cacheado,
+        pisando cambios hechos en otro proceso."""
+        self.client.get(ME_URL)
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            email='nuevo@francorueta.com'
+        )
+
+        res = self.client.patch(ME_URL, {'name': 'Nuevo'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, 'nuevo@francorueta.com')
+        self.assertEqual(self.user.name, 'Nuevo')
+
+    @patch('core.tokens.TOKEN_CACHE_TTL', 3600)
+    def test_user_revocation_outlives_cache(self):
+        """Testea que la revocacion de un usuario dure al menos lo que
+        una entrada del cache de tokens."""
+        tokens.revocations.revoke_user(self.user.pk)
+
+        revocation = TokenRevocation.objects.get(user_id=self.user.pk)
+        ttl = revocation.expires_at - revocation.created_at
+        self.assertGreaterEqual(ttl.total_seconds(), 3599)
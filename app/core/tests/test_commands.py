@@ -1,23 +1,272 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from unittest import skipIf
 from unittest.mock import patch
 
+from core.models import Tag, Ingredient, Recipe
+from recipe import search
+from recipe.importer import InvalidRow, parse_row
+
 
 class CommandTests(TestCase):
 
     def test_wait_for_db_ready(self):
         #Testea la espera de la db cuando la db esta activa. 
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
+        with patch('core.management.commands.wait_for_db.ping') as ping:
             call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
-    
+            self.assertEqual(ping.call_count, 1)
+
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
         #Testea la espera de la database
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
+        with patch('core.management.commands.wait_for_db.ping') as ping:
+            ping.side_effect = [OperationalError] * 5 + [None]
+            call_command('wait_for_db')
+            self.assertEqual(ping.call_count, 6)
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_backoff(self, ts):
+        # Testea que las esperas crezcan exponencialmente
+        with patch('core.management.commands.wait_for_db.ping') as ping:
+            ping.side_effect = [OperationalError] * 4 + [None]
             call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
\ No newline at end of file
+            delays = [call[0][0] for call in ts.call_args_list]
+            self.assertEqual(delays, [0.1, 0.2, 0.4, 0.8])
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        # Testea que el comando falle si la db no responde a tiempo
+        with patch('core.management.commands.wait_for_db.ping') as ping:
+            ping.side_effect = OperationalError
+            with self.assertRaises(CommandError):
+                call_command('wait_for_db', timeout=0)
+
+
+class DedupRecipeAttrsTests(TestCase):
+
+    def setUp(self):
+        # Quita el indice unico (dentro de la transaccion del test) para
+        # poder crear repetidos como los que habia antes de la migracion.
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX core_tag_user_lower_name_uniq')
+        self.user = get_user_model().objects.create_user(
+            'test@francorueta.com',
+            'pass1234'
+        )
+
+    def sample_recipe(self, *tags):
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Receta',
+            time_minutes=10,
+            price=100.00
+        )
+        recipe.tags.add(*tags)
+        return recipe
+
+    def test_dedup_merges_tags(self):
+        # Testea que las recetas pasen a la tag sobreviviente
+        keep = Tag.objects.create(user=self.user, name='Tomate')
+        dup = Tag.objects.create(user=self.user, name='tomate')
+        other = Tag.objects.create(user=self.user, name='TOMATE')
+        both = self.sample_recipe(keep, dup)
+        moved = self.sample_recipe(dup, other)
+
+        call_command('dedup_recipe_attrs', batch_size=1, stdout=StringIO())
+
+        self.assertEqual(
+            list(Tag.objects.values_list('id', flat=True)),
+            [keep.id]
+        )
+        self.assertEqual(list(both.tags.all()), [keep])
+        self.assertEqual(list(moved.tags.all()), [keep])
+
+    def test_dedup_limited_to_user(self):
+        # Testea que no se fusionen tags de distintos usuarios
+        user2 = get_user_model().objects.create_user(
+            'test2@francorueta.com',
+            'pass1234'
+        )
+        Tag.objects.create(user=self.user, name='Tomate')
+        Tag.objects.create(user=user2, name='tomate')
+
+        call_command('dedup_recipe_attrs', stdout=StringIO())
+
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_dedup_dry_run(self):
+        # Testea que --dry-run no modifique nada
+        Tag.objects.create(user=self.user, name='Tomate')
+        Tag.objects.create(user=self.user, name='tomate')
+        out = StringIO()
+
+        call_command('dedup_recipe_attrs', dry_run=True, stdout=out)
+
+        self.assertIn('1 grupos repetidos', out.getvalue())
+        self.assertEqual(Tag.objects.count(), 2)
+
+
+class ImportRecipesTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@francorueta.com',
+            'pass1234'
+        )
+
+    def write(self, content, suffix):
+        file = tempfile.NamedTemporaryFile(
+            'w',
+            suffix=suffix,
+            delete=False,
+            encoding='utf-8'
+        )
+        with file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def test_import_ndjson(self):
+        # Testea importar recetas reutilizando tags existentes
+        tag = Tag.objects.create(user=self.user, name='Invierno')
+        rows = [
+            {'title': 'Guiso', 'time_minutes': 60, 'price': '500.00',
+             'tags': ['invierno'], 'ingredients': ['Lentejas', 'Chorizo']},
+            {'title': 'Sopa', 'time_minutes': 30, 'price': 200,
+             'tags': ['Invierno', 'Rapido'], 'ingredients': ['lentejas']},
+        ]
+        path = self.write(
+            '\n'.join(json.dumps(row) for row in rows),
+            '.ndjson'
+        )
+        out = StringIO()
+
+        call_command(
+            'import_recipes', path,
+            user=self.user.email, chunk_size=1, stdout=out
+        )
+
+        self.assertIn('Se importaron 2 recetas', out.getvalue())
+        guiso = Recipe.objects.get(title='Guiso')
+        self.assertEqual(list(guiso.tags.all()), [tag])
+        self.assertEqual(guiso.ingredients.count(), 2)
+        self.assertEqual(Tag.objects.count(), 2)
+        self.assertEqual(Ingredient.objects.count(), 2)
+        found = search.search(Recipe.objects.all(), 'chorizo')
+        self.assertEqual([recipe.title for recipe in found], ['Guiso'])
+
+    def test_import_non_ascii_names(self):
+        # Testea reutilizar nombres existentes con letras no ASCII
+        tag = Tag.objects.create(user=self.user, name='Ñoqui')
+        ingredient = Ingredient.objects.create(user=self.user, name='Azúcar')
+        path = self.write(json.dumps(
+            {'title': 'Ñoquis', 'time_minutes': 40, 'price': 300,
+             'tags': ['Ñoqui', 'ÑOQUI'], 'ingredients': ['azúcar']}
+        ), '.ndjson')
+
+        call_command(
+            'import_recipes', path,
+            user=self.user.email, stdout=StringIO()
+        )
+
+        recipe = Recipe.objects.get()
+        self.assertEqual(list(recipe.tags.all()), [tag])
+        self.assertEqual(list(recipe.ingredients.all()), [ingredient])
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_import_csv(self):
+        # Testea importar el CSV que genera la exportacion
+        path = self.write(
+            'id,title,time_minutes,price,link,image,tags,ingredients\n'
+            '7,Flan,45,150.50,,,Postre|Dulce,Huevo|Leche\n',
+            '.csv'
+        )
+
+        call_command(
+            'import_recipes', path,
+            user=self.user.email, stdout=StringIO()
+        )
+
+        flan = Recipe.objects.get()
+        self.assertEqual(flan.title, 'Flan')
+        self.assertEqual(str(flan.price), '150.50')
+        self.assertEqual(
+            sorted(flan.tags.values_list('name', flat=True)),
+            ['Dulce', 'Postre']
+        )
+
+    def test_import_csv_quoted_names(self):
+        # Testea que un nombre entre comillas conserve el separador
+        path = self.write(
+            'id,title,time_minutes,price,link,image,tags,ingredients\n'
+            '7,Flan,45,150.50,,,"""Frio|Calor""|Dulce",Huevo\n',
+            '.csv'
+        )
+
+        call_command(
+            'import_recipes', path,
+            user=self.user.email, stdout=StringIO()
+        )
+
+        self.assertEqual(
+            sorted(Recipe.objects.get().tags.values_list('name', flat=True)),
+            ['Dulce', 'Frio|Calor']
+        )
+
+    def test_import_invalid_row(self):
+        # Testea que una fila invalida detenga la importacion
+        rows = [
+            {'title': 'Guiso', 'time_minutes': 10, 'price': 1},
+            {'title': 'Sopa', 'time_minutes': 'mucho', 'price': 1},
+        ]
+        path = self.write(
+            '\n'.join(json.dumps(row) for row in rows),
+            '.ndjson'
+        )
+
+        with self.assertRaisesRegex(CommandError, 'Linea 2'):
+            call_command(
+                'import_recipes', path,
+                user=self.user.email, chunk_size=1, stdout=StringIO()
+            )
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_parse_row_invalid_values(self):
+        # Testea que se reporten por fila los valores que la base
+        # rechazaria o que se interpretarian mal
+        valid = {'title': 'Sopa', 'time_minutes': 10, 'price': 1}
+        for change, message in (
+                ({'link': 'x' * 256}, 'link'),
+                ({'tags': 'sopa'}, 'tags'),
+                ({'ingredients': {'sal': 1}}, 'ingredients'),
+                ({'time_minutes': 12.7}, 'fila invalida'),
+                ({'time_minutes': True}, 'fila invalida'),
+                ({'time_minutes': None}, 'fila invalida')):
+            with self.assertRaisesRegex(InvalidRow, f'Linea 3: {message}'):
+                parse_row(3, dict(valid, **change))
+
+        data, tags, _ = parse_row(3, dict(valid, time_minutes='45',
+                                          tags=['Sopa']))
+        self.assertEqual(data['time_minutes'], 45)
+        self.assertEqual(tags, ['Sopa'])
+
+    @skipIf(connection.vendor == 'postgresql', 'Solo para otros motores')
+    def test_import_copy_requires_postgres(self):
+        # Testea que --copy falle en motores distintos de Postgres
+        path = self.write('', '.ndjson')
+
+        with self.assertRaises(CommandError):
+            call_command(
+                'import_recipes', path,
+                user=self.user.email, copy=True, stdout=StringIO()
+            )
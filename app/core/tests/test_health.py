@@ -0,0 +1,61 @@
+from unittest.mock import patch
+
+from django.db import connection
+from django.db.utils import OperationalError
+from django.test import TestCase
+from django.urls import reverse
+
+from core import db
+
+
+LIVE_URL = reverse('health-live')
+READY_URL = reverse('health-ready')
+
+
+class HealthTests(TestCase):
+    """Testea las sondas de salud y el chequeo de conexiones."""
+
+    def test_live(self):
+        """Testea que live responda sin autenticacion."""
+        res = self.client.get(LIVE_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {'status': 'ok'})
+
+    def test_ready(self):
+        """Testea que ready responda si la base esta disponible."""
+        res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, 200)
+
+    @patch('core.views.ping', side_effect=OperationalError)
+    def test_ready_database_down(self, ping):
+        """Testea que ready responda 503 si la base no responde."""
+        res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json(), {'status': 'unavailable'})
+
+    def test_check_connections_interval(self):
+        """Testea que la conexion se verifique como maximo una vez por
+        intervalo."""
+        connection.ensure_connection()
+        connection.health_checked_at = None
+        with patch.object(connection, 'in_atomic_block', False), \
+                patch.object(connection, 'is_usable',
+                             return_value=True) as is_usable:
+            db.check_connections()
+            db.check_connections()
+
+        self.assertEqual(is_usable.call_count, 1)
+
+    def test_check_connections_closes_unusable(self):
+        """Testea que se cierre una conexion que dejo de responder."""
+        connection.ensure_connection()
+        connection.health_checked_at = None
+        with patch.object(connection, 'in_atomic_block', False), \
+                patch.object(connection, 'is_usable', return_value=False), \
+                patch.object(connection, 'close') as close:
+            db.check_connections()
+
+        close.assert_called_once_with()
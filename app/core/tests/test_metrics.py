@@ -0,0 +1,146 @@
+import io
+import os
+import tempfile
+from unittest.mock import patch
+
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.models import Recipe
+from recipe.cache import list_cache
+
+
+METRICS_URL = reverse('metrics')
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsTests(TestCase):
+    """Testea las metricas de Prometheus."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@francorueta.com',
+            'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        list_cache.clear()
+
+    def test_requests_by_route(self):
+        """Testea que los pedidos se cuenten por nombre de ruta, con
+        su latencia y sus consultas."""
+        labels = {'route': 'recipe:recipe-list', 'method': 'GET'}
+        requests = sample('http_requests_total', status='200', **labels)
+        latency = sample('http_request_duration_seconds_count', **labels)
+        queries = sample(
+            'http_request_db_queries_count',
+            route=labels['route']
+        )
+
+        self.client.get(RECIPES_URL)
+
+        self.assertEqual(
+            sample('http_requests_total', status='200', **labels),
+            requests + 1
+        )
+        self.assertEqual(
+            sample('http_request_duration_seconds_count', **labels),
+            latency + 1
+        )
+        self.assertEqual(
+            sample('http_request_db_queries_count', route=labels['route']),
+            queries + 1
+        )
+
+    def test_unmatched_route(self):
+        """Testea que las URLs inexistentes compartan una serie."""
+        labels = {'route': 'unmatched', 'method': 'GET', 'status': '404'}
+        before = sample('http_requests_total', **labels)
+
+        self.client.get('/no-existe/1/')
+        self.client.get('/no-existe/2/')
+
+        self.assertEqual(sample('http_requests_total', **labels), before + 2)
+
+    def test_list_cache_counters(self):
+        """Testea que se cuenten los aciertos y fallos del cache de
+        listados."""
+        hits = sample('cache_requests_total', cache='list', result='hit')
+        misses = sample('cache_requests_total', cache='list', result='miss')
+
+        self.client.get(TAGS_URL)
+        self.client.get(TAGS_URL)
+
+        self.assertEqual(
+            sample('cache_requests_total', cache='list', result='miss'),
+            misses + 1
+        )
+        self.assertEqual(
+            sample('cache_requests_total', cache='list', result='hit'),
+            hits + 1
+        )
+
+    def test_image_upload_size(self):
+        """Testea que se registre el tamaño de las imagenes subidas."""
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Pollo al horno',
+            time_minutes=30,
+            price=100
+        )
+        content = io.BytesIO()
+        Image.new('RGB', (10, 10)).save(content, format='JPEG')
+        size = len(content.getvalue())
+        content.seek(0)
+        content.name = 'imagen.jpg'
+        before = sample('recipe_image_upload_bytes_sum')
+
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(MEDIA_ROOT=media_root):
+            res = self.client.post(
+                reverse('recipe:recipe-upload-image', args=[recipe.id]),
+                {'image': content},
+                format='multipart'
+            )
+            recipe.refresh_from_db()
+            recipe.image.delete(save=False)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            sample('recipe_image_upload_bytes_sum'),
+            before + size
+        )
+
+    def test_metrics_endpoint(self):
+        """Testea que /metrics responda en el formato de Prometheus sin
+        autenticacion."""
+        self.client.get(RECIPES_URL)
+
+        res = APIClient().get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        self.assertIn(
+            b'http_requests_total{method="GET",route="recipe:recipe-list"',
+            res.content
+        )
+
+    def test_multiprocess_registry(self):
+        """Testea que con PROMETHEUS_MULTIPROC_DIR se sumen los valores
+        de todos los procesos en lugar de usar el registro local."""
+        with tempfile.TemporaryDirectory() as directory, \
+                patch.dict(os.environ, PROMETHEUS_MULTIPROC_DIR=directory):
+            registry = metrics.registry()
+
+        self.assertIsNot(registry, REGISTRY)
+        self.assertIs(metrics.registry(), REGISTRY)
@@ -0,0 +1,126 @@
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import profiling
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+ME_URL = reverse('user:me')
+PROFILES_URL = reverse('profile-list')
+
+
+def detail_url(name):
+    return reverse('profile-detail', args=[name])
+
+
+class ProfilingTests(TestCase):
+    """Testea el perfilado por muestreo y la consulta de perfiles."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        patcher = patch('core.profiling.PROFILE_DIR', self.directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = get_user_model().objects.create_user(
+            'test@francorueta.com',
+            'testpass'
+        )
+        self.staff = get_user_model().objects.create_user(
+            'staff@francorueta.com',
+            'testpass',
+            is_staff=True
+        )
+        self.client = APIClient()
+
+    def test_staff_header_profiles_request(self):
+        """Testea que un pedido de staff con X-Profile se perfile y se
+        pueda listar y descargar."""
+        self.client.force_authenticate(self.staff)
+        res = self.client.get(RECIPES_URL, HTTP_X_PROFILE='1')
+
+        self.assertEqual(res.status_code, 200)
+        name = res['X-Profile-Id']
+        self.assertIn('-get-api-recipe-recipes-', name)
+
+        res = self.client.get(PROFILES_URL)
+        self.assertEqual([p['name'] for p in res.data], [name])
+
+        res = self.client.get(detail_url(name))
+        self.assertEqual(res.status_code, 200)
+        self.assertGreater(len(b''.join(res.streaming_content)), 0)
+
+        res = self.client.get(detail_url(name), {'output': 'text'})
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b'function calls', res.content)
+
+    def test_header_ignored_for_regular_users(self):
+        """Testea que la cabecera no tenga efecto para un usuario comun."""
+        self.client.force_authenticate(self.user)
+        res = self.client.get(ME_URL, HTTP_X_PROFILE='1')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn('X-Profile-Id', res)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    @patch('core.profiling.SAMPLE_RATE', 1)
+    def test_sampled_request(self):
+        """Testea que con muestreo se perfilen pedidos sin cabecera."""
+        self.client.force_authenticate(self.user)
+        res = self.client.get(ME_URL)
+
+        self.assertIn('X-Profile-Id', res)
+        self.assertEqual(len(profiling.list_profiles()), 1)
+
+    @patch('core.profiling.MAX_FILES', 2)
+    def test_ring_buffer(self):
+        """Testea que solo se conserven los perfiles mas recientes."""
+        self.client.force_authenticate(self.staff)
+        names = [
+            self.client.get(ME_URL, HTTP_X_PROFILE='1')['X-Profile-Id']
+            for _ in range(3)
+        ]
+
+        saved = [p['name'] for p in profiling.list_profiles()]
+        self.assertEqual(saved, sorted(names, reverse=True)[:2])
+
+    def test_profiles_require_staff(self):
+        """Testea que solo staff pueda ver los perfiles."""
+        self.client.force_authenticate(self.user)
+
+        self.assertEqual(self.client.get(PROFILES_URL).status_code, 403)
+
+    def test_unknown_profile(self):
+        """Testea que un nombre inexistente o invalido responda 404."""
+        self.client.force_authenticate(self.staff)
+
+        res = self.client.get(detail_url('nada.prof'))
+        self.assertEqual(res.status_code, 404)
+        self.assertIsNone(profiling.profile_path('../settings.py'))
+
+    def test_command(self):
+        """Testea que el comando liste los perfiles y muestre uno."""
+        self.client.force_authenticate(self.staff)
+        name = self.client.get(ME_URL, HTTP_X_PROFILE='1')['X-Profile-Id']
+
+        out = StringIO()
+        call_command('profiles', stdout=out)
+        self.assertIn(name, out.getvalue())
+
+        out = StringIO()
+        call_command('profiles', name, '--limit', '5', stdout=out)
+        self.assertIn('function calls', out.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command('profiles', 'nada.prof', stdout=StringIO())
@@ -0,0 +1,98 @@
+import datetime
+import io
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import FastJSONParser, FastJSONRenderer, dumps
+
+
+DATA = {
+    'id': 1,
+    'title': 'Guiso de lentejas   ñandú',
+    'price': Decimal('5.50'),
+    'created_at': datetime.datetime(
+        2019, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc
+    ),
+    'date': datetime.date(2019, 1, 2),
+    'error': gettext_lazy('Receta'),
+    'tags': [{'id': 2, 'name': 'Vegano'}],
+    3: None,
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Testea el renderer de core/renderers.py."""
+
+    def test_same_output_as_drf(self):
+        """Testea que la salida sea identica a la de JSONRenderer."""
+        self.assertEqual(
+            FastJSONRenderer().render(DATA),
+            JSONRenderer().render(DATA)
+        )
+
+    def test_same_output_without_orjson(self):
+        """Testea la alternativa sin orjson."""
+        with patch('core.renderers.orjson', None):
+            self.assertEqual(
+                FastJSONRenderer().render(DATA),
+                JSONRenderer().render(DATA)
+            )
+
+    def test_indent(self):
+        """Testea que con indentacion se use el renderer de DRF."""
+        content = FastJSONRenderer().render(
+            DATA,
+            'application/json; indent=4'
+        )
+
+        self.assertEqual(
+            content,
+            JSONRenderer().render(DATA, 'application/json; indent=4')
+        )
+        self.assertIn(b'\n    ', content)
+
+    def test_empty(self):
+        """Testea que sin datos el cuerpo quede vacio."""
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_large_integer(self):
+        """Testea enteros que orjson no codifica."""
+        self.assertEqual(dumps({'n': 2 ** 70}), b'{"n":%d}' % 2 ** 70)
+
+
+class FastJSONParserTests(SimpleTestCase):
+    """Testea el parser de core/renderers.py."""
+
+    def parse(self, content, **context):
+        return FastJSONParser().parse(io.BytesIO(content), None, context)
+
+    def test_parse(self):
+        """Testea que decodifique igual que JSONParser."""
+        content = '{"title": "Ñoquis", "tags": [1, 2], "price": 5.5}'
+        content = content.encode()
+
+        self.assertEqual(
+            self.parse(content),
+            JSONParser().parse(io.BytesIO(content), None, {})
+        )
+        self.assertEqual(
+            self.parse('{"title": "Ñoquis"}'.encode('latin1'),
+                       encoding='latin1'),
+            {'title': 'Ñoquis'}
+        )
+
+    def test_invalid(self):
+        """Testea que un cuerpo invalido responda un ParseError."""
+        for content in (b'{"title": ', b'{"price": NaN}'):
+            with self.assertRaises(ParseError):
+                self.parse(content)
+            with patch('core.renderers.orjson', None), \
+                    self.assertRaises(ParseError):
+                self.parse(content)
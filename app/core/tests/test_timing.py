@@ -0,0 +1,132 @@
+import re
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import timing
+from core.models import Recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def parse_header(value):
+    """Retorna {nombre: milisegundos} de una cabecera Server-Timing."""
+    return {
+        match.group(1): float(match.group(2))
+        for match in re.finditer(r'(\w+);dur=([\d.]+)', value)
+    }
+
+
+class TimerTests(TestCase):
+    """Testea la contabilidad de fases del Timer."""
+
+    def test_nested_phases_are_exclusive(self):
+        """Testea que el tiempo de una fase anidada no se cuente dos
+        veces y que las fases sumen el total medido."""
+        timer = timing.Timer()
+        with timer.phase('view'):
+            with timer.phase('serializer'):
+                with timer.phase('db'):
+                    pass
+
+        self.assertEqual(set(timer.totals), {'view', 'serializer', 'db'})
+        self.assertLessEqual(sum(timer.totals.values()), timer.total())
+        self.assertTrue(all(value >= 0 for value in timer.totals.values()))
+
+    def test_stop_closes_open_phases(self):
+        """Testea que cerrar una fase cierre las que quedaron abiertas
+        dentro de ella."""
+        timer = timing.Timer()
+        timer.start('view')
+        timer.start('render')
+        timer.stop('view')
+
+        self.assertEqual(timer.stack, [])
+        self.assertIn('render', timer.totals)
+
+    def test_keeps_slowest_queries(self):
+        """Testea que solo se conserven las consultas mas lentas."""
+        timer = timing.Timer(slow_queries=2)
+        # Inicio y fin de cada consulta: A dura 6, B 1 y C 3.
+        clock = iter([0, 6, 10, 11, 20, 23])
+        with patch('core.timing.time.perf_counter', lambda: next(clock)):
+            for sql in ('A', 'B', 'C'):
+                timer.execute(lambda *args: None, sql, None, False, {})
+
+        self.assertEqual(timer.query_count, 3)
+        self.assertEqual([sql for _, sql in timer.slowest()], ['A', 'C'])
+
+    def test_phase_outside_request(self):
+        """Testea que phase no haga nada fuera de un pedido."""
+        with timing.phase('serializer'):
+            pass
+
+        self.assertIsNone(timing.current())
+
+
+class ServerTimingMiddlewareTests(TestCase):
+    """Testea la cabecera Server-Timing y el log de pedidos lentos."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@francorueta.com',
+            'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Recipe.objects.create(
+            user=self.user,
+            title='Pollo al horno',
+            time_minutes=30,
+            price=100
+        )
+
+    def test_header_phases(self):
+        """Testea que la cabecera separe db, vista, serializacion y
+        render, y cuente las consultas."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, 200)
+        metrics = parse_header(res['Server-Timing'])
+        self.assertEqual(
+            set(metrics),
+            {'db', 'view', 'serializer', 'render', 'total'}
+        )
+        self.assertRegex(res['Server-Timing'], r'desc="\d+ consultas"')
+        phases = sum(
+            value for name, value in metrics.items() if name != 'total'
+        )
+        # Cada fase se redondea a 0.1ms por separado.
+        self.assertLessEqual(phases, metrics['total'] + 0.5)
+
+    @patch('core.timing.HEADER', False)
+    def test_header_disabled(self):
+        """Testea que la cabecera se pueda desactivar."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertNotIn('Server-Timing', res)
+
+    @patch('core.timing.SLOW_REQUEST_MS', 0)
+    def test_slow_request_logged(self):
+        """Testea que un pedido lento se registre con sus consultas mas
+        lentas."""
+        with self.assertLogs('core.timing', 'WARNING') as logs:
+            self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn(
+            'Pedido lento: GET /api/recipe/recipes/ 200',
+            logs.output[0]
+        )
+        self.assertIn('SELECT', logs.output[0])
+
+    def test_fast_request_not_logged(self):
+        """Testea que un pedido rapido no se registre."""
+        with patch.object(timing.logger, 'warning') as warning:
+            self.client.get(RECIPES_URL)
+
+        warning.assert_not_called()
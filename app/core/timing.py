@@ -0,0 +1,180 @@
+"""Medicion de tiempos por pedido.
+
+ServerTimingMiddleware instala un Timer por pedido que cuenta las
+consultas SQL (con execute_wrapper, en todas las conexiones) y separa
+el tiempo en fases: db, serializer, render y view (el resto: vista y
+middlewares). Cada fase se mide sin las fases anidadas, asi la suma da
+el total. El resultado va en la cabecera Server-Timing y, si el pedido
+supera SLOW_REQUEST_MS, se registra con sus consultas mas lentas.
+"""
+import contextlib
+import heapq
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+HEADER = getattr(settings, 'SERVER_TIMING_HEADER', True)
+SLOW_REQUEST_MS = getattr(settings, 'SLOW_REQUEST_MS', 500)
+SLOW_QUERIES = getattr(settings, 'SLOW_REQUEST_QUERIES', 5)
+
+_local = threading.local()
+
+
+class Timer:
+    """Acumula el tiempo exclusivo de cada fase y las consultas del
+    pedido. Solo conserva las `slow_queries` consultas mas lentas."""
+
+    def __init__(self, slow_queries=SLOW_QUERIES):
+        self.started = time.perf_counter()
+        self.totals = {}
+        self.query_count = 0
+        self.slow_queries = slow_queries
+        self.queries = []
+        # Fases abiertas: [nombre, inicio, tiempo de las fases hijas]
+        self.stack = []
+
+    def start(self, name):
+        self.stack.append([name, time.perf_counter(), 0.0])
+
+    def stop(self, name=None):
+        """Cierra la fase `name` y las que hayan quedado abiertas dentro
+        de ella (por ejemplo render, si fallo). Retorna su duracion."""
+        while name is not None and self.stack[-1][0] != name:
+            self.stop()
+        name, started, children = self.stack.pop()
+        elapsed = time.perf_counter() - started
+        self.totals[name] = self.totals.get(name, 0.0) + elapsed - children
+        if self.stack:
+            self.stack[-1][2] += elapsed
+        return elapsed
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop(name)
+
+    def execute(self, execute, sql, params, many, context):
+        """execute_wrapper: mide la consulta como fase db."""
+        self.start('db')
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = self.stop('db')
+            self.query_count += 1
+            entry = (elapsed, self.query_count, sql)
+            if len(self.queries) < self.slow_queries:
+                heapq.heappush(self.queries, entry)
+            elif self.queries:
+                heapq.heappushpop(self.queries, entry)
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def slowest(self):
+        """Consultas mas lentas, de mayor a menor: (segundos, sql)."""
+        return [
+            (elapsed, sql)
+            for elapsed, _, sql in sorted(self.queries, reverse=True)
+        ]
+
+    def header(self, total):
+        """Valor de la cabecera Server-Timing, en milisegundos."""
+        metrics = []
+        for name, seconds in sorted(self.totals.items()):
+            metric = f'{name};dur={seconds * 1000:.1f}'
+            if name == 'db':
+                metric += f';desc="{self.query_count} consultas"'
+            metrics.append(metric)
+        metrics.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(metrics)
+
+
+def current():
+    """Timer del pedido en curso en este thread, o None."""
+    return getattr(_local, 'timer', None)
+
+
+def phase(name):
+    """Mide un bloque como fase del pedido en curso; fuera de un pedido
+    no hace nada."""
+    timer = current()
+    if timer is None:
+        return contextlib.nullcontext()
+    return timer.phase(name)
+
+
+class TimedSerializerMixin:
+    """Mide la serializacion (el acceso a `data`) como fase serializer.
+    Las consultas que dispare se descuentan y quedan en db."""
+
+    @property
+    def data(self):
+        with phase('serializer'):
+            return super().data
+
+
+class ServerTimingMiddleware:
+    """Debe ir primero en MIDDLEWARE para que view incluya al resto."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = Timer()
+        _local.timer = timer
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(timer.execute)
+                    )
+                with timer.phase('view'):
+                    response = self.get_response(request)
+        finally:
+            _local.timer = None
+
+        total = timer.total()
+        if HEADER:
+            response['Server-Timing'] = timer.header(total)
+        if total * 1000 >= SLOW_REQUEST_MS:
+            self.log_slow(request, response, timer, total)
+        return response
+
+    def process_template_response(self, request, response):
+        """Las respuestas de DRF se renderizan despues de la vista; la
+        fase render termina con el callback posterior al render."""
+        timer = current()
+        if timer is None:
+            return response
+
+        def rendered(response):
+            # Si el callback retorna algo, Django lo usa como respuesta.
+            timer.stop('render')
+
+        timer.start('render')
+        response.add_post_render_callback(rendered)
+        return response
+
+    def log_slow(self, request, response, timer, total):
+        queries = ''.join(
+            f'\n  {elapsed * 1000:.1f}ms {sql}'
+            for elapsed, sql in timer.slowest()
+        )
+        logger.warning(
+            'Pedido lento: %s %s %s en %.1fms (%s)%s',
+            request.method,
+            request.get_full_path(),
+            response.status_code,
+            total * 1000,
+            timer.header(total),
+            queries
+        )
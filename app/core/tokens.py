@@ -0,0 +1,261 @@
+"""Tokens de acceso firmados y tokens de refresco.
+
+El token de acceso lleva los datos del usuario firmados con HMAC
+(django.core.signing, con SECRET_KEY) y vence a los ACCESS_TOKEN_TTL
+segundos: verificarlo no consulta la base. Para renovarlo se canjea el
+token de refresco, que si se guarda en la base (solo su hash) y se
+reemplaza en cada canje.
+
+Como un token de acceso no se puede "borrar", el cierre de sesion y la
+desactivacion de usuarios se registran en TokenRevocation, igual que el
+borrado de un Token de DRF que otro proceso puede tener en cache. Cada proceso
+mantiene en memoria las revocaciones vigentes (las que todavia no
+vencieron, por lo que la lista es chica) y las relee como maximo cada
+TOKEN_REVOCATION_REFRESH segundos: un token revocado en otro proceso
+puede seguir valiendo ese tiempo.
+"""
+import datetime
+import hashlib
+import secrets
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from core.models import RefreshToken, TokenRevocation
+
+
+ACCESS_TTL = getattr(settings, 'ACCESS_TOKEN_TTL', 300)
+REFRESH_TTL = getattr(settings, 'REFRESH_TOKEN_TTL', 30 * 24 * 3600)
+REVOCATION_REFRESH = getattr(settings, 'TOKEN_REVOCATION_REFRESH', 5)
+# Lo que un Token de DRF borrado puede seguir en el cache de otro
+# proceso (ver core/authentication.py).
+TOKEN_CACHE_TTL = getattr(settings, 'TOKEN_CACHE_TTL', 300)
+SALT = 'core.tokens.access'
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def hash_key(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def key_jti(key):
+    """jti con el que se revoca un Token de DRF borrado. El prefijo lo
+    distingue de los jti de los tokens firmados."""
+    return 'k:' + hash_key(key)[:30]
+
+
+def issue_access(user):
+    """Token de acceso con id, email, nombre y permisos del usuario."""
+    return signing.dumps({
+        'u': user.pk,
+        'e': user.email,
+        'n': user.name,
+        's': user.is_staff,
+        'j': secrets.token_hex(8),
+        'i': time.time(),
+    }, salt=SALT)
+
+
+def verify_access(token):
+    """Retorna los datos del token, o lanza InvalidToken si la firma no
+    es valida, vencio o fue revocado."""
+    try:
+        claims = signing.loads(token, salt=SALT, max_age=ACCESS_TTL)
+    except signing.BadSignature:
+        raise InvalidToken()
+    if revocations.is_revoked(claims):
+        raise InvalidToken()
+    return claims
+
+
+def user_from_claims(claims):
+    """Usuario armado con los datos del token, sin consultar la base.
+    Alcanza para filtrar y asignar por usuario; para modificarlo hay
+    que cargarlo de la base."""
+    user = get_user_model()(
+        id=claims['u'],
+        email=claims['e'],
+        name=claims['n'],
+        is_staff=claims['s'],
+        is_active=True
+    )
+    user._state.adding = False
+    user._state.db = DEFAULT_DB_ALIAS
+    return user
+
+
+def purge_refresh():
+    """Borra de la base los tokens de refresco vencidos. Los canjeados
+    ya se borran en rotate_refresh."""
+    RefreshToken.objects.filter(expires_at__lte=timezone.now()).delete()
+
+
+def issue_refresh(user):
+    purge_refresh()
+    key = secrets.token_urlsafe(32)
+    RefreshToken.objects.create(
+        user=user,
+        key_hash=hash_key(key),
+        expires_at=timezone.now() + datetime.timedelta(seconds=REFRESH_TTL)
+    )
+    return key
+
+
+def issue_pair(user):
+    return {
+        'access': issue_access(user),
+        'refresh': issue_refresh(user),
+        'expires_in': ACCESS_TTL,
+    }
+
+
+def rotate_refresh(key):
+    """Canjea un token de refresco por un par nuevo. El token canjeado
+    deja de valer."""
+    with transaction.atomic():
+        token = RefreshToken.objects.select_for_update().select_related(
+            'user'
+        ).filter(
+            key_hash=hash_key(key),
+            expires_at__gt=timezone.now()
+        ).first()
+        if token is None or not token.user.is_active:
+            raise InvalidToken()
+        token.delete()
+        return token.user, issue_pair(token.user)
+
+
+def revoke_refresh(user, key=None):
+    """Borra un token de refresco del usuario, o todos sin `key`."""
+    tokens = RefreshToken.objects.filter(user=user)
+    if key is not None:
+        tokens = tokens.filter(key_hash=hash_key(key))
+    tokens.delete()
+
+
+class RevocationList:
+    """Revocaciones vigentes en memoria: jti revocados y, por usuario,
+    el instante antes del cual sus tokens no valen."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.tokens = set()
+        self.users = {}
+        self.loaded_at = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Relee las revocaciones si pasaron mas de `interval` segundos
+        desde la ultima lectura."""
+        if self.loaded_at is None or \
+                time.monotonic() - self.loaded_at >= self.interval:
+            self.reload()
+
+    def is_revoked(self, claims):
+        self.refresh()
+        if claims['j'] in self.tokens:
+            return True
+        revoked_at = self.users.get(claims['u'])
+        return revoked_at is not None and claims['i'] <= revoked_at
+
+    def is_key_revoked(self, key):
+        """Indica si se borro el Token de DRF con esa clave."""
+        self.refresh()
+        return key_jti(key) in self.tokens
+
+    def user_revoked_since(self, user_id, timestamp):
+        """Indica si los tokens del usuario se revocaron despues de
+        `timestamp` (segundos desde epoch)."""
+        self.refresh()
+        revoked_at = self.users.get(user_id)
+        return revoked_at is not None and revoked_at >= timestamp
+
+    def reload(self):
+        """Relee las revocaciones que todavia no vencieron."""
+        rows = TokenRevocation.objects.filter(
+            expires_at__gt=timezone.now()
+        ).values_list('user_id', 'jti', 'created_at')
+        tokens = set()
+        users = {}
+        for user_id, jti, created_at in rows:
+            if jti:
+                tokens.add(jti)
+            else:
+                users[user_id] = max(
+                    users.get(user_id, 0),
+                    created_at.timestamp()
+                )
+        with self._lock:
+            self.tokens = tokens
+            self.users = users
+            self.loaded_at = time.monotonic()
+
+    def revoke_token(self, claims):
+        """Revoca un token de acceso hasta su vencimiento."""
+        expires_at = datetime.datetime.fromtimestamp(
+            claims['i'] + ACCESS_TTL,
+            datetime.timezone.utc
+        )
+        self.purge()
+        TokenRevocation.objects.create(
+            user_id=claims['u'],
+            jti=claims['j'],
+            expires_at=expires_at
+        )
+        with self._lock:
+            self.tokens.add(claims['j'])
+
+    def revoke_key(self, user_id, key):
+        """Revoca un Token de DRF borrado mientras pueda seguir en el
+        cache de otro proceso."""
+        self.purge()
+        TokenRevocation.objects.create(
+            user_id=user_id,
+            jti=key_jti(key),
+            expires_at=timezone.now() + datetime.timedelta(
+                seconds=TOKEN_CACHE_TTL
+            )
+        )
+        with self._lock:
+            self.tokens.add(key_jti(key))
+
+    def revoke_user(self, user_id):
+        """Revoca todos los tokens de acceso emitidos hasta ahora para
+        el usuario. Dura lo que el mas largo entre un token de acceso y
+        una entrada del cache de Tokens de DRF, que tambien la
+        consulta."""
+        self.purge()
+        revocation = TokenRevocation.objects.create(
+            user_id=user_id,
+            expires_at=timezone.now() + datetime.timedelta(
+                seconds=max(ACCESS_TTL, TOKEN_CACHE_TTL)
+            )
+        )
+        with self._lock:
+            self.users[user_id] = max(
+                self.users.get(user_id, 0),
+                revocation.created_at.timestamp()
+            )
+
+    def purge(self):
+        """Borra de la base las revocaciones vencidas."""
+        TokenRevocation.objects.filter(
+            expires_at__lte=timezone.now()
+        ).delete()
+
+    def clear(self):
+        with self._lock:
+            self.tokens = set()
+            self.users = {}
+            self.loaded_at = None
+
+
+revocations = RevocationList(REVOCATION_REFRESH)
@@ -0,0 +1,85 @@
+from django.db.utils import OperationalError
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import metrics, profiling
+from core.authentication import CachedTokenAuthentication, \
+    SignedTokenAuthentication
+from core.db import ping
+
+
+@never_cache
+@require_GET
+def live(request):
+    """El proceso responde; no consulta la base."""
+    return JsonResponse({'status': 'ok'})
+
+
+@never_cache
+@require_GET
+def ready(request):
+    """La base responde. Usa la conexion persistente del worker, asi la
+    sonda no abre una conexion nueva en cada chequeo."""
+    try:
+        ping()
+    except OperationalError:
+        return JsonResponse({'status': 'unavailable'}, status=503)
+    return JsonResponse({'status': 'ok'})
+
+
+@never_cache
+@require_GET
+def metrics_view(request):
+    """Metricas en el formato de texto de Prometheus."""
+    return HttpResponse(
+        generate_latest(metrics.registry()),
+        content_type=CONTENT_TYPE_LATEST
+    )
+
+
+class ProfileListView(APIView):
+    """Lista los perfiles guardados por core/profiling.py."""
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SignedTokenAuthentication
+    )
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(profiling.list_profiles())
+
+
+class ProfileDetailView(APIView):
+    """Descarga un perfil (archivo de pstats) o, con ?output=text, su
+    resumen ordenado por ?sort= (cumulative por defecto)."""
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SignedTokenAuthentication
+    )
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request, name):
+        path = profiling.profile_path(name)
+        if path is None:
+            raise Http404
+        if request.query_params.get('output') == 'text':
+            sort = request.query_params.get('sort', 'cumulative')
+            try:
+                text = profiling.summary(path, sort)
+            except KeyError:
+                return Response(
+                    {'sort': f'Orden desconocido: {sort}'},
+                    status=400
+                )
+            return HttpResponse(text, content_type='text/plain')
+        return FileResponse(
+            open(path, 'rb'),
+            as_attachment=True,
+            filename=name,
+            content_type='application/octet-stream'
+        )
@@ -0,0 +1,113 @@
+"""Cache por usuario de los listados de tags e ingredientes.
+
+Cada entrada guarda la pagina serializada junto con su ETag, asi un
+acierto no consulta la base ni vuelve a serializar. Las claves incluyen
+una generacion por (modelo, usuario) que se renueva al guardar o borrar
+un objeto de ese usuario: las entradas viejas quedan inalcanzables y
+expiran solas, sin afectar a otros usuarios.
+
+Por defecto se usa un LRU en memoria de cada proceso, cuya generacion
+solo se renueva en el proceso que recibio la escritura: por eso, sin
+LIST_CACHE_ALIAS, las vistas agregan a la clave el estado del listado y
+un acierto cuesta una consulta (ver recipe.views.CachedListMixin). Con
+varios procesos conviene configurar LIST_CACHE_ALIAS con un cache
+compartido.
+"""
+import hashlib
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core import metrics
+from core.cache import LRUCache
+
+
+class ListCache:
+    """Cache de respuestas de listado con contadores de aciertos."""
+
+    def __init__(self, max_size, ttl, alias=None):
+        self.ttl = ttl
+        self.alias = alias
+        self.local = LRUCache(max_size=max_size, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def backend_get(self, key):
+        if self.alias:
+            return caches[self.alias].get(key)
+        return self.local.get(key)
+
+    def backend_set(self, key, value):
+        if self.alias:
+            caches[self.alias].set(key, value, self.ttl)
+        else:
+            self.local.set(key, value)
+
+    def generation_key(self, model, user_id):
+        # El 2 es la version del formato de las entradas, (etag, data).
+        return f'list-cache:2:{model._meta.label_lower}:{user_id}'
+
+    def generation(self, model, user_id):
+        """Retorna la generacion vigente, creando una si no existe."""
+        key = self.generation_key(model, user_id)
+        generation = self.backend_get(key)
+        if generation is None:
+            generation = uuid.uuid4().hex
+            self.backend_set(key, generation)
+        return generation
+
+    def key(self, model, user_id, path):
+        digest = hashlib.sha1(path.encode()).hexdigest()
+        generation = self.generation(model, user_id)
+        return f'{self.generation_key(model, user_id)}:{generation}:{digest}'
+
+    def get(self, key):
+        """Retorna (etag, data) o None."""
+        value = self.backend_get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        result = 'miss' if value is None else 'hit'
+        metrics.CACHE.labels('list', result).inc()
+        return value
+
+    def set(self, key, etag, data):
+        self.backend_set(key, (etag, data))
+
+    def invalidate(self, model, user_id):
+        """Renueva la generacion del usuario para el modelo."""
+        self.backend_set(
+            self.generation_key(model, user_id),
+            uuid.uuid4().hex
+        )
+
+    def stats(self):
+        """Contadores del proceso actual."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'backend': self.alias or 'local',
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / total if total else 0.0,
+                'local_entries': len(self.local),
+            }
+
+    def clear(self):
+        """Vacia el cache local y reinicia los contadores."""
+        self.local.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+list_cache = ListCache(
+    max_size=getattr(settings, 'LIST_CACHE_MAX_SIZE', 10000),
+    ttl=getattr(settings, 'LIST_CACHE_TTL', 300),
+    alias=getattr(settings, 'LIST_CACHE_ALIAS', None),
+)
@@ -0,0 +1,125 @@
+"""Exportacion del recetario de un usuario en NDJSON o CSV.
+
+Las recetas se recorren por id en bloques de EXPORT_CHUNK_SIZE, con una
+consulta por bloque para las recetas y una por cada relacion, asi la
+memoria no crece con el tamaño del recetario. El mismo formato es el
+que lee el comando import_recipes.
+"""
+import csv
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from core.models import Recipe
+from core.renderers import dumps
+
+
+FIELDS = (
+    'id', 'title', 'time_minutes', 'price', 'link', 'image',
+    'tags', 'ingredients',
+)
+
+# Separador de los nombres de tags e ingredientes en una celda CSV. Un
+# nombre que lo contiene va entre comillas (ver join_names).
+LIST_SEPARATOR = '|'
+
+CHUNK_SIZE = getattr(settings, 'EXPORT_CHUNK_SIZE', 1000)
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def related_names(field, recipe_ids):
+    """Nombres de las tags o ingredientes de cada receta, leidos de la
+    tabla intermedia. Es mas liviano que prefetch_related, que arma un
+    queryset por receta."""
+    target = field.field.m2m_reverse_field_name()
+    rows = field.through.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', f'{target}__name').order_by('id')
+    names = {}
+    for recipe_id, name in rows:
+        names.setdefault(recipe_id, []).append(name)
+    return names
+
+
+def iter_recipes(queryset, chunk_size=None):
+    """Recorre las recetas en orden de id, paginando por clave, y genera
+    un dict por receta con los nombres de sus tags e ingredientes. Se
+    leen valores y no instancias: el campo de imagen crea referencias
+    circulares que el recolector tarda en liberar."""
+    chunk_size = chunk_size or CHUNK_SIZE
+    queryset = queryset.values(
+        'id', 'title', 'time_minutes', 'price', 'link', 'image'
+    ).order_by('id')
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        ids = [row['id'] for row in chunk]
+        tags = related_names(Recipe.tags, ids)
+        ingredients = related_names(Recipe.ingredients, ids)
+        for row in chunk:
+            row['tags'] = tags.get(row['id'], [])
+            row['ingredients'] = ingredients.get(row['id'], [])
+            yield row
+        last_id = chunk[-1]['id']
+
+
+def to_dict(row, request=None):
+    """Representacion de una receta para exportar: precio como texto
+    e imagen como URL."""
+    image = ''
+    if row['image']:
+        image = default_storage.url(row['image'])
+        if request is not None:
+            image = request.build_absolute_uri(image)
+    return dict(row, price=str(row['price']), image=image)
+
+
+def ndjson_lines(rows, request=None):
+    """Una receta JSON por linea."""
+    for row in rows:
+        yield dumps(to_dict(row, request)) + b'\n'
+
+
+class Echo:
+    """Archivo que retorna lo escrito, para usar csv.writer como
+    generador de lineas."""
+
+    def write(self, value):
+        return value
+
+
+def join_names(names):
+    """Une los nombres en una celda con las reglas de CSV: un nombre que
+    contiene LIST_SEPARATOR o comillas va entre comillas, asi split_names
+    lo recupera entero."""
+    writer = csv.writer(Echo(), delimiter=LIST_SEPARATOR, lineterminator='')
+    return writer.writerow(names)
+
+
+def split_names(value):
+    """Inversa de join_names."""
+    return next(csv.reader([value], delimiter=LIST_SEPARATOR), [])
+
+
+def csv_lines(rows, request=None):
+    """Una fila por receta, con encabezado. Las tags e ingredientes
+    van en una celda separados por LIST_SEPARATOR (ver join_names)."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        row = to_dict(row, request)
+        row['tags'] = join_names(row['tags'])
+        row['ingredients'] = join_names(row['ingredients'])
+        yield writer.writerow([row[field] for field in FIELDS])
+
+
+WRITERS = {
+    'ndjson': ndjson_lines,
+    'csv': csv_lines,
+}
@@ -0,0 +1,133 @@
+"""Generacion de versiones redimensionadas de las imagenes de recetas.
+
+Despues de subir una imagen, upload_image llama a schedule_derivatives,
+que encola la generacion en un pool de threads al confirmarse la
+transaccion, asi el pedido responde sin esperar a Pillow.
+"""
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image, features
+
+from core.models import Recipe, RecipeImageDerivative
+
+
+logger = logging.getLogger(__name__)
+
+SIZES = getattr(settings, 'RECIPE_IMAGE_SIZES', {
+    'thumbnail': (150, 150),
+    'medium': (600, 600),
+})
+
+QUALITY = getattr(settings, 'RECIPE_IMAGE_QUALITY', 85)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_formats():
+    """Formatos a generar; WebP solo si Pillow fue compilado con
+    soporte para libwebp."""
+    formats = ['jpeg']
+    if features.check('webp'):
+        formats.append('webp')
+    return formats
+
+
+def get_executor():
+    """Retorna el pool de threads del proceso, creandolo si hace falta."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'RECIPE_IMAGE_WORKERS', 2),
+                thread_name_prefix='recipe-images'
+            )
+        return _executor
+
+
+def delete_derivatives(recipe):
+    """Elimina las versiones de la imagen anterior y sus archivos."""
+    for derivative in recipe.image_derivatives.all():
+        derivative.image.delete(save=False)
+        derivative.delete()
+
+
+def schedule_derivatives(recipe):
+    """Encola la generacion de versiones para la imagen actual. Con
+    RECIPE_IMAGE_WORKERS = 0 se generan en el mismo pedido, por ejemplo
+    para mediciones reproducibles."""
+    delete_derivatives(recipe)
+    image_name = recipe.image.name
+    if not getattr(settings, 'RECIPE_IMAGE_WORKERS', 2):
+        transaction.on_commit(
+            lambda: generate_derivatives(recipe.id, image_name)
+        )
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(run, recipe.id, image_name)
+    )
+
+
+def run(recipe_id, image_name):
+    """Tarea del pool: genera las versiones y libera la conexion a la
+    base que abrio este thread."""
+    try:
+        generate_derivatives(recipe_id, image_name)
+    except Exception:
+        logger.exception('No se pudo procesar la imagen %s', image_name)
+    finally:
+        connection.close()
+
+
+def generate_derivatives(recipe_id, image_name):
+    """Genera cada tamaño en cada formato para la imagen de la receta.
+    Si la receta ya tiene otra imagen (se subio una nueva mientras
+    esta tarea esperaba) no hace nada."""
+    recipe = Recipe.objects.filter(id=recipe_id).first()
+    if recipe is None or recipe.image.name != image_name:
+        return []
+
+    with recipe.image.open('rb') as image_file:
+        original = Image.open(image_file)
+        # En JPEG, draft() decodifica directamente a una escala reducida.
+        original.draft('RGB', max(SIZES.values()))
+        original = original.convert('RGB')
+
+    derivatives = []
+    for size, box in SIZES.items():
+        resized = original.copy()
+        resized.thumbnail(box, Image.LANCZOS)
+        for image_format in get_formats():
+            content = io.BytesIO()
+            resized.save(content, format=image_format, quality=QUALITY)
+            derivative = RecipeImageDerivative(
+                recipe=recipe,
+                size=size,
+                format=image_format
+            )
+            derivative.image.save(
+                f'{size}.{image_format}',
+                ContentFile(content.getvalue()),
+                save=False
+            )
+            derivatives.append(derivative)
+
+    with transaction.atomic():
+        recipe = Recipe.objects.select_for_update().filter(
+            id=recipe_id
+        ).first()
+        if recipe is None or recipe.image.name != image_name:
+            for derivative in derivatives:
+                derivative.image.delete(save=False)
+            return []
+        delete_derivatives(recipe)
+        RecipeImageDerivative.objects.bulk_create(derivatives)
+        Recipe.objects.filter(id=recipe_id).update(modified_at=timezone.now())
+    return derivatives
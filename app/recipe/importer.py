@@ -0,0 +1,232 @@
+"""Importacion masiva de recetas desde NDJSON o CSV, en el formato que
+genera recipe.export.
+
+Los nombres de tags e ingredientes se resuelven contra un mapa en
+memoria (nombre en minusculas -> id) cargado con una consulta; los que
+faltan se crean en bloque. Las recetas y sus filas intermedias se
+insertan con bulk_create o, en Postgres, con COPY.
+"""
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection
+from django.db.models import Max
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from core import bulk
+from core.models import Tag, Ingredient, Recipe
+from recipe import search, stats
+from recipe.export import split_names
+
+
+class InvalidRow(ValueError):
+    """Fila invalida; incluye el numero de linea."""
+
+
+def read_rows(stream, output):
+    """Genera (linea, fila) desde un archivo de texto."""
+    if output == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            for field in ('tags', 'ingredients'):
+                value = row.get(field) or ''
+                row[field] = [name for name in split_names(value) if name]
+            yield reader.line_num, row
+        return
+    for line_num, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_num, json.loads(line)
+        except ValueError:
+            raise InvalidRow(f'Linea {line_num}: JSON invalido.')
+
+
+def parse_row(line_num, row):
+    """Valida una fila y retorna (datos de la receta, tags,
+    ingredientes)."""
+    try:
+        data = {
+            'title': str(row['title']).strip(),
+            'time_minutes': parse_int(row['time_minutes']),
+            'price': Decimal(str(row['price'])).quantize(Decimal('0.01')),
+            'link': str(row.get('link') or ''),
+        }
+    except (KeyError, TypeError, ValueError, InvalidOperation) as exc:
+        raise InvalidRow(f'Linea {line_num}: fila invalida ({exc!r}).')
+    if not data['title'] or len(data['title']) > 255:
+        raise InvalidRow(f'Linea {line_num}: titulo invalido.')
+    if abs(data['price']) >= 10000:
+        raise InvalidRow(f'Linea {line_num}: precio invalido.')
+    if len(data['link']) > 255:
+        raise InvalidRow(f'Linea {line_num}: link demasiado largo.')
+    names = {}
+    for field in ('tags', 'ingredients'):
+        value = row.get(field) or []
+        if not isinstance(value, list):
+            raise InvalidRow(f'Linea {line_num}: {field} debe ser una lista.')
+        names[field] = [str(name).strip() for name in value]
+    tags, ingredients = names['tags'], names['ingredients']
+    if any(len(name) > 255 for name in tags + ingredients):
+        raise InvalidRow(f'Linea {line_num}: nombre demasiado largo.')
+    return data, tags, ingredients
+
+
+def parse_int(value):
+    """Entero desde JSON (int) o CSV (texto). int() aceptaria tambien
+    12.7 o True, truncandolos."""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f'{value!r} no es un entero')
+    return int(value)
+
+
+class NameMap:
+    """Ids de los tags o ingredientes del usuario por nombre, sin
+    distinguir mayusculas. Las claves son LOWER(nombre) calculado por la
+    base, como el indice unico (ver bulk.lower_names)."""
+
+    def __init__(self, model, user, batch_size):
+        self.model = model
+        self.user = user
+        self.batch_size = batch_size
+        self.ids = dict(model.objects.filter(user=user).annotate(
+            lower_name=Lower('name')
+        ).values_list('lower_name', 'id'))
+        # nombre -> clave en self.ids
+        self.keys = {}
+
+    def resolve(self, rows):
+        """Crea los nombres que faltan, en bloque."""
+        rows = list(rows)
+        self.keys.update(bulk.lower_names({
+            name for names in rows for name in names
+            if name and name not in self.keys
+        }))
+        missing = {}
+        for names in rows:
+            for name in names:
+                key = self.keys.get(name)
+                if name and key not in self.ids:
+                    missing.setdefault(key, name)
+        created = bulk.bulk_create(
+            self.model,
+            [self.model(user=self.user, name=name)
+             for name in missing.values()],
+            batch_size=self.batch_size
+        )
+        for obj in created:
+            self.ids[self.keys[obj.name]] = obj.id
+
+    def get_ids(self, names):
+        return {self.ids[self.keys[name]] for name in names if name}
+
+
+class RecipeImporter:
+    """Importa bloques de filas para un usuario. Cada llamada a
+    import_rows deberia correr dentro de una transaccion."""
+
+    def __init__(self, user, batch_size=1000, use_copy=False):
+        self.user = user
+        self.batch_size = batch_size
+        self.use_copy = use_copy
+        self.tags = NameMap(Tag, user, batch_size)
+        self.ingredients = NameMap(Ingredient, user, batch_size)
+
+    def import_rows(self, rows):
+        """Inserta las filas ya validadas (ver parse_row) y retorna los
+        ids de las recetas creadas."""
+        self.tags.resolve(tags for _, tags, _ in rows)
+        self.ingredients.resolve(ingredients for _, _, ingredients in rows)
+
+        if self.use_copy:
+            ids = self.copy_recipes([data for data, _, _ in rows])
+        else:
+            ids = self.insert_recipes([data for data, _, _ in rows])
+
+        tag_rows = [
+            (recipe_id, tag_id)
+            for recipe_id, (_, tags, _) in zip(ids, rows)
+            for tag_id in self.tags.get_ids(tags)
+        ]
+        ingredient_rows = [
+            (recipe_id, ingredient_id)
+            for recipe_id, (_, _, ingredients) in zip(ids, rows)
+            for ingredient_id in self.ingredients.get_ids(ingredients)
+        ]
+        if self.use_copy:
+            self.copy('core_recipe_tags', ('recipe_id', 'tag_id'), tag_rows)
+            self.copy(
+                'core_recipe_ingredients',
+                ('recipe_id', 'ingredient_id'),
+                ingredient_rows
+            )
+        else:
+            bulk.bulk_add_m2m(Recipe.tags, tag_rows, self.batch_size)
+            bulk.bulk_add_m2m(
+                Recipe.ingredients,
+                ingredient_rows,
+                self.batch_size
+            )
+        search.index_recipes(ids)
+        stats.bulk_added(
+            self.user.pk,
+            [(data['price'], data['time_minutes']) for data, _, _ in rows],
+            [tag_id for _, tag_id in tag_rows],
+            [ingredient_id for _, ingredient_id in ingredient_rows]
+        )
+        return ids
+
+    def insert_recipes(self, recipes):
+        """Inserta con bulk_create. En los motores que no devuelven los
+        ids (SQLite) se asignan explicitamente: las escrituras en SQLite
+        son seriales, asi que no hay carreras dentro de la transaccion."""
+        objs = [Recipe(user=self.user, **data) for data in recipes]
+        if not connection.features.can_return_ids_from_bulk_insert:
+            start = (Recipe.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+            for offset, obj in enumerate(objs):
+                obj.id = start + offset
+        Recipe.objects.bulk_create(
+            objs,
+            batch_size=bulk.capped_batch_size(Recipe, objs, self.batch_size)
+        )
+        return [obj.id for obj in objs]
+
+    def copy_recipes(self, recipes):
+        """Reserva los ids de la secuencia y carga las recetas con COPY,
+        asi las filas intermedias tambien pueden ir por COPY."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence('core_recipe', 'id')) "
+                "FROM generate_series(1, %s)",
+                [len(recipes)]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        now = timezone.now().isoformat()
+        self.copy(
+            'core_recipe',
+            ('id', 'user_id', 'title', 'time_minutes', 'price', 'link',
+             'image', 'modified_at'),
+            (
+                (recipe_id, self.user.id, data['title'],
+                 data['time_minutes'], data['price'], data['link'], '', now)
+                for recipe_id, data in zip(ids, recipes)
+            )
+        )
+        return ids
+
+    def copy(self, table, columns, rows):
+        """COPY ... FROM STDIN en formato CSV."""
+        buffer = io.StringIO()
+        csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(rows)
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                'COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)'.format(
+                    table=table,
+                    columns=', '.join(columns)
+                ),
+                buffer
+            )
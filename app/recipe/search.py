@@ -0,0 +1,123 @@
+"""Busqueda de texto completo de recetas.
+
+En Postgres cada receta guarda un tsvector (titulo con peso A, nombres de
+tags e ingredientes con peso B) indexado con GIN. En SQLite el mismo
+documento vive en la tabla virtual FTS5 core_recipe_fts. Para otros
+motores se usa un icontains sobre el titulo, sin ranking.
+"""
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+
+
+SEARCH_CONFIG = getattr(settings, 'RECIPE_SEARCH_CONFIG', 'spanish')
+
+# Nombres de tags e ingredientes de la receta r, separados por espacios.
+TERMS_SQL = """
+    COALESCE((SELECT {agg} FROM core_tag t
+              JOIN core_recipe_tags rt ON rt.tag_id = t.id
+              WHERE rt.recipe_id = r.id), '') || ' ' ||
+    COALESCE((SELECT {agg} FROM core_ingredient i
+              JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id
+              WHERE ri.recipe_id = r.id), '')
+"""
+
+POSTGRES_UPDATE_SQL = """
+    UPDATE core_recipe r SET search_vector =
+        setweight(to_tsvector(%s::regconfig, r.title), 'A') ||
+        setweight(to_tsvector(%s::regconfig, {terms}), 'B')
+    WHERE r.id = ANY(%s)
+""".format(terms=TERMS_SQL.format(agg="string_agg(name, ' ')"))
+
+SQLITE_DELETE_SQL = 'DELETE FROM core_recipe_fts WHERE rowid IN ({ids})'
+
+SQLITE_INSERT_SQL = """
+    INSERT INTO core_recipe_fts (rowid, title, terms)
+    SELECT r.id, r.title, {terms} FROM core_recipe r WHERE r.id IN ({ids})
+""".format(terms=TERMS_SQL.format(agg="group_concat(name, ' ')"), ids='{ids}')
+
+SQLITE_RANK_SQL = '-bm25(core_recipe_fts, 10.0, 1.0)'
+
+BATCH_SIZE = 1000
+
+
+def index_recipes(recipe_ids):
+    """Recalcula el documento de busqueda de las recetas indicadas.
+    Se llama desde las señales de recipe.signals y despues de las
+    escrituras masivas, que no disparan señales."""
+    recipe_ids = list(recipe_ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(recipe_ids), BATCH_SIZE):
+            batch = recipe_ids[start:start + BATCH_SIZE]
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    POSTGRES_UPDATE_SQL,
+                    [SEARCH_CONFIG, SEARCH_CONFIG, batch]
+                )
+            elif connection.vendor == 'sqlite':
+                ids = ', '.join(['%s'] * len(batch))
+                cursor.execute(SQLITE_DELETE_SQL.format(ids=ids), batch)
+                cursor.execute(SQLITE_INSERT_SQL.format(ids=ids), batch)
+
+
+def unindex_recipes(recipe_ids):
+    """Quita recetas eliminadas del indice. En Postgres el vector se
+    elimina junto con la fila, asi que no hace falta."""
+    recipe_ids = list(recipe_ids)
+    if connection.vendor != 'sqlite' or not recipe_ids:
+        return
+    with connection.cursor() as cursor:
+        ids = ', '.join(['%s'] * len(recipe_ids))
+        cursor.execute(SQLITE_DELETE_SQL.format(ids=ids), recipe_ids)
+
+
+def fts5_query(text):
+    """Escapa el texto del usuario como terminos FTS5 entre comillas,
+    que se combinan con AND."""
+    terms = ['"{}"'.format(term.replace('"', '""')) for term in text.split()]
+    return ' '.join(terms)
+
+
+def search(queryset, text, rank=True):
+    """Filtra las recetas que coinciden con el texto y anota su
+    relevancia en `rank` (mayor es mejor). Con rank=False solo filtra,
+    por ejemplo para agregar sobre los resultados."""
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(text, config=SEARCH_CONFIG)
+        queryset = queryset.filter(search_vector=query)
+        if not rank:
+            return queryset
+        # Se castea a double para que el cursor de paginacion compare
+        # exactamente el mismo valor que devolvio la base.
+        return queryset.annotate(rank=Cast(
+            SearchRank(F('search_vector'), query),
+            FloatField()
+        ))
+
+    if connection.vendor == 'sqlite':
+        match = fts5_query(text)
+        if not match:
+            return queryset.none()
+        # Se une la tabla FTS5 para que bm25() se calcule una sola vez
+        # por coincidencia, en lugar de una subconsulta por receta.
+        queryset = queryset.extra(
+            tables=['core_recipe_fts'],
+            where=[
+                'core_recipe_fts.rowid = core_recipe.id',
+                'core_recipe_fts MATCH %s',
+            ],
+            params=[match]
+        )
+        if not rank:
+            return queryset
+        return queryset.annotate(
+            rank=RawSQL(SQLITE_RANK_SQL, (), output_field=FloatField())
+        )
+
+    queryset = queryset.filter(Q(title__icontains=text))
+    if not rank:
+        return queryset
+    return queryset.annotate(rank=Value(0.0, output_field=FloatField()))
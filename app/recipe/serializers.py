@@ -1,48 +1,387 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.db.models.functions import Lower
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 
+from core import bulk
 from core.models import Tag, Ingredient, Recipe
+from core.timing import TimedSerializerMixin
+from recipe import search, stats
+from recipe.cache import list_cache
 
 
-class TagSerializer(serializers.ModelSerializer):
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """PrimaryKeyRelatedField que, dentro de un alta masiva, busca los
+    ids en el mapa que BulkCreateListSerializer carga con una sola
+    consulta, en lugar de hacer un get() por cada id."""
+
+    def to_internal_value(self, data):
+        objects = getattr(self.root, 'related_objects', {}).get(
+            self.parent.field_name
+        )
+        if objects is None:
+            return super().to_internal_value(data)
+        try:
+            return objects[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class BulkCreateListSerializer(TimedSerializerMixin,
+                               serializers.ListSerializer):
+    """Valida una lista de objetos en una pasada y los crea con
+    inserciones masivas, usando child.bulk_create()."""
+    default_error_messages = {
+        'max_items': _('No se pueden crear mas de {max_items} objetos '
+                       'por pedido.'),
+    }
+
+    def to_internal_value(self, data):
+        max_items = getattr(settings, 'BULK_CREATE_MAX_ITEMS', 10000)
+        if isinstance(data, list) and len(data) > max_items:
+            message = self.error_messages['max_items'].format(
+                max_items=max_items
+            )
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [message]
+            }, code='max_items')
+        if isinstance(data, list):
+            self.related_objects = self.load_related_objects(data)
+            if hasattr(self.child, 'load_existing_names'):
+                self.existing_names = self.child.load_existing_names(data)
+        return super().to_internal_value(data)
+
+    def load_related_objects(self, data):
+        """Carga con una consulta por campo todos los objetos
+        relacionados referenciados en la lista."""
+        related_objects = {}
+        for name, field in self.child.fields.items():
+            if not isinstance(field, serializers.ManyRelatedField) or \
+                    field.read_only:
+                continue
+            ids = set()
+            for item in data:
+                values = item.get(name) if isinstance(item, dict) else None
+                for value in values if isinstance(values, list) else []:
+                    try:
+                        ids.add(int(value))
+                    except (TypeError, ValueError):
+                        pass
+            queryset = field.child_relation.get_queryset()
+            related_objects[name] = queryset.in_bulk(ids)
+        return related_objects
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            return self.child.bulk_create(validated_data)
+
+
+class ImageDerivativesField(serializers.Field):
+    """URLs de las versiones redimensionadas de la imagen de una
+    receta, por tamaño y formato. Queda vacio hasta que el pool de
+    recipe.images termina de generarlas."""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        kwargs['source'] = 'image_derivatives'
+        super().__init__(**kwargs)
+
+    def to_representation(self, derivatives):
+        request = self.context.get('request')
+        images = {}
+        for derivative in derivatives.all():
+            url = derivative.image.url
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            images.setdefault(derivative.size, {})[derivative.format] = url
+        return images
+
+
+class SparseFieldsetMixin:
+    """Acepta `fields`, los nombres de los campos a serializar; el resto
+    se descarta (ver ?fields= en RecipeViewSet)."""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def readable_fields(cls):
+        """Campos de Meta.fields que aparecen en la respuesta: sin los
+        declarados write_only, como tag_names."""
+        return tuple(
+            name for name in cls.Meta.fields
+            if not getattr(cls._declared_fields.get(name), 'write_only',
+                           False)
+        )
+
+    @classmethod
+    def parse_fields(cls, value):
+        """Convierte 'id,title' en la tupla de campos a serializar, en
+        el orden de Meta.fields, o None si no se pidio ninguno."""
+        names = {name.strip() for name in value.split(',')} - {''}
+        if not names:
+            return None
+        readable = cls.readable_fields()
+        unknown = names - set(readable)
+        if unknown:
+            raise serializers.ValidationError({
+                'fields': _('Campos desconocidos: %s.') % ', '.join(
+                    sorted(unknown)
+                )
+            })
+        return tuple(name for name in readable if name in names)
+
+
+class UniqueNameSerializerMixin:
+    """Valida que el nombre no este repetido para el usuario, sin
+    distinguir mayusculas, ni dentro de la misma lista en un alta
+    masiva. La base lo garantiza con un indice unico sobre
+    (user_id, lower(name))."""
+    default_error_messages = {
+        'duplicate_name': _('Ya existe un objeto con este nombre.'),
+    }
+    # Limite de variables por consulta en SQLite.
+    names_per_query = 500
+
+    def get_user(self):
+        request = self.context.get('request')
+        return getattr(request, 'user', None)
+
+    def names_queryset(self):
+        model = self.Meta.model
+        return model.objects.filter(user=self.get_user()).annotate(
+            lower_name=Lower('name')
+        )
+
+    def load_existing_names(self, data):
+        """Carga con una consulta por lote los nombres de la lista que
+        ya existen."""
+        if self.get_user() is None:
+            return None
+        names = list({
+            item['name'].lower() for item in data
+            if isinstance(item, dict) and isinstance(item.get('name'), str)
+        })
+        existing = set()
+        for start in range(0, len(names), self.names_per_query):
+            existing.update(self.names_queryset().filter(
+                lower_name__in=names[start:start + self.names_per_query]
+            ).values_list('lower_name', flat=True))
+        return existing
+
+    def validate_name(self, value):
+        if self.get_user() is None:
+            return value
+        existing = getattr(self.root, 'existing_names', None)
+        name = value.lower()
+        if existing is None:
+            queryset = self.names_queryset().filter(lower_name=name)
+            if self.instance is not None:
+                queryset = queryset.exclude(pk=self.instance.pk)
+            duplicate = queryset.exists()
+        else:
+            duplicate = name in existing
+            existing.add(name)
+        if duplicate:
+            raise serializers.ValidationError(
+                self.error_messages['duplicate_name'],
+                code='duplicate_name'
+            )
+        return value
+
+
+class TagSerializer(TimedSerializerMixin, UniqueNameSerializerMixin,
+                    serializers.ModelSerializer):
     """Serializador para objetos tipo tag"""
+    # Solo aparece si la vista anoto recipe_count (?with_counts=1); si
+    # no, DRF omite el campo de solo lectura.
+    recipe_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Tag
-        fields = ('id','name')
+        fields = ('id', 'name', 'recipe_count')
         read_only_fields = ('id',)
+        list_serializer_class = BulkCreateListSerializer
 
+    def bulk_create(self, validated_data):
+        """Crea varias tags con un solo INSERT."""
+        return bulk.bulk_create(Tag, [Tag(**data) for data in validated_data])
 
 
-
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, UniqueNameSerializerMixin,
+                           serializers.ModelSerializer):
     """Serializador para objetos tipo ingrediente"""
+    recipe_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Ingredient
-        fields = ('id','name')
+        fields = ('id', 'name', 'recipe_count')
         read_only_fields = ('id',)
-    
+        list_serializer_class = BulkCreateListSerializer
+
+    def bulk_create(self, validated_data):
+        """Crea varios ingredientes con un solo INSERT."""
+        return bulk.bulk_create(
+            Ingredient,
+            [Ingredient(**data) for data in validated_data]
+        )
 
 
-class RecipeSerializer(serializers.ModelSerializer):
-    """Serializador para objetos tipo receta."""
-    ingredients = serializers.PrimaryKeyRelatedField(
+class RecipeSerializer(TimedSerializerMixin, SparseFieldsetMixin,
+                       serializers.ModelSerializer):
+    """Serializador para objetos tipo receta. Las tags e ingredientes
+    se pueden enviar por id (`tags`, `ingredients`) y/o por nombre
+    (`tag_names`, `ingredient_names`); los nombres que el usuario no
+    tiene se crean."""
+    ingredients = BulkPrimaryKeyRelatedField(
         many=True,
-        queryset=Ingredient.objects.all()
+        queryset=Ingredient.objects.all(),
+        required=False
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BulkPrimaryKeyRelatedField(
         many=True,
-        queryset=Tag.objects.all()
+        queryset=Tag.objects.all(),
+        required=False
+    )
+    tag_names = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        write_only=True,
+        required=False
+    )
+    ingredient_names = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        write_only=True,
+        required=False
+    )
+    images = ImageDerivativesField()
+
+    default_error_messages = {
+        'unresolved_names': _('No se pudieron crear: {names}.'),
+    }
+
+    # (campo por id, campo por nombre, modelo)
+    attr_fields = (
+        ('tags', 'tag_names', Tag),
+        ('ingredients', 'ingredient_names', Ingredient),
     )
 
     class Meta:
         model = Recipe
         fields = (
-            'id','title','ingredients','tags',
-            'time_minutes','price','link'
+            'id', 'title', 'ingredients', 'tags',
+            'time_minutes', 'price', 'link', 'images',
+            'tag_names', 'ingredient_names'
         )
         read_only_fields = ('id',)
-    
+        list_serializer_class = BulkCreateListSerializer
+
+    def resolve_names(self, names_field, model, user, names):
+        """{nombre: id} de los nombres, creando los que faltan. Un
+        nombre que no se pudo crear ni encontrar es un error 400."""
+        ids = bulk.get_or_create_by_name(model, user, names)
+        unresolved = sorted(set(names) - set(ids))
+        if unresolved:
+            raise serializers.ValidationError({
+                names_field: [self.error_messages['unresolved_names'].format(
+                    names=', '.join(unresolved)
+                )]
+            })
+        return ids
+
+    def pop_attr_ids(self, validated_data, user):
+        """Quita de cada receta sus tags e ingredientes y retorna, por
+        relacion, la lista con el conjunto de ids de cada receta. Los
+        nombres de todas las recetas se resuelven juntos."""
+        attr_ids = {}
+        for field, names_field, model in self.attr_fields:
+            ids_by_name = self.resolve_names(names_field, model, user, [
+                name
+                for data in validated_data
+                for name in data.get(names_field, [])
+            ])
+            attr_ids[field] = [
+                {obj.id for obj in data.pop(field, [])} | {
+                    ids_by_name[name]
+                    for name in data.pop(names_field, [])
+                }
+                for data in validated_data
+            ]
+        return attr_ids
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            return self.bulk_create([validated_data])[0]
+
+    def update(self, instance, validated_data):
+        """Los nombres se suman a las tags e ingredientes enviados por
+        id o, si no se enviaron, a los que ya tiene la receta."""
+        with transaction.atomic():
+            for field, names_field, model in self.attr_fields:
+                if names_field not in validated_data:
+                    continue
+                ids_by_name = self.resolve_names(
+                    names_field,
+                    model,
+                    instance.user,
+                    validated_data.pop(names_field)
+                )
+                current = validated_data.get(field)
+                if current is None:
+                    current = getattr(instance, field).all()
+                validated_data[field] = \
+                    {obj.id for obj in current} | set(ids_by_name.values())
+            return super().update(instance, validated_data)
+
+    def bulk_create(self, validated_data):
+        """Crea varias recetas y sus filas de tags e ingredientes con
+        un INSERT por tabla, y actualiza el indice de busqueda. Los
+        nombres se resuelven con una consulta por modelo, asi la
+        cantidad de consultas no depende de la de recetas ni de nombres
+        (salvo en SQLite, ver core.bulk.bulk_create)."""
+        if not validated_data:
+            return []
+        user = validated_data[0]['user']
+        attr_ids = self.pop_attr_ids(validated_data, user)
+        recipes = [Recipe(**data) for data in validated_data]
+        for recipe in recipes:
+            # Se suman a las estadisticas todas juntas, abajo.
+            recipe._stats_bulk = True
+        recipes = bulk.bulk_create(Recipe, recipes)
+        added_ids = []
+        for field, names_field, model in self.attr_fields:
+            rows = [
+                (recipe.id, attr_id)
+                for recipe, ids in zip(recipes, attr_ids[field])
+                for attr_id in ids
+            ]
+            bulk.bulk_add_m2m(getattr(Recipe, field), rows)
+            if rows:
+                # Ni el INSERT ni la creacion masiva de nombres disparan
+                # m2m_changed o post_save en todos los motores.
+                list_cache.invalidate(model, user.pk)
+            added_ids.append([attr_id for recipe_id, attr_id in rows])
+        stats.bulk_added(
+            user.pk,
+            [(recipe.price, recipe.time_minutes) for recipe in recipes],
+            *added_ids
+        )
+        search.index_recipes(recipe.id for recipe in recipes)
+        prefetch_related_objects(
+            recipes,
+            'tags',
+            'ingredients',
+            'image_derivatives'
+        )
+        return recipes
+
 
 class RecipeDetailSerializer(RecipeSerializer):
     """Serializa un detalle de receta."""
@@ -50,12 +389,12 @@ class RecipeDetailSerializer(RecipeSerializer):
     tags = TagSerializer(many=True, read_only=True)
 
 
-
-
-class RecipeImageSerializer(serializers.ModelSerializer):
+class RecipeImageSerializer(TimedSerializerMixin,
+                            serializers.ModelSerializer):
     """Serializador para subir imagenes a recetas."""
+    images = ImageDerivativesField()
 
     class Meta:
         model = Recipe
-        fields = ('id','image')
-        read_only_fields = ('id',)
\ No newline at end of file
+        fields = ('id', 'image', 'images')
+        read_only_fields = ('id',)
@@ -0,0 +1,231 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save, \
+    pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Tag, Ingredient, Recipe, RecipeStatsCount
+from recipe import search, stats
+from recipe.cache import list_cache
+
+
+def recipes_changed(recipe_ids):
+    """Reindexa las recetas y actualiza su modified_at, que no cambia
+    solo cuando se modifican sus tablas relacionadas."""
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    Recipe.objects.filter(id__in=recipe_ids).update(
+        modified_at=timezone.now()
+    )
+    search.index_recipes(recipe_ids)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, raw=False, **kwargs):
+    """Actualiza el indice de busqueda de la receta."""
+    if not raw:
+        search.index_recipes([instance.id])
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    """Quita la receta del indice de busqueda e invalida los listados
+    de tags e ingredientes, que pueden depender de sus asignaciones."""
+    search.unindex_recipes([instance.id])
+    list_cache.invalidate(Tag, instance.user_id)
+    list_cache.invalidate(Ingredient, instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_attrs_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Marca como modificadas las recetas cuyas tags o ingredientes
+    cambiaron e invalida los listados cacheados del usuario."""
+    if action == 'pre_clear' and reverse:
+        instance._cleared_recipe_ids = list(
+            instance.recipe_set.values_list('id', flat=True)
+        )
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    model = Tag if sender is Recipe.tags.through else Ingredient
+    list_cache.invalidate(model, instance.user_id)
+    if not reverse:
+        recipes_changed([instance.id])
+    elif action == 'post_clear':
+        recipes_changed(instance.__dict__.pop('_cleared_recipe_ids', []))
+    else:
+        recipes_changed(pk_set)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def recipe_attr_saved(sender, instance, created, raw=False, **kwargs):
+    """Marca como modificadas las recetas que usan una tag o
+    ingrediente renombrado."""
+    if created or raw:
+        return
+    recipes_changed(instance.recipe_set.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def recipe_attr_list_changed(sender, instance, **kwargs):
+    """Invalida los listados cacheados del usuario."""
+    list_cache.invalidate(sender, instance.user_id)
+
+
+@receiver(post_save, sender=get_user_model())
+def user_created(sender, instance, created, **kwargs):
+    """Un usuario nuevo nunca debe ver entradas de otro con el mismo
+    id, por ejemplo despues de restaurar la base."""
+    if created:
+        list_cache.invalidate(Tag, instance.pk)
+        list_cache.invalidate(Ingredient, instance.pk)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def recipe_attr_deleting(sender, instance, **kwargs):
+    """Guarda las recetas afectadas antes de que se borren las filas
+    intermedias, que no disparan m2m_changed."""
+    instance._deleted_recipe_ids = list(
+        instance.recipe_set.values_list('id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def recipe_attr_deleted(sender, instance, **kwargs):
+    """Marca como modificadas las recetas que usaban la tag o
+    ingrediente borrado."""
+    recipes_changed(instance.__dict__.pop('_deleted_recipe_ids', []))
+
+
+def stats_values(recipe):
+    """(precio, minutos) cargados en la receta, o None si falta alguno
+    (por ejemplo si se cargo con only())."""
+    values = (recipe.__dict__.get('price'),
+              recipe.__dict__.get('time_minutes'))
+    return None if None in values else values
+
+
+@receiver(pre_save, sender=Recipe)
+def recipe_stats_saving(sender, instance, raw=False, update_fields=None,
+                        **kwargs):
+    """Lee de la base el precio y la duracion anteriores de una receta
+    existente, si se van a guardar."""
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and \
+            not {'price', 'time_minutes'} & set(update_fields):
+        return
+    instance._stats_previous = Recipe.objects.filter(
+        pk=instance.pk
+    ).values_list('price', 'time_minutes').first()
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_stats_saved(sender, instance, created, raw=False, **kwargs):
+    """Suma la receta nueva, o el cambio de precio o duracion, a las
+    estadisticas del usuario."""
+    previous = instance.__dict__.pop('_stats_previous', None)
+    if raw or instance.__dict__.pop('_stats_bulk', False):
+        # Las altas masivas se suman con stats.bulk_added.
+        return
+    values = stats_values(instance)
+    if values is None:
+        # Los campos que no se cargaron tampoco se guardaron.
+        return
+    if created:
+        stats.recipes_changed(instance.user_id, added=[values])
+    elif previous is not None and \
+            stats.normalize(*previous) != stats.normalize(*values):
+        stats.recipes_changed(
+            instance.user_id,
+            added=[values],
+            removed=[previous]
+        )
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_stats_deleting(sender, instance, **kwargs):
+    """Resta la receta de sus tags e ingredientes mientras existen las
+    filas intermedias."""
+    stats.recipe_deleting(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_stats_deleted(sender, instance, **kwargs):
+    """Resta la receta de las estadisticas del usuario."""
+    values = stats_values(instance)
+    if values is not None:
+        stats.recipes_changed(instance.user_id, removed=[values])
+    else:
+        stats.invalidate([instance.user_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_attrs_counted(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    """Actualiza la cantidad de recetas de cada tag o ingrediente."""
+    if sender is Recipe.tags.through:
+        kind, field = RecipeStatsCount.TAG, 'tags'
+    else:
+        kind, field = RecipeStatsCount.INGREDIENT, 'ingredients'
+    target = getattr(Recipe, field).field.m2m_reverse_field_name()
+    if action == 'pre_clear':
+        if reverse:
+            instance._stats_cleared = {
+                instance.id: -instance.recipe_set.count()
+            }
+        else:
+            instance._stats_cleared = {
+                pk: -1
+                for pk in getattr(instance, field).values_list(
+                    'id', flat=True
+                )
+            }
+        return
+    if action == 'pre_remove' and pk_set:
+        # pk_set trae tambien los ids que no estaban asignados.
+        if reverse:
+            instance._stats_removed = {
+                instance.id: -sender.objects.filter(**{
+                    target: instance.id,
+                    'recipe_id__in': pk_set,
+                }).count()
+            }
+        else:
+            instance._stats_removed = {
+                pk: -1
+                for pk in sender.objects.filter(**{
+                    'recipe_id': instance.id,
+                    f'{target}_id__in': pk_set,
+                }).values_list(f'{target}_id', flat=True)
+            }
+        return
+    if action == 'post_clear':
+        deltas = instance.__dict__.pop('_stats_cleared', {})
+    elif action == 'post_remove':
+        deltas = instance.__dict__.pop('_stats_removed', {})
+    elif action == 'post_add' and pk_set:
+        if reverse:
+            deltas = {instance.id: len(pk_set)}
+        else:
+            deltas = {pk: 1 for pk in pk_set}
+    else:
+        return
+    stats.attrs_changed(instance.user_id, kind, deltas)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def recipe_attr_stats_deleted(sender, instance, **kwargs):
+    """Quita la tag o ingrediente de las estadisticas del usuario."""
+    kind = RecipeStatsCount.TAG if sender is Tag \
+        else RecipeStatsCount.INGREDIENT
+    stats.attr_deleted(kind, instance)
@@ -0,0 +1,385 @@
+"""Estadisticas del recetario de un usuario: cantidad de recetas,
+promedio, minimo y maximo de precio y duracion, histogramas y las tags
+e ingredientes mas usados.
+
+Calcularlas con agregados sobre todas las recetas en cada consulta es
+lento para recetarios grandes, asi que se mantienen en RecipeStats y
+RecipeStatsCount. Las señales de recipe/signals.py suman y restan cada
+cambio (UPDATE ... SET x = x + delta, sin leer antes) y las altas
+masivas, que no disparan señales en todos los motores, llaman a
+bulk_added. El minimo y el maximo no se pueden restar: se recalculan
+solo cuando se quita una receta con el valor extremo.
+
+El resumen de un usuario se crea con rebuild() la primera vez que se
+consulta; hasta entonces sus cambios no escriben nada. invalidate() lo
+descarta para que se recalcule, despues de cambios que no lo mantienen
+(el comando dedup_recipe_attrs, los datos de benchmark).
+"""
+import bisect
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, IntegerField, Max, Min, \
+    OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest, Least
+
+from core import bulk
+from core.models import Ingredient, Recipe, RecipeStats, RecipeStatsCount, \
+    Tag
+
+
+# Limites (exclusivos) de los rangos de los histogramas. Si se cambian
+# hay que correr rebuild_recipe_stats.
+PRICE_BUCKETS = tuple(getattr(
+    settings,
+    'RECIPE_STATS_PRICE_BUCKETS',
+    (100, 250, 500, 1000, 2500, 5000)
+))
+TIME_BUCKETS = tuple(getattr(
+    settings,
+    'RECIPE_STATS_TIME_BUCKETS',
+    (15, 30, 60, 120, 240)
+))
+TOP = getattr(settings, 'RECIPE_STATS_TOP', 10)
+
+# (tipo, relacion de Recipe, modelo)
+ATTRS = (
+    (RecipeStatsCount.TAG, Recipe.tags, Tag),
+    (RecipeStatsCount.INGREDIENT, Recipe.ingredients, Ingredient),
+)
+
+CENTS = Decimal('0.01')
+
+# Limite de variables por consulta en SQLite.
+KEYS_PER_QUERY = 500
+
+
+def normalize(price, time_minutes):
+    """(precio, minutos) de una receta. El precio llega como Decimal o,
+    desde codigo, como float."""
+    return Decimal(str(price)).quantize(CENTS), int(time_minutes)
+
+
+def bucket(bounds, value):
+    """Indice del rango de `value`: 0 es menor a bounds[0]."""
+    return bisect.bisect_right(bounds, value)
+
+
+def bucket_case(field, bounds):
+    """El mismo indice que bucket(), calculado en la base."""
+    return Case(
+        *(When(**{f'{field}__lt': bound}, then=Value(index))
+          for index, bound in enumerate(bounds)),
+        default=Value(len(bounds)),
+        output_field=IntegerField()
+    )
+
+
+def tracked(user_id):
+    return RecipeStats.objects.filter(user_id=user_id).exists()
+
+
+def recipes_changed(user_id, added=(), removed=()):
+    """Suma al resumen las recetas `added` y resta las `removed`, como
+    (precio, minutos). Retorna False si el usuario no tiene resumen."""
+    added = [normalize(*values) for values in added]
+    removed = [normalize(*values) for values in removed]
+    # Sin savepoint: un error tiene que deshacer tambien el cambio de
+    # las recetas.
+    with transaction.atomic(savepoint=False):
+        return apply_recipes(user_id, added, removed)
+
+
+def apply_recipes(user_id, added, removed):
+    """recipes_changed con los valores normalizados. Corre en una
+    transaccion: la fila del resumen queda bloqueada entre leer el
+    minimo y el maximo y escribirlos, y mientras corre un rebuild."""
+    summary = RecipeStats.objects.filter(user_id=user_id)
+    current = summary.select_for_update().values(
+        'price_min', 'price_max', 'time_min', 'time_max'
+    ).first()
+    if current is None:
+        return False
+    if not added and not removed:
+        return True
+
+    changes = {
+        'recipe_count': F('recipe_count') + len(added) - len(removed),
+        'price_sum': F('price_sum') + (
+            sum(price for price, _ in added) -
+            sum(price for price, _ in removed)
+        ),
+        'time_sum': F('time_sum') + (
+            sum(time for _, time in added) - sum(time for _, time in removed)
+        ),
+    }
+    for index, name in ((0, 'price'), (1, 'time')):
+        if added:
+            low = Value(min(values[index] for values in added))
+            high = Value(max(values[index] for values in added))
+            changes[f'{name}_min'] = Least(Coalesce(f'{name}_min', low), low)
+            changes[f'{name}_max'] = Greatest(
+                Coalesce(f'{name}_max', high),
+                high
+            )
+    summary.update(**changes)
+
+    # Si se quito un valor extremo, el nuevo sale de las recetas.
+    extremes = {}
+    for index, name, field in ((0, 'price', 'price'),
+                               (1, 'time', 'time_minutes')):
+        values = {values[index] for values in removed}
+        if current[f'{name}_min'] in values or \
+                current[f'{name}_max'] in values:
+            extremes[f'{name}_min'] = Min(field)
+            extremes[f'{name}_max'] = Max(field)
+    if extremes:
+        summary.update(**Recipe.objects.filter(
+            user_id=user_id
+        ).aggregate(**extremes))
+
+    for kind, index, bounds in ((RecipeStatsCount.PRICE, 0, PRICE_BUCKETS),
+                                (RecipeStatsCount.TIME, 1, TIME_BUCKETS)):
+        deltas = Counter(bucket(bounds, values[index]) for values in added)
+        deltas.subtract(bucket(bounds, values[index]) for values in removed)
+        add_counts(user_id, kind, deltas)
+    return True
+
+
+def attrs_changed(user_id, kind, deltas):
+    """Suma a la cantidad de recetas de cada tag o ingrediente
+    ({id: delta})."""
+    if any(deltas.values()) and tracked(user_id):
+        add_counts(user_id, kind, deltas)
+
+
+def add_counts(user_id, kind, deltas):
+    """Suma cada delta a la fila de su key, con un UPDATE por valor de
+    delta y un INSERT para las filas que faltan."""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    rows = RecipeStatsCount.objects.filter(user_id=user_id, kind=kind)
+    keys = list(deltas)
+    existing = set()
+    for start in range(0, len(keys), KEYS_PER_QUERY):
+        existing.update(rows.filter(
+            key__in=keys[start:start + KEYS_PER_QUERY]
+        ).values_list('key', flat=True))
+
+    by_delta = defaultdict(list)
+    for key in existing:
+        by_delta[deltas[key]].append(key)
+    for delta, keys in by_delta.items():
+        for start in range(0, len(keys), KEYS_PER_QUERY):
+            rows.filter(
+                key__in=keys[start:start + KEYS_PER_QUERY]
+            ).update(count=F('count') + delta)
+
+    missing = [
+        RecipeStatsCount(user_id=user_id, kind=kind, key=key, count=delta)
+        for key, delta in deltas.items()
+        if key not in existing and delta > 0
+    ]
+    if not missing:
+        return
+    try:
+        with transaction.atomic():
+            RecipeStatsCount.objects.bulk_create(
+                missing,
+                batch_size=bulk.capped_batch_size(
+                    RecipeStatsCount, missing, 1000
+                )
+            )
+    except IntegrityError:
+        # Otro pedido creo alguna de las filas al mismo tiempo.
+        for obj in missing:
+            if not rows.filter(key=obj.key).update(
+                count=F('count') + obj.count
+            ):
+                RecipeStatsCount.objects.create(
+                    user_id=user_id, kind=kind, key=obj.key, count=obj.count
+                )
+
+
+def bulk_added(user_id, values, tag_ids=(), ingredient_ids=()):
+    """Suma recetas creadas en bloque: `values` son sus (precio,
+    minutos) y tag_ids e ingredient_ids los ids asignados, uno por fila
+    de la tabla intermedia."""
+    if not recipes_changed(user_id, added=values):
+        return
+    for (kind, _, _), ids in zip(ATTRS, (tag_ids, ingredient_ids)):
+        add_counts(user_id, kind, Counter(ids))
+
+
+def recipe_deleting(recipe):
+    """Resta la receta de sus tags e ingredientes. Corre antes del
+    borrado: despues ya no estan las filas intermedias."""
+    if not tracked(recipe.user_id):
+        return
+    for kind, field, _ in ATTRS:
+        target = field.field.m2m_reverse_field_name() + '_id'
+        RecipeStatsCount.objects.filter(
+            user_id=recipe.user_id,
+            kind=kind,
+            key__in=field.through.objects.filter(
+                recipe_id=recipe.id
+            ).values(target)
+        ).update(count=F('count') - 1)
+
+
+def attr_deleted(kind, attr):
+    """Quita las cantidades de una tag o ingrediente borrado."""
+    RecipeStatsCount.objects.filter(
+        user_id=attr.user_id,
+        kind=kind,
+        key=attr.id
+    ).delete()
+
+
+def rebuild(user_id):
+    """Recalcula el resumen del usuario desde sus recetas. Bloquea la
+    fila del resumen (creandola si falta) antes de leer las recetas:
+    dos rebuild a la vez, por ejemplo en las primeras consultas, se
+    ejecutan uno despues del otro, y los cambios que llegan mientras
+    tanto esperan y se suman al resultado en lugar de perderse."""
+    recipes = Recipe.objects.filter(user_id=user_id)
+    with transaction.atomic():
+        # get_or_create ya resuelve el IntegrityError si otro pedido
+        # crea la fila al mismo tiempo.
+        RecipeStats.objects.get_or_create(user_id=user_id)
+        summary = RecipeStats.objects.select_for_update().get(
+            user_id=user_id
+        )
+        totals = recipes.aggregate(
+            recipe_count=Count('id'),
+            price_sum=Sum('price'),
+            price_min=Min('price'),
+            price_max=Max('price'),
+            time_sum=Sum('time_minutes'),
+            time_min=Min('time_minutes'),
+            time_max=Max('time_minutes')
+        )
+        totals['price_sum'] = totals['price_sum'] or 0
+        totals['time_sum'] = totals['time_sum'] or 0
+
+        counts = []
+        for kind, field, bounds in (
+                (RecipeStatsCount.PRICE, 'price', PRICE_BUCKETS),
+                (RecipeStatsCount.TIME, 'time_minutes', TIME_BUCKETS)):
+            rows = recipes.annotate(
+                bucket=bucket_case(field, bounds)
+            ).values('bucket').annotate(total=Count('id')).order_by()
+            counts.extend(
+                RecipeStatsCount(
+                    user_id=user_id,
+                    kind=kind,
+                    key=row['bucket'],
+                    count=row['total']
+                )
+                for row in rows
+            )
+        for kind, field, _ in ATTRS:
+            target = field.field.m2m_reverse_field_name() + '_id'
+            rows = field.through.objects.filter(
+                recipe__user_id=user_id
+            ).values(target).annotate(total=Count('id')).order_by()
+            counts.extend(
+                RecipeStatsCount(
+                    user_id=user_id,
+                    kind=kind,
+                    key=row[target],
+                    count=row['total']
+                )
+                for row in rows
+            )
+
+        for name, value in totals.items():
+            setattr(summary, name, value)
+        summary.save()
+        RecipeStatsCount.objects.filter(user_id=user_id).delete()
+        RecipeStatsCount.objects.bulk_create(
+            counts,
+            batch_size=bulk.capped_batch_size(RecipeStatsCount, counts, 1000)
+        )
+
+
+def invalidate(user_ids):
+    """Descarta el resumen de los usuarios; se recalcula al consultarlo."""
+    RecipeStats.objects.filter(user_id__in=user_ids).delete()
+    RecipeStatsCount.objects.filter(user_id__in=user_ids).delete()
+
+
+def histogram(bounds, counts):
+    """Rangos [desde, hasta) con su cantidad de recetas. El primero no
+    tiene desde y el ultimo no tiene hasta."""
+    edges = (None,) + bounds + (None,)
+    return [
+        {'from': edges[index], 'to': edges[index + 1],
+         'count': counts.get(index, 0)}
+        for index in range(len(bounds) + 1)
+    ]
+
+
+def top(user_id, kind, model):
+    """Las TOP tags o ingredientes con mas recetas."""
+    names = model.objects.filter(id=OuterRef('key')).values('name')[:1]
+    rows = RecipeStatsCount.objects.filter(
+        user_id=user_id,
+        kind=kind,
+        count__gt=0
+    ).annotate(name=Subquery(names)).order_by('-count', 'key')[:TOP]
+    return [
+        {'id': key, 'name': name, 'recipes': count}
+        for key, name, count in rows.values_list('key', 'name', 'count')
+        if name is not None
+    ]
+
+
+def get_stats(user_id):
+    """Estadisticas del usuario, creando el resumen si no existe."""
+    summary = RecipeStats.objects.filter(user_id=user_id).first()
+    if summary is None:
+        rebuild(user_id)
+        summary = RecipeStats.objects.get(user_id=user_id)
+    counts = defaultdict(dict)
+    for kind, key, count in RecipeStatsCount.objects.filter(
+        user_id=user_id,
+        kind__in=(RecipeStatsCount.PRICE, RecipeStatsCount.TIME)
+    ).values_list('kind', 'key', 'count'):
+        counts[kind][key] = count
+
+    total = summary.recipe_count
+    return {
+        'recipes': total,
+        'price': {
+            'avg': str((summary.price_sum / total).quantize(CENTS))
+            if total else None,
+            'min': None if summary.price_min is None
+            else str(summary.price_min),
+            'max': None if summary.price_max is None
+            else str(summary.price_max),
+            'histogram': histogram(
+                PRICE_BUCKETS,
+                counts[RecipeStatsCount.PRICE]
+            ),
+        },
+        'time_minutes': {
+            'avg': round(summary.time_sum / total, 1) if total else None,
+            'min': summary.time_min,
+            'max': summary.time_max,
+            'histogram': histogram(
+                TIME_BUCKETS,
+                counts[RecipeStatsCount.TIME]
+            ),
+        },
+        'top_tags': top(user_id, RecipeStatsCount.TAG, Tag),
+        'top_ingredients': top(
+            user_id,
+            RecipeStatsCount.INGREDIENT,
+            Ingredient
+        ),
+        'updated_at': summary.updated_at,
+    }
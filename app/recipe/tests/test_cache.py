@@ -0,0 +1,182 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+from recipe.cache import list_cache
+
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+CACHE_STATS_URL = reverse('recipe:cache-stats')
+
+
+class ListCacheTests(TestCase):
+    """Testea el cache de los listados de tags e ingredientes."""
+
+    def setUp(self):
+        list_cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@francorueta.com',
+            'pass1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegano')
+
+    def test_second_request_is_cached(self):
+        """Testea que el segundo pedido solo consulte el estado del
+        listado."""
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['X-Cache'], 'HIT')
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(res.data['results'][0]['name'], 'Vegano')
+        self.assertEqual(list_cache.hits, 1)
+        self.assertEqual(list_cache.misses, 1)
+
+    @patch.object(list_cache, 'alias', 'default')
+    def test_shared_cache_hit_without_queries(self):
+        """Testea que con un cache compartido un acierto no consulte la
+        base."""
+        self.client.get(TAGS_URL)
+
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+        self.assertEqual(len(context.captured_queries), 0)
+
+    def test_write_in_other_process(self):
+        """Testea que con el cache local no se sirva un listado viejo
+        despues de una escritura hecha en otro proceso, que no renueva
+        la generacion de este."""
+        self.client.get(TAGS_URL)
+        with patch.object(list_cache, 'invalidate'):
+            Tag.objects.create(user=self.user, name='Postre')
+            self.tag.delete()
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']],
+            ['Postre']
+        )
+
+    def test_cached_not_modified(self):
+        """Testea que un acierto responda 304 con el ETag del cliente."""
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['X-Cache'], 'HIT')
+
+    def test_invalidated_on_save(self):
+        """Testea que modificar una tag invalide el listado."""
+        self.client.get(TAGS_URL)
+        self.tag.name = 'Vegetariano'
+        self.tag.save()
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['results'][0]['name'], 'Vegetariano')
+
+    def test_invalidated_on_delete(self):
+        """Testea que borrar una tag invalide el listado."""
+        self.client.get(TAGS_URL)
+        self.tag.delete()
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_invalidated_on_bulk_create(self):
+        """Testea que la creacion masiva invalide el listado."""
+        self.client.get(TAGS_URL)
+        self.client.post(
+            TAGS_URL,
+            [{'name': 'Postre'}, {'name': 'Picante'}],
+            format='json'
+        )
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(len(res.data['results']), 3)
+
+    def test_invalidated_on_bulk_create_without_signals(self):
+        """Testea la invalidacion cuando la creacion masiva no dispara
+        post_save, como en Postgres."""
+        def bulk_create(model, objs, batch_size=1000):
+            return model.objects.bulk_create(objs)
+
+        self.client.get(TAGS_URL)
+        with patch('core.bulk.bulk_create', bulk_create):
+            res = self.client.post(
+                TAGS_URL,
+                [{'name': 'Postre'}, {'name': 'Picante'}],
+                format='json'
+            )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.data['results']), 3)
+
+    def test_invalidation_limited_to_user_and_model(self):
+        """Testea que solo se invalide el listado del usuario y el
+        modelo modificados."""
+        other = get_user_model().objects.create_user(
+            'otro@francorueta.com',
+            'pass1234'
+        )
+        self.client.get(TAGS_URL)
+        self.client.get(INGREDIENTS_URL)
+        Tag.objects.create(user=other, name='Dulce')
+        Ingredient.objects.create(user=self.user, name='Sal')
+
+        self.assertEqual(self.client.get(TAGS_URL)['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get(INGREDIENTS_URL)['X-Cache'], 'MISS')
+
+    def test_cache_separated_by_user(self):
+        """Testea que cada usuario vea solo su listado."""
+        self.client.get(TAGS_URL)
+        other = get_user_model().objects.create_user(
+            'otro@francorueta.com',
+            'pass1234'
+        )
+        self.client.force_authenticate(other)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['results'], [])
+
+    def test_stats_require_staff(self):
+        """Testea que los contadores solo los vea un administrador."""
+        res = self.client.get(CACHE_STATS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        self.client.get(TAGS_URL)
+        res = self.client.get(CACHE_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['backend'], 'local')
+        self.assertEqual(res.data['misses'], 1)
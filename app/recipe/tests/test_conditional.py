@@ -0,0 +1,146 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    """Devuelve una url detallada de receta."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class ConditionalGetTests(TestCase):
+    """Testea los GET condicionales con ETag y Last-Modified."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@francorueta.com',
+            'pass1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegano')
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Guiso',
+            time_minutes=30,
+            price=300.00
+        )
+        self.recipe.tags.add(self.tag)
+
+    def test_list_returns_validators(self):
+        """Testea que el listado incluya ETag pero no Last-Modified."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['ETag'].startswith('"'))
+        self.assertNotIn('Last-Modified', res)
+        self.assertIn('Authorization', res['Vary'])
+
+    def test_list_ignores_if_modified_since(self):
+        """Testea que un borrado, que no cambia el maximo modified_at,
+        no responda 304 a If-Modified-Since."""
+        Recipe.objects.create(
+            user=self.user,
+            title='Tarta',
+            time_minutes=20,
+            price=100.00
+        )
+        self.recipe.delete()
+
+        for url in (RECIPES_URL, TAGS_URL):
+            res = self.client.get(
+                url,
+                HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT'
+            )
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_not_modified(self):
+        """Testea que un ETag vigente responda 304 sin serializar."""
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertFalse(res.content)
+
+    def test_list_etag_changes_on_update(self):
+        """Testea que el ETag cambie al crear o modificar recetas."""
+        etag = self.client.get(RECIPES_URL)['ETag']
+        Recipe.objects.create(
+            user=self.user,
+            title='Tarta',
+            time_minutes=20,
+            price=100.00
+        )
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_list_etag_depends_on_query(self):
+        """Testea que filtros distintos tengan ETags distintos."""
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        res = self.client.get(RECIPES_URL, {'tags': self.tag.id})
+
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_detail_not_modified(self):
+        """Testea el 304 en el detalle de receta."""
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_etag_changes_on_tag_rename(self):
+        """Testea que renombrar una tag invalide el detalle de sus
+        recetas."""
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+        self.tag.name = 'Vegetariano'
+        self.tag.save()
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'Vegetariano')
+
+    def test_detail_etag_changes_on_tag_removed(self):
+        """Testea que quitar una tag de la receta cambie su ETag."""
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+        self.recipe.tags.remove(self.tag)
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_detail_not_found(self):
+        """Testea que una receta inexistente siga respondiendo 404."""
+        res = self.client.get(detail_url(999))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tag_list_not_modified(self):
+        """Testea el 304 en el listado de tags."""
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
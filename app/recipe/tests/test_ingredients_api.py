@@ -5,7 +5,7 @@ from django.test import TestCase
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Ingredient
+from core.models import Ingredient, Recipe
 from recipe.serializers import IngredientSerializer
 
 
@@ -48,8 +48,7 @@ class PrivateIngredientsApiTests(TestCase):
         ingredients = Ingredient.objects.all().order_by('-name')
         serializer = IngredientSerializer(ingredients, many=True)
         self.assertEqual(res.status_code,status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
-    
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredients_limited_to_user(self):
         """Testea que los ingredientes sean solo para el usuario autenticado."""
@@ -60,11 +59,11 @@ class PrivateIngredientsApiTests(TestCase):
         Ingredient.objects.create(user=usuario2,name='Jamon')
         ingrediente = Ingredient.objects.create(user=self.user,name='Queso')
         res = self.client.get(INGREDIENTS_URL)
-        
-        self.assertEqual(res.status_code,status.HTTP_200_OK)
-        self.assertEqual(len(res.data),1)
-        self.assertEqual(res.data[0]['name'], ingrediente.name)
-        
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], ingrediente.name)
+
     def test_create_ingredient_successful(self):
         """Testea la creacion correcta de un nuevo ingrediente"""
         parametros = {'name':'Tomate'}
@@ -84,12 +83,33 @@ class PrivateIngredientsApiTests(TestCase):
         
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
-        
-
-
-
-
+    def test_bulk_create_ingredients_invalid_item(self):
+        """Testea que un elemento invalido cancele el alta masiva y
+        se informe el error de cada elemento."""
+        payload = [{'name': 'Tomate'}, {'name': ''}, {'name': 'Ajo'}]
 
+        res = self.client.post(INGREDIENTS_URL, payload, format='json')
 
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(res.data), 3)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        self.assertFalse(Ingredient.objects.filter(user=self.user).exists())
+
+    def test_retrieve_ingredients_assigned_to_recipes(self):
+        """Testea filtrar los ingredientes asignados a alguna receta."""
+        ingredient1 = Ingredient.objects.create(user=self.user, name='Manzana')
+        ingredient2 = Ingredient.objects.create(user=self.user, name='Pavo')
+        recipe = Recipe.objects.create(
+            title='Tarta de manzana',
+            time_minutes=40,
+            price=300.00,
+            user=self.user
+        )
+        recipe.ingredients.add(ingredient1)
 
+        res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
 
+        names = [item['name'] for item in res.data['results']]
+        self.assertIn(ingredient1.name, names)
+        self.assertNotIn(ingredient2.name, names)
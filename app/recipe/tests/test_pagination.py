@@ -0,0 +1,106 @@
+import base64
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.pagination import RecipePagination
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def sample_recipe(user, title='Receta X'):
+    """Crea y retorna una receta de prueba."""
+    return Recipe.objects.create(
+        user=user,
+        title=title,
+        time_minutes=10,
+        price=100.00
+    )
+
+
+class KeysetPaginationTests(TestCase):
+    """Testea la paginacion por cursor de los listados."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@francorueta.com',
+            'pass1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    def collect(self, url, params):
+        """Recorre todas las paginas y retorna los ids obtenidos."""
+        ids = []
+        res = self.client.get(url, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in res.data['results'])
+            if res.data['next'] is None:
+                return ids
+            res = self.client.get(res.data['next'])
+
+    def test_recipes_paginated_by_id(self):
+        """Testea que las recetas se paginen de la mas nueva a la mas vieja."""
+        recipes = [sample_recipe(self.user) for _ in range(5)]
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+        ids = self.collect(RECIPES_URL, {'page_size': 2})
+        self.assertEqual(ids, [r.id for r in reversed(recipes)])
+
+    def test_tags_paginated_by_name(self):
+        """Testea que el cursor por nombre no saltee ni duplique tags.
+        Los nombres son unicos por usuario sin distinguir mayusculas."""
+        for name in ['Vegano', 'Postre', 'sopa', 'Picante', 'dulce']:
+            Tag.objects.create(user=self.user, name=name)
+
+        ids = self.collect(TAGS_URL, {'page_size': 2})
+
+        expected = Tag.objects.filter(
+            user=self.user
+        ).order_by('-name', 'id').values_list('id', flat=True)
+        self.assertEqual(ids, list(expected))
+
+    def test_page_size_capped(self):
+        """Testea que el tamaño de pagina no supere el maximo."""
+        for _ in range(3):
+            sample_recipe(self.user)
+
+        with patch.object(RecipePagination, 'max_page_size', 2):
+            res = self.client.get(RECIPES_URL, {'page_size': 1000})
+
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_invalid_cursor(self):
+        """Testea que un cursor invalido retorne 404."""
+        res = self.client.get(RECIPES_URL, {'cursor': 'no-es-un-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_with_invalid_values(self):
+        """Testea que un cursor bien codificado con valores de otro tipo
+        retorne 404."""
+        for url, position in ((RECIPES_URL, ['x']),
+                              (RECIPES_URL, [[1]]),
+                              (RECIPES_URL, [None]),
+                              (TAGS_URL, ['Vegano', 'x']),
+                              (TAGS_URL, ['Vegano', {'id': 1}])):
+            cursor = base64.urlsafe_b64encode(
+                json.dumps(position).encode()
+            ).decode()
+
+            res = self.client.get(url, {'cursor': cursor})
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,112 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+def detail_url(recipe_id):
+    """Devuelve una url detallada de receta."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class QueryCountTests(TestCase):
+    """Testea que la cantidad de consultas por endpoint sea fija,
+    sin importar la cantidad de resultados."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@francorueta.com',
+            'pass1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_recipes(self, amount):
+        """Crea recetas con varias tags e ingredientes cada una."""
+        recipes = []
+        start = Recipe.objects.count()
+        for i in range(start, start + amount):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Receta {i}',
+                time_minutes=10,
+                price=100.00
+            )
+            for j in range(3):
+                recipe.tags.add(
+                    Tag.objects.create(user=self.user, name=f'Tag {i}-{j}')
+                )
+                recipe.ingredients.add(Ingredient.objects.create(
+                    user=self.user,
+                    name=f'Ingrediente {i}-{j}'
+                ))
+            recipes.append(recipe)
+        return recipes
+
+    def count_queries(self, url):
+        """Ejecuta un GET y retorna la cantidad de consultas."""
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries)
+
+    def assertConstantQueries(self, expected, url):
+        """Verifica la cantidad de consultas con 1 y con 10 resultados."""
+        self.create_recipes(1)
+        self.assertEqual(self.count_queries(url), expected)
+        self.create_recipes(9)
+        self.assertEqual(self.count_queries(url), expected)
+
+    def test_recipe_list_queries(self):
+        """Testea el listado de recetas: ETag + recetas + tags +
+        ingredientes + versiones de imagen."""
+        self.assertConstantQueries(5, RECIPES_URL)
+
+    def test_tag_list_queries(self):
+        """Testea el listado de tags: ETag + tags."""
+        self.assertConstantQueries(2, TAGS_URL)
+
+    def test_ingredient_list_queries(self):
+        """Testea el listado de ingredientes: ETag + ingredientes."""
+        self.assertConstantQueries(2, INGREDIENTS_URL)
+
+    def test_recipe_detail_queries(self):
+        """Testea el detalle de receta con muchas tags e ingredientes."""
+        recipe = self.create_recipes(1)[0]
+        for i in range(10):
+            recipe.tags.add(Tag.objects.create(user=self.user, name=str(i)))
+
+        self.assertEqual(self.count_queries(detail_url(recipe.id)), 5)
+
+    def test_recipe_list_sparse_fieldset_queries(self):
+        """Testea que ?fields= omita las precargas y columnas que no se
+        piden."""
+        self.create_recipes(3)
+
+        self.assertEqual(
+            self.count_queries(RECIPES_URL + '?fields=id,title'),
+            2
+        )
+        self.assertEqual(
+            self.count_queries(RECIPES_URL + '?fields=id,tags'),
+            3
+        )
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(RECIPES_URL, {'fields': 'id,title'})
+        sql = context.captured_queries[-1]['sql']
+        self.assertIn('"title"', sql)
+        self.assertNotIn('"price"', sql)
+        self.assertNotIn('"link"', sql)
+        self.assertNotIn('"image"', sql)
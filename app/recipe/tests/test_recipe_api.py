@@ -1,22 +1,30 @@
+import csv
+import io
+import json
 import os
+import struct
 import tempfile
+import zlib
+from unittest.mock import patch
 
 from PIL import Image
 from django.urls import reverse
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredient
+from recipe import export, images
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 
 
 RECIPES_URL = reverse('recipe:recipe-list')
-
-
+EXPORT_URL = reverse('recipe:recipe-export')
 
 
 def image_upload_url(recipe_id):
@@ -87,7 +95,7 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
         
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
     
     def test_recipes_limited_to_user(self):
         """Testea retornar las recetas para un usuario"""
@@ -104,8 +112,8 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data),1)
-        self.assertEqual(res.data,serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
     
 
     def test_view_recipe_detail(self):
@@ -208,6 +216,423 @@ class PrivateRecipeApiTests(TestCase):
         tags = recipe.tags.all()
         self.assertEqual(len(tags),0)
 
+    def bulk_payload(self, amount, tags, ingredients):
+        """Retorna una lista de recetas para un alta masiva."""
+        return [{
+            'title': f'Receta {i}',
+            'time_minutes': 10 + i,
+            'price': '100.00',
+            'tags': [tag.id for tag in tags],
+            'ingredients': [ingredient.id for ingredient in ingredients],
+        } for i in range(amount)]
+
+    def test_bulk_create_recipes(self):
+        """Testea crear varias recetas con tags e ingredientes en un
+        solo pedido."""
+        tag = sample_tag(user=self.user)
+        ingredient = sample_ingredient(user=self.user)
+
+        res = self.client.post(
+            RECIPES_URL,
+            self.bulk_payload(3, [tag], [ingredient]),
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 3)
+        for item in res.data:
+            recipe = Recipe.objects.get(id=item['id'], user=self.user)
+            self.assertEqual(list(recipe.tags.all()), [tag])
+            self.assertEqual(list(recipe.ingredients.all()), [ingredient])
+            self.assertEqual(item['tags'], [tag.id])
+
+    def test_bulk_create_recipes_constant_queries(self):
+        """Testea que validar los ids relacionados no haga una
+        consulta por receta."""
+        tags = [sample_tag(user=self.user, name=str(i)) for i in range(3)]
+        ingredient = sample_ingredient(user=self.user)
+
+        counts = []
+        for amount in (2, 20):
+            payload = self.bulk_payload(amount, tags, [ingredient])
+            with CaptureQueriesContext(connection) as context:
+                res = self.client.post(RECIPES_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            counts.append(len([
+                query for query in context.captured_queries
+                if query['sql'].startswith('SELECT')
+            ]))
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_bulk_create_recipes_unknown_tag(self):
+        """Testea que un id inexistente se reporte en su elemento."""
+        payload = self.bulk_payload(2, [], [])
+        payload[1]['tags'] = [999]
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('tags', res.data[1])
+        self.assertFalse(Recipe.objects.exists())
+
+    def names_payload(self, **params):
+        payload = {
+            'title': 'Guiso',
+            'time_minutes': 60,
+            'price': '500.00',
+        }
+        payload.update(params)
+        return payload
+
+    def test_create_recipe_with_names(self):
+        """Testea crear una receta con tags e ingredientes por nombre,
+        reutilizando los existentes sin distinguir mayusculas."""
+        tag = sample_tag(user=self.user, name='Vegano')
+
+        res = self.client.post(RECIPES_URL, self.names_payload(
+            tag_names=['vegano', 'Rapido', 'RAPIDO'],
+            ingredient_names=['Lentejas'],
+        ), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('tag_names', res.data)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        new_tag = Tag.objects.get(user=self.user, name='Rapido')
+        self.assertEqual(set(recipe.tags.all()), {tag, new_tag})
+        self.assertEqual(sorted(res.data['tags']), [tag.id, new_tag.id])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(
+            [ingredient.name for ingredient in recipe.ingredients.all()],
+            ['Lentejas']
+        )
+
+    def test_create_recipe_with_non_ascii_names(self):
+        """Testea que un nombre existente con letras no ASCII se
+        reutilice, escrito igual o con otras mayusculas ASCII."""
+        tag = sample_tag(user=self.user, name='Ñoqui')
+        ingredient = sample_ingredient(user=self.user, name='Azúcar')
+
+        res = self.client.post(RECIPES_URL, self.names_payload(
+            tag_names=['Ñoqui', 'ÑOQUI'],
+            ingredient_names=['azúcar'],
+        ), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['tags'], [tag.id])
+        self.assertEqual(res.data['ingredients'], [ingredient.id])
+
+    def test_create_recipe_unresolved_names(self):
+        """Testea que un nombre que no se pudo crear ni encontrar se
+        rechace con un 400."""
+        with patch('core.bulk.get_or_create_by_name', return_value={}):
+            res = self.client.post(RECIPES_URL, self.names_payload(
+                tag_names=['Nueva'],
+            ), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Nueva', str(res.data['tag_names']))
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_create_recipe_with_names_and_ids(self):
+        """Testea que un mismo tag enviado por id y por nombre se
+        asigne una vez, y que no se usen los nombres de otro usuario."""
+        tag = sample_tag(user=self.user, name='Vegano')
+        other = get_user_model().objects.create_user(
+            'otro@francorueta.com',
+            'pass1234'
+        )
+        other_ingredient = sample_ingredient(user=other, name='Papa')
+
+        res = self.client.post(RECIPES_URL, self.names_payload(
+            tags=[tag.id],
+            tag_names=['Vegano'],
+            ingredient_names=['Papa'],
+        ), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['tags'], [tag.id])
+        ingredient = Ingredient.objects.get(user=self.user, name='Papa')
+        self.assertNotEqual(ingredient, other_ingredient)
+        self.assertEqual(res.data['ingredients'], [ingredient.id])
+
+    def test_create_recipe_invalid_names(self):
+        """Testea que un nombre vacio se rechace sin crear nada."""
+        res = self.client.post(RECIPES_URL, self.names_payload(
+            tag_names=['Vegano', ' '],
+        ), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tag_names', res.data)
+        self.assertFalse(Tag.objects.exists())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_recipes_with_names(self):
+        """Testea que varias recetas con el mismo nombre nuevo compartan
+        un unico tag."""
+        payload = [
+            self.names_payload(title=f'Receta {i}', tag_names=['Nueva'])
+            for i in range(3)
+        ]
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        tag = Tag.objects.get(user=self.user)
+        self.assertEqual([item['tags'] for item in res.data], [[tag.id]] * 3)
+
+    def test_create_recipe_with_names_constant_queries(self):
+        """Testea que la cantidad de consultas no dependa de la
+        cantidad de nombres."""
+        tags = [sample_tag(user=self.user, name=f'Tag {i}') for i in range(8)]
+        ingredients = [
+            sample_ingredient(user=self.user, name=f'Ingrediente {i}')
+            for i in range(8)
+        ]
+
+        counts = []
+        for amount in (1, 8):
+            payload = self.names_payload(
+                tag_names=[tag.name for tag in tags[:amount]],
+                ingredient_names=[
+                    ingredient.name for ingredient in ingredients[:amount]
+                ],
+            )
+            with CaptureQueriesContext(connection) as context:
+                res = self.client.post(RECIPES_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(len(res.data['tags']), amount)
+            counts.append(len(context.captured_queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_update_recipe_with_names(self):
+        """Testea que en una actualizacion los nombres se sumen a las
+        tags actuales."""
+        recipe = sample_recipe(user=self.user)
+        tag = sample_tag(user=self.user)
+        recipe.tags.add(tag)
+
+        res = self.client.patch(
+            detail_url(recipe.id),
+            {'tag_names': ['Nueva']},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(tag.name for tag in recipe.tags.all()),
+            ['Nueva', 'Vegano']
+        )
+
+    def test_names_invalidate_cached_lists(self):
+        """Testea que los tags creados por nombre aparezcan en el
+        listado cacheado."""
+        tags_url = reverse('recipe:tag-list')
+        self.client.get(tags_url)
+
+        self.client.post(
+            RECIPES_URL,
+            self.names_payload(tag_names=['Nueva']),
+            format='json'
+        )
+
+        res = self.client.get(tags_url)
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']],
+            ['Nueva']
+        )
+
+    def test_filter_recipes_by_tags(self):
+        """Testea filtrar recetas que tengan alguna de las tags."""
+        recipe1 = sample_recipe(user=self.user, title='Curry de verduras')
+        recipe2 = sample_recipe(user=self.user, title='Tarta de acelga')
+        recipe3 = sample_recipe(user=self.user, title='Pescado frito')
+        tag1 = sample_tag(user=self.user, name='Vegano')
+        tag2 = sample_tag(user=self.user, name='Vegetariano')
+        recipe1.tags.add(tag1)
+        recipe2.tags.add(tag2)
+
+        res = self.client.get(RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(recipe1.id, ids)
+        self.assertIn(recipe2.id, ids)
+        self.assertNotIn(recipe3.id, ids)
+
+    def test_filter_recipes_by_all_attrs(self):
+        """Testea filtrar recetas que tengan todas las tags y el
+        ingrediente pedidos."""
+        tag1 = sample_tag(user=self.user, name='Vegano')
+        tag2 = sample_tag(user=self.user, name='Rapido')
+        ingredient = sample_ingredient(user=self.user, name='Tofu')
+        recipe1 = sample_recipe(user=self.user, title='Tofu salteado')
+        recipe1.tags.add(tag1, tag2)
+        recipe1.ingredients.add(ingredient)
+        recipe2 = sample_recipe(user=self.user, title='Tofu al horno')
+        recipe2.tags.add(tag1)
+        recipe2.ingredients.add(ingredient)
+        recipe3 = sample_recipe(user=self.user, title='Ensalada')
+        recipe3.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPES_URL, {
+            'tags': f'{tag1.id},{tag2.id}',
+            'ingredients': str(ingredient.id),
+            'match': 'all',
+        })
+
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, [recipe1.id])
+
+    def test_filter_recipes_invalid_ids(self):
+        """Testea que ids invalidos en el filtro retornen 400."""
+        res = self.client.get(RECIPES_URL, {'tags': '1,pepino'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sparse_fieldset(self):
+        """Testea que ?fields= limite los campos del listado."""
+        recipe = sample_recipe(user=self.user, title='Guiso')
+        recipe.tags.add(sample_tag(user=self.user))
+
+        res = self.client.get(RECIPES_URL, {'fields': 'title,id'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'],
+            [{'id': recipe.id, 'title': 'Guiso'}]
+        )
+
+    def test_sparse_fieldset_detail(self):
+        """Testea ?fields= en el detalle, con las tags anidadas."""
+        recipe = sample_recipe(user=self.user)
+        tag = sample_tag(user=self.user)
+        recipe.tags.add(tag)
+
+        res = self.client.get(detail_url(recipe.id), {'fields': 'tags'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data,
+            {'tags': [{'id': tag.id, 'name': tag.name}]}
+        )
+
+    def test_sparse_fieldset_unknown_field(self):
+        """Testea que un campo desconocido en ?fields= retorne 400."""
+        sample_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL, {'fields': 'id,user,password'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('password, user', str(res.data['fields']))
+
+    def test_sparse_fieldset_write_only_field(self):
+        """Testea que los campos de solo escritura no se puedan pedir."""
+        sample_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL, {'fields': 'id,tag_names'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tag_names', str(res.data['fields']))
+
+
+class RecipeExportTests(TestCase):
+    """Testea la exportacion del recetario."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@francorueta.com',
+            'pass1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user, title='Guiso')
+        self.recipe.tags.add(sample_tag(user=self.user, name='Invierno'))
+        self.recipe.ingredients.add(
+            sample_ingredient(user=self.user, name='Lentejas'),
+            sample_ingredient(user=self.user, name='Chorizo')
+        )
+
+    def read(self, res):
+        return b''.join(res.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        """Testea exportar las recetas como NDJSON."""
+        sample_recipe(user=self.user, title='Flan')
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.read(res).splitlines()]
+        self.assertEqual([row['title'] for row in rows], ['Guiso', 'Flan'])
+        self.assertEqual(rows[0]['tags'], ['Invierno'])
+        self.assertEqual(
+            sorted(rows[0]['ingredients']),
+            ['Chorizo', 'Lentejas']
+        )
+        self.assertEqual(rows[0]['price'], '300.00')
+
+    def test_export_csv(self):
+        """Testea exportar las recetas como CSV."""
+        res = self.client.get(EXPORT_URL, {'output': 'csv'})
+
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(self.read(res))))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], 'Guiso')
+        self.assertEqual(rows[0]['tags'], 'Invierno')
+        self.assertEqual(
+            sorted(rows[0]['ingredients'].split('|')),
+            ['Chorizo', 'Lentejas']
+        )
+
+    def test_export_csv_names_with_separator(self):
+        """Testea que un nombre con el separador de la celda se exporte
+        entre comillas y se pueda recuperar entero."""
+        self.recipe.tags.add(sample_tag(user=self.user, name='Frio|Calor'))
+
+        res = self.client.get(EXPORT_URL, {'output': 'csv'})
+
+        rows = list(csv.DictReader(io.StringIO(self.read(res))))
+        self.assertEqual(
+            sorted(export.split_names(rows[0]['tags'])),
+            ['Frio|Calor', 'Invierno']
+        )
+
+    def test_export_limited_to_user(self):
+        """Testea que solo se exporten las recetas del usuario."""
+        user2 = get_user_model().objects.create_user(
+            'otro@francorueta.com',
+            'pass1234'
+        )
+        sample_recipe(user=user2, title='Ajena')
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(len(self.read(res).splitlines()), 1)
+
+    def test_export_in_chunks(self):
+        """Testea que las recetas se lean por bloques: tres consultas
+        por bloque mas una para detectar el final."""
+        for i in range(4):
+            sample_recipe(user=self.user, title=f'Receta {i}')
+
+        with patch('recipe.export.CHUNK_SIZE', 2):
+            res = self.client.get(EXPORT_URL)
+            with CaptureQueriesContext(connection) as context:
+                lines = self.read(res).splitlines()
+
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(len(context.captured_queries), 3 * 3 + 1)
+
+    def test_export_invalid_output(self):
+        """Testea que un formato desconocido retorne 400."""
+        res = self.client.get(EXPORT_URL, {'output': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
 
 class RecipeImageUploadTests(TestCase):
@@ -221,6 +646,8 @@ class RecipeImageUploadTests(TestCase):
     
     def tearDown(self):
         """Remueve todo los archivos creados en tests."""
+        for derivative in self.recipe.image_derivatives.all():
+            derivative.image.delete(save=False)
         self.recipe.image.delete()
     
     def test_upload_valid_recipe_image(self):
@@ -236,15 +663,176 @@ class RecipeImageUploadTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
-    
+
+    def upload_image(self, size=(1200, 900)):
+        """Sube una imagen JPEG del tamaño indicado."""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', size).save(ntf, format='JPEG')
+            ntf.seek(0)
+            return self.client.post(url, {'image': ntf}, format='multipart')
+
+    @patch('recipe.images.get_executor')
+    @patch('recipe.images.transaction.on_commit', side_effect=lambda f: f())
+    def test_upload_schedules_derivatives(self, on_commit, get_executor):
+        """Testea que la subida encole la generacion de versiones sin
+        esperarla."""
+        res = self.upload_image()
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['images'], {})
+        get_executor.return_value.submit.assert_called_once_with(
+            images.run,
+            self.recipe.id,
+            self.recipe.image.name
+        )
+
+    def test_generate_derivatives(self):
+        """Testea generar las versiones redimensionadas."""
+        self.upload_image()
+        self.recipe.refresh_from_db()
+
+        images.generate_derivatives(self.recipe.id, self.recipe.image.name)
+
+        derivatives = self.recipe.image_derivatives.all()
+        self.assertEqual(
+            len(derivatives),
+            len(images.SIZES) * len(images.get_formats())
+        )
+        for derivative in derivatives:
+            box = images.SIZES[derivative.size]
+            self.assertLessEqual(derivative.width, box[0])
+            self.assertLessEqual(derivative.height, box[1])
+            self.assertTrue(os.path.exists(derivative.image.path))
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertIn('jpeg', res.data['images']['thumbnail'])
+
+    def test_generate_derivatives_stale_image(self):
+        """Testea que una tarea vieja no pise la imagen nueva."""
+        self.upload_image()
+        self.recipe.refresh_from_db()
+
+        images.generate_derivatives(self.recipe.id, 'uploads/recipe/vieja.jpg')
+
+        self.assertFalse(self.recipe.image_derivatives.exists())
+
+    @patch('recipe.uploads.MAX_BYTES', 1024)
+    def test_upload_image_too_large(self):
+        """Testea que se rechace una imagen que supera el limite de
+        bytes sin guardarla."""
+        res = self.upload_image()
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+        self.assertFalse(self.recipe.image)
+
+    @patch('recipe.uploads.MAX_DIMENSION', 1000)
+    def test_upload_image_too_many_pixels(self):
+        """Testea que se rechace una imagen con dimensiones mayores
+        al limite."""
+        res = self.upload_image(size=(1200, 900))
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(self.recipe.image)
+
+    def test_upload_decompression_bomb(self):
+        """Testea que una cabecera PNG con dimensiones enormes se
+        rechace sin decodificar la imagen."""
+        def chunk(chunk_type, data):
+            return struct.pack('>I', len(data)) + chunk_type + data + \
+                struct.pack('>I', zlib.crc32(chunk_type + data))
+
+        ihdr = struct.pack('>IIBBBBB', 100000, 100000, 8, 2, 0, 0, 0)
+        png = b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', ihdr) + \
+            chunk(b'IDAT', zlib.compress(b'\x00' * 4096))
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.png') as ntf:
+            ntf.write(png)
+            ntf.seek(0)
+            res = self.client.post(url, {'image': ntf}, format='multipart')
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['image'], ['La imagen es demasiado grande.'])
+        self.assertFalse(self.recipe.image)
 
     def test_upload_invalid_recipe_image(self):
         """Testea agregar una imagen invalida a receta."""
         url = image_upload_url(self.recipe.id)
         res = self.client.post(url, {'image': 'notimage'}, format='multipart')
         self.assertEqual(res.status_code,status.HTTP_400_BAD_REQUEST)
-        
 
 
+class RecipeSearchTests(TestCase):
+    """Testea la busqueda de texto completo de recetas."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@francorueta.com',
+            'test1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    def search(self, text):
+        """Busca recetas y retorna los ids en orden."""
+        res = self.client.get(RECIPES_URL, {'search': text})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['id'] for item in res.data['results']]
+
+    def test_search_by_title(self):
+        """Testea buscar recetas por titulo."""
+        recipe = sample_recipe(user=self.user, title='Guiso de lentejas')
+        sample_recipe(user=self.user, title='Flan casero')
+
+        self.assertEqual(self.search('lentejas'), [recipe.id])
+
+    def test_search_by_tag_and_ingredient_names(self):
+        """Testea que la busqueda incluya tags e ingredientes, y que
+        se mantenga al renombrarlos."""
+        recipe = sample_recipe(user=self.user, title='Ensalada')
+        tag = sample_tag(user=self.user, name='Vegano')
+        recipe.tags.add(tag)
+        recipe.ingredients.add(sample_ingredient(user=self.user, name='Palta'))
+
+        self.assertEqual(self.search('vegano palta'), [recipe.id])
+        tag.name = 'Liviano'
+        tag.save()
+        self.assertEqual(self.search('vegano'), [])
+        self.assertEqual(self.search('liviano'), [recipe.id])
+
+    def test_search_ranks_title_first(self):
+        """Testea que las coincidencias en el titulo tengan mas peso."""
+        by_title = sample_recipe(user=self.user, title='Pollo al horno')
+        by_tag = sample_recipe(user=self.user, title='Arroz')
+        by_tag.ingredients.add(sample_ingredient(user=self.user, name='Pollo'))
+
+        self.assertEqual(self.search('pollo'), [by_title.id, by_tag.id])
+
+    def test_search_limited_to_user(self):
+        """Testea que la busqueda no retorne recetas de otro usuario."""
+        other = get_user_model().objects.create_user(
+            'test2@francorueta.com',
+            'test1234'
+        )
+        sample_recipe(user=other, title='Guiso de lentejas')
+
+        self.assertEqual(self.search('lentejas'), [])
+
+    def test_search_paginated_by_rank(self):
+        """Testea recorrer los resultados de busqueda por cursor."""
+        for title in ['Pollo', 'Pollo al horno con papas', 'Pollo grillado']:
+            sample_recipe(user=self.user, title=title)
+
+        ids = []
+        res = self.client.get(RECIPES_URL, {'search': 'pollo', 'page_size': 1})
+        while res.data['next']:
+            ids.extend(item['id'] for item in res.data['results'])
+            res = self.client.get(res.data['next'])
+        ids.extend(item['id'] for item in res.data['results'])
 
-        
\ No newline at end of file
+        self.assertEqual(sorted(ids), sorted(self.search('pollo')))
+        self.assertEqual(len(ids), 3)
@@ -0,0 +1,245 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, RecipeStats, RecipeStatsCount, \
+    Tag
+from recipe import stats
+from recipe.importer import RecipeImporter
+
+
+STATS_URL = reverse('recipe:stats')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def snapshot(user):
+    """Resumen y cantidades del usuario, sin las filas en cero."""
+    summary = RecipeStats.objects.filter(user=user).values(
+        'recipe_count', 'price_sum', 'price_min', 'price_max',
+        'time_sum', 'time_min', 'time_max'
+    ).first()
+    counts = set(RecipeStatsCount.objects.filter(
+        user=user,
+        count__gt=0
+    ).values_list('kind', 'key', 'count'))
+    return summary, counts
+
+
+class RecipeStatsApiTests(TestCase):
+    """Testea /api/recipe/stats/ y el resumen que lo respalda."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@francorueta.com',
+            'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegano')
+        self.dessert = Tag.objects.create(user=self.user, name='Postre')
+        self.salt = Ingredient.objects.create(user=self.user, name='Sal')
+
+    def recipe(self, price, time_minutes, tags=(), ingredients=()):
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Receta',
+            price=price,
+            time_minutes=time_minutes
+        )
+        recipe.tags.add(*tags)
+        recipe.ingredients.add(*ingredients)
+        return recipe
+
+    def assertMatchesRebuild(self):
+        """Compara el resumen incremental con uno recalculado."""
+        incremental = snapshot(self.user)
+        stats.rebuild(self.user.id)
+        self.assertEqual(incremental, snapshot(self.user))
+
+    def test_login_required(self):
+        """Testea que se requiera autenticacion."""
+        res = APIClient().get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_stats(self):
+        """Testea los valores que responde el endpoint."""
+        self.recipe(Decimal('50.00'), 10, [self.vegan], [self.salt])
+        self.recipe(Decimal('300.00'), 45, [self.vegan, self.dessert])
+        self.recipe(Decimal('250.50'), 240, [self.vegan])
+        other = get_user_model().objects.create_user('otro@francorueta.com',
+                                                     'testpass')
+        Recipe.objects.create(user=other, title='Ajena', price=9000,
+                              time_minutes=1)
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['recipes'], 3)
+        self.assertEqual(res.data['price']['avg'], '200.17')
+        self.assertEqual(res.data['price']['min'], '50.00')
+        self.assertEqual(res.data['price']['max'], '300.00')
+        self.assertEqual(
+            [row['count'] for row in res.data['price']['histogram']],
+            [1, 0, 2, 0, 0, 0, 0]
+        )
+        self.assertEqual(res.data['price']['histogram'][2],
+                         {'from': 250, 'to': 500, 'count': 2})
+        self.assertEqual(res.data['time_minutes']['avg'], 98.3)
+        self.assertEqual(res.data['time_minutes']['min'], 10)
+        self.assertEqual(res.data['time_minutes']['max'], 240)
+        self.assertEqual(
+            [row['count'] for row in res.data['time_minutes']['histogram']],
+            [1, 0, 1, 0, 0, 1]
+        )
+        self.assertEqual(res.data['top_tags'], [
+            {'id': self.vegan.id, 'name': 'Vegano', 'recipes': 3},
+            {'id': self.dessert.id, 'name': 'Postre', 'recipes': 1},
+        ])
+        self.assertEqual(res.data['top_ingredients'], [
+            {'id': self.salt.id, 'name': 'Sal', 'recipes': 1},
+        ])
+
+    def test_empty(self):
+        """Testea un usuario sin recetas."""
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['recipes'], 0)
+        self.assertIsNone(res.data['price']['avg'])
+        self.assertIsNone(res.data['time_minutes']['min'])
+        self.assertEqual(res.data['top_tags'], [])
+
+    def test_read_does_not_aggregate_recipes(self):
+        """Testea que con el resumen creado la lectura no recorra las
+        recetas: son cuatro consultas a las tablas del resumen."""
+        self.recipe(100, 10, [self.vegan])
+        stats.rebuild(self.user.id)
+
+        with self.assertNumQueries(4):
+            data = stats.get_stats(self.user.id)
+
+        self.assertEqual(data['recipes'], 1)
+
+    def test_untracked_user(self):
+        """Testea que sin resumen los cambios no lo creen."""
+        self.recipe(100, 10, [self.vegan])
+
+        self.assertFalse(RecipeStats.objects.filter(user=self.user).exists())
+        self.assertFalse(
+            RecipeStatsCount.objects.filter(user=self.user).exists()
+        )
+
+    def test_incremental_updates(self):
+        """Testea que altas, cambios y bajas mantengan el resumen igual
+        a recalcularlo."""
+        stats.rebuild(self.user.id)
+        first = self.recipe(Decimal('50.00'), 10, [self.vegan], [self.salt])
+        second = self.recipe(Decimal('900.00'), 300, [self.dessert])
+        self.assertMatchesRebuild()
+
+        second.price = Decimal('20.00')
+        second.time_minutes = 35
+        second.save()
+        self.assertMatchesRebuild()
+
+        loaded = Recipe.objects.only('id', 'title', 'user').get(id=first.id)
+        loaded.title = 'Otro titulo'
+        loaded.save()
+        Recipe.objects.get(id=first.id).tags.add(self.dessert)
+        self.assertMatchesRebuild()
+
+        self.assertEqual(
+            snapshot(self.user)[0]['price_min'], Decimal('20.00')
+        )
+
+        first.tags.remove(self.vegan)
+        first.ingredients.clear()
+        self.assertMatchesRebuild()
+
+        self.dessert.recipe_set.clear()
+        self.assertMatchesRebuild()
+
+        self.vegan.recipe_set.add(first, second)
+        self.vegan.delete()
+        self.assertMatchesRebuild()
+
+        first.delete()
+        self.assertMatchesRebuild()
+        second.delete()
+        self.assertMatchesRebuild()
+        self.assertEqual(snapshot(self.user)[0]['recipe_count'], 0)
+        self.assertIsNone(snapshot(self.user)[0]['price_max'])
+
+    def test_remove_unassigned(self):
+        """Testea que quitar una tag o receta no asignada no reste."""
+        stats.rebuild(self.user.id)
+        first = self.recipe(100, 10, [self.vegan])
+        second = self.recipe(200, 20, [self.dessert])
+
+        first.tags.remove(self.dessert)
+        self.vegan.recipe_set.remove(first, second)
+        self.assertMatchesRebuild()
+
+        self.assertEqual(
+            stats.get_stats(self.user.id)['top_tags'],
+            [{'id': self.dessert.id, 'name': 'Postre', 'recipes': 1}]
+        )
+
+    def test_api_create_and_update(self):
+        """Testea los cambios hechos por la API, incluida la creacion
+        masiva con nombres."""
+        self.client.get(STATS_URL)
+
+        res = self.client.post(RECIPES_URL, [
+            {'title': 'Uno', 'time_minutes': 20, 'price': '120.00',
+             'tags': [self.vegan.id], 'tag_names': ['Nueva']},
+            {'title': 'Dos', 'time_minutes': 90, 'price': '4000.00',
+             'ingredient_names': ['sal', 'Azucar']},
+        ], format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertMatchesRebuild()
+
+        res = self.client.patch(
+            reverse('recipe:recipe-detail', args=[res.data[0]['id']]),
+            {'price': '10.00', 'tags': [self.dessert.id]},
+            format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertMatchesRebuild()
+
+        res = self.client.get(STATS_URL)
+        self.assertEqual(res.data['recipes'], 2)
+        self.assertEqual(res.data['price']['min'], '10.00')
+
+    def test_importer(self):
+        """Testea que la importacion masiva sume sus recetas."""
+        stats.rebuild(self.user.id)
+
+        RecipeImporter(self.user).import_rows([
+            ({'title': 'Uno', 'time_minutes': 5, 'price': Decimal('1.00'),
+              'link': ''}, ['Vegano', 'Nueva'], ['Sal']),
+            ({'title': 'Dos', 'time_minutes': 500,
+              'price': Decimal('7000.00'), 'link': ''}, ['vegano'], []),
+        ])
+
+        self.assertMatchesRebuild()
+        self.assertEqual(snapshot(self.user)[0]['recipe_count'], 2)
+
+    def test_rebuild_command(self):
+        """Testea que el comando recalcule el resumen."""
+        self.recipe(100, 10, [self.vegan])
+        stats.rebuild(self.user.id)
+        RecipeStats.objects.filter(user=self.user).update(recipe_count=99)
+        out = StringIO()
+
+        call_command('rebuild_recipe_stats', user=self.user.email,
+                     stdout=out)
+
+        self.assertEqual(snapshot(self.user)[0]['recipe_count'], 1)
+        self.assertIn('1 usuarios', out.getvalue())
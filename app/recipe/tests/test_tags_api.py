@@ -5,7 +5,7 @@ from django.test import TestCase
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Tag
+from core.models import Tag, Recipe
 from recipe.serializers import TagSerializer
 
 
@@ -51,8 +51,8 @@ class PrivateTagsApiTests(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
-    
+        self.assertEqual(res.data['results'], serializer.data)
+
     def test_tags_limited_to_user(self):
         """Testea que las tags retornadas sean SOLO para el usuario logeado."""
         user2 = get_user_model().objects.create_user(
@@ -64,8 +64,139 @@ class PrivateTagsApiTests(TestCase):
         
         res = self.client.get(TAGS_URL)
 
-        self.assertEqual(res.status_code,status.HTTP_200_OK)
-        self.assertEqual(len(res.data),1)
-        self.assertEqual(res.data[0]['name'], tag.name)
-    
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
+
+    def test_bulk_create_tags(self):
+        """Testea crear varias tags en un solo pedido."""
+        payload = [{'name': 'Vegano'}, {'name': 'Postre'}, {'name': 'Sopa'}]
+
+        res = self.client.post(TAGS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([tag['name'] for tag in res.data],
+                         ['Vegano', 'Postre', 'Sopa'])
+        self.assertTrue(all(tag['id'] for tag in res.data))
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+
+    def test_create_tag_duplicate_name(self):
+        """Testea que no se pueda repetir un nombre, sin distinguir
+        mayusculas."""
+        Tag.objects.create(user=self.user, name='Vegano')
+
+        res = self.client.post(TAGS_URL, {'name': 'vegano'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_create_tag_same_name_other_user(self):
+        """Testea que otro usuario pueda usar el mismo nombre."""
+        user2 = get_user_model().objects.create_user(
+            'test2@francorueta.com',
+            'pass1234'
+        )
+        Tag.objects.create(user=user2, name='Vegano')
+
+        res = self.client.post(TAGS_URL, {'name': 'Vegano'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_bulk_create_tags_duplicate_names(self):
+        """Testea los nombres repetidos en un alta masiva, tanto dentro
+        de la lista como contra las tags existentes."""
+        Tag.objects.create(user=self.user, name='Postre')
+        payload = [{'name': 'Sopa'}, {'name': 'SOPA'}, {'name': 'postre'}]
+
+        res = self.client.post(TAGS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        self.assertIn('name', res.data[2])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_retrieve_tags_assigned_to_recipes(self):
+        """Testea filtrar las tags asignadas a alguna receta."""
+        tag1 = Tag.objects.create(user=self.user, name='Desayuno')
+        tag2 = Tag.objects.create(user=self.user, name='Almuerzo')
+        recipe = Recipe.objects.create(
+            title='Tostadas',
+            time_minutes=10,
+            price=50.00,
+            user=self.user
+        )
+        recipe.tags.add(tag1)
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        names = [tag['name'] for tag in res.data['results']]
+        self.assertIn(tag1.name, names)
+        self.assertNotIn(tag2.name, names)
+
+    def test_retrieve_tags_assigned_unique(self):
+        """Testea que una tag usada en varias recetas aparezca una vez."""
+        tag = Tag.objects.create(user=self.user, name='Desayuno')
+        Tag.objects.create(user=self.user, name='Almuerzo')
+        for title in ('Panqueques', 'Tostadas'):
+            recipe = Recipe.objects.create(
+                title=title,
+                time_minutes=5,
+                price=30.00,
+                user=self.user
+            )
+            recipe.tags.add(tag)
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_retrieve_tags_with_counts(self):
+        """Testea la cantidad de recetas de cada tag."""
+        tag1 = Tag.objects.create(user=self.user, name='Desayuno')
+        Tag.objects.create(user=self.user, name='Almuerzo')
+        for title in ('Panqueques', 'Tostadas'):
+            recipe = Recipe.objects.create(
+                title=title,
+                time_minutes=5,
+                price=30.00,
+                user=self.user
+            )
+            recipe.tags.add(tag1)
+
+        res = self.client.get(TAGS_URL, {'with_counts': 1})
+
+        counts = {tag['name']: tag['recipe_count']
+                  for tag in res.data['results']}
+        self.assertEqual(counts, {'Desayuno': 2, 'Almuerzo': 0})
+        res = self.client.get(TAGS_URL)
+        self.assertNotIn('recipe_count', res.data['results'][0])
+
+    def test_assigned_only_updates_on_assignment(self):
+        """Testea que el listado cacheado cambie al asignar una tag."""
+        tag = Tag.objects.create(user=self.user, name='Desayuno')
+        recipe = Recipe.objects.create(
+            title='Tostadas',
+            time_minutes=10,
+            price=50.00,
+            user=self.user
+        )
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+        self.assertEqual(res.data['results'], [])
+
+        recipe.tags.add(tag)
+        res = self.client.get(
+            TAGS_URL,
+            {'assigned_only': 1},
+            HTTP_IF_NONE_MATCH=res['ETag']
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_assigned_only_invalid(self):
+        """Testea que assigned_only acepte solo 0 o 1."""
+        res = self.client.get(TAGS_URL, {'assigned_only': 'si'})
 
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,88 @@
+"""Subida de imagenes de recetas con memoria acotada.
+
+RecipeImageUploadHandler escribe cada bloque del multipart a un archivo
+temporal mientras llega (FileSystemStorage luego lo mueve, sin copiarlo,
+a recipe_image_file_path) y corta la subida apenas se pasa del limite de
+bytes o la cabecera de la imagen declara dimensiones demasiado grandes,
+antes de decodificar un solo pixel.
+"""
+import io
+
+from django.conf import settings
+from django.core.files.uploadhandler import StopUpload, \
+    TemporaryFileUploadHandler
+from django.utils.translation import gettext_lazy as _
+from PIL import Image
+
+
+MAX_BYTES = getattr(settings, 'RECIPE_IMAGE_MAX_BYTES', 10 * 1024 * 1024)
+MAX_DIMENSION = getattr(settings, 'RECIPE_IMAGE_MAX_DIMENSION', 8000)
+
+# Bytes que se acumulan como maximo para leer la cabecera de la imagen.
+HEADER_BYTES = 256 * 1024
+
+# Margen para los bordes y cabeceras del cuerpo multipart.
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class RecipeImageUploadHandler(TemporaryFileUploadHandler):
+    """Guarda la imagen en disco por bloques, validando tamaño y
+    dimensiones durante la subida. Si la rechaza, deja el motivo en
+    `error` para que la vista responda 400."""
+
+    def __init__(self, request=None, max_bytes=None, max_dimension=None):
+        super().__init__(request)
+        self.max_bytes = max_bytes or MAX_BYTES
+        self.max_dimension = max_dimension or MAX_DIMENSION
+        self.error = None
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        self.request_length = content_length
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.header = b''
+        self.probed = False
+        if self.request_length and \
+                self.request_length > self.max_bytes + MULTIPART_OVERHEAD:
+            self.reject_size()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_bytes:
+            self.reject_size()
+        if not self.probed:
+            self.probe(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def probe(self, raw_data):
+        """Lee solo la cabecera de la imagen para conocer sus
+        dimensiones. Image.open no decodifica los pixeles."""
+        self.header += raw_data
+        try:
+            image = Image.open(io.BytesIO(self.header))
+        except Image.DecompressionBombError:
+            self.reject(_('La imagen es demasiado grande.'))
+        except (IOError, SyntaxError, ValueError):
+            if len(self.header) >= HEADER_BYTES:
+                self.reject(_('El archivo no es una imagen valida.'))
+            return
+        self.probed = True
+        self.header = b''
+        width, height = image.size
+        if max(width, height) > self.max_dimension:
+            self.reject(_(
+                'La imagen no puede superar los {max} pixeles de lado.'
+            ).format(max=self.max_dimension))
+
+    def reject_size(self):
+        self.reject(_(
+            'La imagen no puede superar los {max} bytes.'
+        ).format(max=self.max_bytes))
+
+    def reject(self, message):
+        """Corta la subida sin leer el resto del cuerpo."""
+        self.error = message
+        raise StopUpload(connection_reset=True)
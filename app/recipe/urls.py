@@ -14,6 +14,8 @@ app_name = 'recipe'
 
 
 urlpatterns = [
-    path('', include(router.urls))
+    path('', include(router.urls)),
+    path('cache-stats/', views.CacheStatsView.as_view(), name='cache-stats'),
+    path('stats/', views.RecipeStatsView.as_view(), name='stats'),
 ]
 
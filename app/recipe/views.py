@@ -1,26 +1,161 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, IntegerField, Max, OuterRef, \
+    Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext_lazy as _
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.views import APIView
 
+from core.authentication import CachedTokenAuthentication, \
+    SignedTokenAuthentication
+from core import metrics
+from core.conditional import ConditionalGetMixin
 from core.models import Tag, Ingredient, Recipe
-from recipe import serializers
+from core.profiling import ProfiledViewMixin
+from recipe import export, images, search, serializers, stats
+from recipe.cache import list_cache
+from recipe.pagination import RecipePagination, RecipeAttrPagination
+from recipe.uploads import RecipeImageUploadHandler
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,mixins.ListModelMixin,mixins.CreateModelMixin):
+class BulkCreateMixin:
+    """Permite enviar una lista de objetos en el POST de creacion.
+    La lista se valida en una pasada y se crea con inserciones masivas
+    (ver BulkCreateListSerializer); la respuesta trae un resultado, o
+    los errores, por cada elemento."""
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action == 'create' and isinstance(kwargs.get('data'), list):
+            kwargs['many'] = True
+        return super().get_serializer(*args, **kwargs)
+
+
+class CachedListMixin:
+    """Sirve el listado desde list_cache. Un acierto no serializa y
+    sigue respondiendo 304 si el ETag del cliente coincide. Con un cache
+    compartido tampoco consulta la base; con el LRU de cada proceso,
+    donde las escrituras de otros procesos no renuevan la generacion,
+    la clave incluye el estado del listado (ver
+    ConditionalGetMixin.get_list_state), que cuesta una consulta."""
+
+    def list(self, request, *args, **kwargs):
+        model = self.queryset.model
+        key = list_cache.key(model, request.user.pk, request.get_full_path())
+        if not list_cache.alias:
+            last_modified, version = self.list_state()
+            key = '{}:{}:{}'.format(
+                key,
+                last_modified.isoformat() if last_modified else '',
+                version
+            )
+        cached = list_cache.get(key)
+        if cached is not None:
+            etag, data = cached
+            response = self.conditional_response(
+                request,
+                etag,
+                None,
+                lambda: Response(data)
+            )
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            list_cache.set(key, response['ETag'], response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def invalidate_list(self):
+        """Se llama despues de crear: la creacion masiva no dispara
+        post_save en todos los motores."""
+        list_cache.invalidate(self.queryset.model, self.request.user.pk)
+
+
+class BaseRecipeAttrViewSet(CachedListMixin,
+                            ConditionalGetMixin,
+                            BulkCreateMixin,
+                            viewsets.GenericViewSet,
+                            mixins.ListModelMixin,
+                            mixins.CreateModelMixin):
     """Clase padre para las tags e ingredientes.
     Contiene los atributos que comparten ambas clases."""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SignedTokenAuthentication
+    )
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeAttrPagination
+
+    def _param_to_bool(self, name):
+        """Convierte un query param 0/1 en booleano."""
+        value = self.request.query_params.get(name, '0')
+        if value not in ('0', '1'):
+            raise ValidationError({name: _('Debe ser 0 o 1.')})
+        return value == '1'
+
+    def recipe_rows(self):
+        """Filas de la tabla intermedia con Recipe que apuntan al objeto
+        de la consulta externa."""
+        model = self.queryset.model
+        return model.recipe_set.through.objects.filter(**{
+            model._meta.model_name: OuterRef('pk')
+        })
 
     def get_queryset(self):
-        """Retorna objetos para el usuario autenticado"""
-        return self.queryset.filter(user=self.request.user).order_by('-name')
-    
+        """Retorna objetos para el usuario autenticado.
+        Con ?assigned_only=1 solo los usados por alguna receta, con un
+        EXISTS correlacionado en lugar de un JOIN con DISTINCT. Con
+        ?with_counts=1 agrega recipe_count con una subconsulta."""
+        queryset = self.queryset.filter(user=self.request.user)
+        if self._param_to_bool('assigned_only'):
+            queryset = queryset.annotate(
+                assigned=Exists(self.recipe_rows())
+            ).filter(assigned=True)
+        if self._param_to_bool('with_counts'):
+            counts = self.recipe_rows().order_by().values(
+                self.queryset.model._meta.model_name
+            ).annotate(total=Count('*')).values('total')
+            queryset = queryset.annotate(recipe_count=Coalesce(
+                Subquery(counts, output_field=IntegerField()),
+                0
+            ))
+        return queryset.order_by('-name', 'id')
+
+    def get_list_state(self):
+        """Con assigned_only o with_counts el listado depende tambien de
+        las recetas, que se marcan como modificadas al cambiar sus tags
+        o ingredientes."""
+        last_modified, version = super().get_list_state()
+        if not (self._param_to_bool('assigned_only') or
+                self._param_to_bool('with_counts')):
+            return last_modified, version
+        recipes = Recipe.objects.filter(user=self.request.user).aggregate(
+            last_modified=Max('modified_at'),
+            count=Count('id')
+        )
+        if recipes['last_modified'] is not None and (
+                last_modified is None or
+                recipes['last_modified'] > last_modified):
+            last_modified = recipes['last_modified']
+        return last_modified, f'{version}:{recipes["count"]}'
+
     def perform_create(self, serializer):
         """Crea un nuevo objeto"""
-        serializer.save(user=self.request.user)
+        try:
+            with transaction.atomic():
+                serializer.save(user=self.request.user)
+        except IntegrityError:
+            # Otro pedido creo el mismo nombre despues de la validacion.
+            raise ValidationError({
+                'name': [_('Ya existe un objeto con este nombre.')]
+            })
+        self.invalidate_list()
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
@@ -34,18 +169,127 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     serializer_class = serializers.IngredientSerializer
 
 
-
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ProfiledViewMixin,
+                    ConditionalGetMixin,
+                    BulkCreateMixin,
+                    viewsets.ModelViewSet):
     """Maneja las recetas en la base de datos."""
     serializer_class = serializers.RecipeSerializer
-    queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    queryset = Recipe.objects.defer('search_vector')
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SignedTokenAuthentication
+    )
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipePagination
+    keyset_ordering = RecipePagination.ordering
+
+    def _params_to_ints(self, name):
+        """Convierte un query param de ids separados por coma en una
+        lista de enteros."""
+        value = self.request.query_params.get(name)
+        if not value:
+            return []
+        try:
+            return sorted({int(str_id) for str_id in value.split(',')})
+        except ValueError:
+            raise ValidationError({name: _('Debe ser una lista de ids.')})
+
+    def filter_by_attrs(self, queryset):
+        """Filtra por ?tags= e ?ingredients=. Con ?match=all la receta
+        debe tener todos los ids; por defecto alcanza con alguno.
+        Cada filtro es una subconsulta sobre la tabla intermedia, asi
+        que todo se resuelve en una unica consulta indexada."""
+        match = self.request.query_params.get('match', 'any')
+        if match not in ('any', 'all'):
+            raise ValidationError({'match': _('Debe ser "any" o "all".')})
+
+        for param, field in (('tags', 'tag_id'),
+                             ('ingredients', 'ingredient_id')):
+            ids = self._params_to_ints(param)
+            if not ids:
+                continue
+            through = getattr(Recipe, param).through
+            rows = through.objects.filter(**{f'{field}__in': ids})
+            if match == 'all':
+                rows = rows.values('recipe_id').annotate(
+                    matches=Count(field)
+                ).filter(matches=len(ids))
+            queryset = queryset.filter(id__in=rows.values('recipe_id'))
+        return queryset
+
+    def search(self, queryset, rank=True):
+        """Aplica ?search= sobre titulo, tags e ingredientes. Los
+        resultados se ordenan por relevancia y luego por id."""
+        text = self.request.query_params.get('search', '').strip()
+        if not text:
+            return queryset
+        if rank:
+            self.keyset_ordering = ('-rank', '-id')
+        return search.search(queryset, text, rank=rank)
+
+    def get_sparse_fields(self):
+        """Campos pedidos con ?fields=id,title en list y retrieve, o None
+        para todos."""
+        if self.action not in ('list', 'retrieve'):
+            return None
+        return self.get_serializer_class().parse_fields(
+            self.request.query_params.get('fields', '')
+        )
 
     def get_queryset(self):
         """Retorna la receta para el usuario autenticado."""
-        return self.queryset.filter(user=self.request.user)
-    
+        queryset = self.queryset.filter(user=self.request.user)
+        fields = self.get_sparse_fields()
+        if self.action == 'list':
+            queryset = self.filter_by_attrs(queryset)
+            queryset = self.search(queryset)
+            queryset = self.prefetch_attrs(queryset, ('id',), fields)
+        elif self.action == 'retrieve':
+            queryset = self.prefetch_attrs(queryset, ('id', 'name'), fields)
+        if fields is not None:
+            queryset = self.project(queryset, fields)
+        return queryset.order_by(*self.keyset_ordering)
+
+    def get_conditional_queryset(self):
+        """Las mismas recetas del listado, sin la relevancia ni las
+        precargas, para calcular el ETag."""
+        if self.action != 'list':
+            return super().get_conditional_queryset()
+        queryset = self.queryset.filter(user=self.request.user)
+        queryset = self.filter_by_attrs(queryset)
+        return self.search(queryset, rank=False)
+
+    def prefetch_attrs(self, queryset, attr_fields, fields=None):
+        """Precarga tags, ingredientes y versiones de la imagen con una
+        consulta por tabla, trayendo solo las columnas que usa el
+        serializador. Con `fields` solo precarga las relaciones pedidas."""
+        prefetches = {
+            'tags': Prefetch('tags', queryset=Tag.objects.only(*attr_fields)),
+            'ingredients': Prefetch(
+                'ingredients',
+                queryset=Ingredient.objects.only(*attr_fields)
+            ),
+            'images': 'image_derivatives',
+        }
+        return queryset.prefetch_related(*(
+            prefetch for name, prefetch in prefetches.items()
+            if fields is None or name in fields
+        ))
+
+    def project(self, queryset, fields):
+        """Trae solo las columnas de los campos pedidos."""
+        columns = {field.name for field in Recipe._meta.concrete_fields}
+        return queryset.only('id', *(
+            name for name in fields if name in columns
+        ))
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
+
     def get_serializer_class(self):
         """retorna correctamente la clase serializer."""
         if self.action == 'retrieve':
@@ -64,12 +308,23 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def upload_image(self, request, pk=None):
         """Sube una imagen a la receta."""
         recipe = self.get_object()
+        # Se reemplazan los handlers antes de que DRF lea el cuerpo.
+        handler = RecipeImageUploadHandler(request._request)
+        request._request.upload_handlers = [handler]
+        data = request.data
+        if handler.error:
+            return Response(
+                {'image': [handler.error]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         serializer = self.get_serializer(
             recipe,
-            data=request.data
+            data=data
         )
         if serializer.is_valid():
-            serializer.save()
+            recipe = serializer.save()
+            metrics.IMAGE_UPLOAD_BYTES.observe(recipe.image.size)
+            images.schedule_derivatives(recipe)
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK
@@ -78,7 +333,49 @@ class RecipeViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
-        
+
+    @action(methods=['GET'], detail=False)
+    def export(self, request):
+        """Descarga todas las recetas del usuario con ?output=ndjson
+        (por defecto) o ?output=csv. La respuesta se genera por bloques
+        mientras se envia."""
+        output = request.query_params.get('output', 'ndjson')
+        if output not in export.WRITERS:
+            raise ValidationError({
+                'output': _('Debe ser "ndjson" o "csv".')
+            })
+        recipes = export.iter_recipes(
+            Recipe.objects.filter(user=request.user)
+        )
+        response = StreamingHttpResponse(
+            export.WRITERS[output](recipes, request),
+            content_type=export.CONTENT_TYPES[output]
+        )
+        response['Content-Disposition'] = \
+            f'attachment; filename="recetas.{output}"'
+        return response
 
 
+class CacheStatsView(APIView):
+    """Muestra los contadores del cache de listados del proceso."""
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SignedTokenAuthentication
+    )
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(list_cache.stats())
+
+
+class RecipeStatsView(APIView):
+    """Muestra las estadisticas del recetario del usuario (ver
+    recipe/stats.py)."""
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SignedTokenAuthentication
+    )
+    permission_classes = (IsAuthenticated,)
 
+    def get(self, request):
+        return Response(stats.get_stats(request.user.pk))
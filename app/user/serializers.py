@@ -3,8 +3,11 @@ from django.utils.translation import ugettext_lazy as _T
 #Django 
 from rest_framework import serializers
 
+from core import tokens
+from core.timing import TimedSerializerMixin
 
-class UserSerializer(serializers.ModelSerializer):
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializador para el objeto Usuario."""
 
     class Meta:
@@ -56,3 +59,23 @@ class AuthTokenSerializer(serializers.Serializer):
         return attrs
 
 
+class RefreshTokenSerializer(serializers.Serializer):
+    """Canjea un token de refresco por un nuevo par de tokens."""
+    refresh = serializers.CharField()
+
+    def validate(self, attrs):
+        try:
+            user, pair = tokens.rotate_refresh(attrs['refresh'])
+        except tokens.InvalidToken:
+            msg = _T('El token de refresco no es valido o vencio.')
+            raise serializers.ValidationError(msg, code='authentication')
+        attrs['user'] = user
+        attrs['tokens'] = pair
+        return attrs
+
+
+class LogoutSerializer(serializers.Serializer):
+    """Datos opcionales para cerrar sesion: el token de refresco a
+    anular o `all` para cerrar todas las sesiones."""
+    refresh = serializers.CharField(required=False)
+    all = serializers.BooleanField(default=False)
@@ -0,0 +1,211 @@
+import datetime
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core import tokens
+from core.authentication import SignedTokenAuthentication
+from core.models import RefreshToken, TokenRevocation
+
+
+TOKEN_URL = reverse('user:token')
+REFRESH_URL = reverse('user:token-refresh')
+LOGOUT_URL = reverse('user:logout')
+ME_URL = reverse('user:me')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class SignedTokenApiTests(TestCase):
+    """Testea los tokens de acceso firmados y los de refresco."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@francorueta.com',
+            'testpass',
+            name='Pepito'
+        )
+        self.client = APIClient()
+        tokens.revocations.clear()
+
+    def login(self):
+        res = self.client.post(TOKEN_URL, {
+            'email': 'test@francorueta.com',
+            'password': 'testpass',
+        })
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def bearer(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_token_response(self):
+        """Testea que el login responda el token de la tabla y el par
+        de tokens firmados."""
+        data = self.login()
+
+        self.assertEqual(data['token'], Token.objects.get(user=self.user).key)
+        self.assertEqual(data['expires_in'], tokens.ACCESS_TTL)
+        self.assertEqual(RefreshToken.objects.filter(user=self.user).count(),
+                         1)
+        self.assertNotEqual(
+            RefreshToken.objects.get(user=self.user).key_hash,
+            data['refresh']
+        )
+
+    def test_access_token_without_queries(self):
+        """Testea que autenticar con el token firmado no consulte la
+        base."""
+        access = self.login()['access']
+        tokens.revocations.reload()
+        request = Request(APIRequestFactory().get(
+            RECIPES_URL,
+            HTTP_AUTHORIZATION=f'Bearer {access}'
+        ))
+
+        with self.assertNumQueries(0):
+            user, claims = SignedTokenAuthentication().authenticate(request)
+
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.email, self.user.email)
+        self.assertFalse(user.is_staff)
+        self.assertEqual(claims['u'], self.user.pk)
+
+    def test_me_with_access_token(self):
+        """Testea que /me muestre y actualice al usuario de la base."""
+        self.bearer(self.login()['access'])
+
+        res = self.client.patch(ME_URL, {'name': 'Nuevo'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['name'], 'Nuevo')
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'Nuevo')
+        self.assertTrue(self.user.check_password('testpass'))
+
+    def test_invalid_access_token(self):
+        """Testea que un token alterado o vencido no autentique."""
+        access = self.login()['access']
+
+        self.bearer(access[:-2] + 'xx')
+        self.assertEqual(
+            self.client.get(RECIPES_URL).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+        self.bearer(access)
+        with patch('core.tokens.ACCESS_TTL', -1):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_rotates(self):
+        """Testea que el token de refresco se canjee una sola vez."""
+        refresh = self.login()['refresh']
+
+        res = self.client.post(REFRESH_URL, {'refresh': refresh})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.bearer(res.data['access'])
+        self.assertEqual(
+            self.client.get(RECIPES_URL).status_code,
+            status.HTTP_200_OK
+        )
+
+        res = self.client.post(REFRESH_URL, {'refresh': refresh})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expired_refresh_purged(self):
+        """Testea que al emitir un token de refresco se borren los
+        vencidos y que el canjeado no quede en la base."""
+        RefreshToken.objects.create(
+            user=self.user,
+            key_hash='vencido',
+            expires_at=timezone.now() - datetime.timedelta(seconds=1)
+        )
+        refresh = self.login()['refresh']
+
+        self.client.post(REFRESH_URL, {'refresh': refresh})
+
+        self.assertEqual(RefreshToken.objects.filter(user=self.user).count(),
+                         1)
+        self.assertFalse(
+            RefreshToken.objects.filter(key_hash='vencido').exists()
+        )
+
+    def test_logout(self):
+        """Testea que cerrar sesion revoque el token de acceso y anule
+        el de refresco."""
+        data = self.login()
+        self.bearer(data['access'])
+
+        res = self.client.post(LOGOUT_URL, {'refresh': data['refresh']})
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            self.client.get(RECIPES_URL).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+        res = self.client.post(REFRESH_URL, {'refresh': data['refresh']})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_logout_with_table_token(self):
+        """Testea que cerrar sesion con el token de la tabla lo borre."""
+        data = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {data["token"]}')
+
+        res = self.client.post(LOGOUT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Token.objects.filter(user=self.user).exists())
+
+    def test_logout_all(self):
+        """Testea que cerrar todas las sesiones revoque todos los
+        tokens del usuario."""
+        first = self.login()
+        second = self.login()
+        self.bearer(first['access'])
+
+        res = self.client.post(LOGOUT_URL, {'all': True})
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.bearer(second['access'])
+        self.assertEqual(
+            self.client.get(RECIPES_URL).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+        self.assertFalse(RefreshToken.objects.filter(user=self.user).exists())
+
+    def test_deactivated_user(self):
+        """Testea que desactivar un usuario revoque sus tokens."""
+        data = self.login()
+        self.user.is_active = False
+        self.user.save()
+
+        self.bearer(data['access'])
+        self.assertEqual(
+            self.client.get(RECIPES_URL).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+        res = self.client.post(REFRESH_URL, {'refresh': data['refresh']})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_revocations_from_other_processes(self):
+        """Testea que un proceso aplique las revocaciones hechas en otro
+        al releer la lista."""
+        access = self.login()['access']
+        claims = tokens.verify_access(access)
+        tokens.revocations.revoke_token(claims)
+        # Un proceso que todavia no leyo la revocacion.
+        tokens.revocations.clear()
+
+        with self.assertRaises(tokens.InvalidToken):
+            tokens.verify_access(access)
+        self.assertEqual(
+            TokenRevocation.objects.get().jti,
+            claims['j']
+        )
@@ -1,8 +1,16 @@
-from rest_framework import generics, authentication, permissions
+from django.contrib.auth import get_user_model
+from rest_framework import generics, permissions, status
+from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
-from user.serializers import UserSerializer, AuthTokenSerializer
 
+from core import tokens
+from core.authentication import CachedTokenAuthentication, \
+    SignedTokenAuthentication
+from core.profiling import ProfiledViewMixin
+from user.serializers import UserSerializer, AuthTokenSerializer, \
+    LogoutSerializer, RefreshTokenSerializer
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -12,19 +20,85 @@ class CreateUserView(generics.CreateAPIView):
 
 
 class CreateTokenView(ObtainAuthToken):
-    """#Crea un nuevo authToken de usuario"""
+    """#Crea un nuevo authToken de usuario.
+    Ademas del token de la tabla (`token`, cabecera "Token <token>")
+    responde un token de acceso firmado (`access`, cabecera
+    "Bearer <token>") que vence en `expires_in` segundos y el token de
+    refresco para renovarlo (ver core/tokens.py)."""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(
+            data=request.data,
+            context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        token, _ = Token.objects.get_or_create(user=user)
+        return Response({'token': token.key, **tokens.issue_pair(user)})
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+
+class RefreshTokenView(generics.GenericAPIView):
+    """Renueva el token de acceso firmado con un token de refresco."""
+    serializer_class = RefreshTokenSerializer
+    authentication_classes = ()
+    permission_classes = ()
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(serializer.validated_data['tokens'])
+
+
+class LogoutView(generics.GenericAPIView):
+    """Cierra la sesion actual: revoca el token de acceso firmado (o
+    borra el token de la tabla) y anula el token de refresco enviado.
+    Con `all` cierra todas las sesiones del usuario."""
+    serializer_class = LogoutSerializer
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SignedTokenAuthentication
+    )
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = request.user
+        if serializer.validated_data['all']:
+            tokens.revocations.revoke_user(user.pk)
+            tokens.revoke_refresh(user)
+            Token.objects.filter(user=user).delete()
+        else:
+            if isinstance(request.auth, dict):
+                tokens.revocations.revoke_token(request.auth)
+            elif isinstance(request.auth, Token):
+                request.auth.delete()
+            refresh = serializer.validated_data.get('refresh')
+            if refresh:
+                tokens.revoke_refresh(user, refresh)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ManageUserView(ProfiledViewMixin, generics.RetrieveUpdateAPIView):
     """Maneja al usuario autenticado"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SignedTokenAuthentication
+    )
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
-        """Devuelve un usuario autenticado"""
+        """Devuelve un usuario autenticado. Con un token firmado el
+        usuario sale de los datos del token, y con un Token puede venir
+        del cache, asi que para mostrarlo en el primer caso y para
+        guardarlo en ambos se carga de la base: guardar una copia vieja
+        pisaria cambios hechos por otro pedido."""
+        if isinstance(self.request.auth, dict) or \
+                self.request.method not in permissions.SAFE_METHODS:
+            return get_user_model().objects.get(pk=self.request.user.pk)
         return self.request.user
 
 